@@ -0,0 +1,92 @@
+"""
+Seeds a throwaway database with a large synthetic match history and times the
+queries Fighters and update_glicko make, with and without the schema's indexes.
+
+    python -m benchmarks.db_queries --fighters 1000 --matches 500000
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+import random
+import tempfile
+import time
+from roabet import connect
+from roabet.db import schema
+
+INDEXES = ('matches_player1', 'matches_player2', 'fighters_workshop_index')
+
+def seed(con, fighters: int, matches: int, cycle_length: int, rng: random.Random):
+    ids = [f'fighter_{i}' for i in range(fighters)]
+    con.executemany("""
+        INSERT INTO fighters (id, name, workshop_index, select_x, select_y, glicko_rating, glicko_deviation)
+        VALUES (?, ?, ?, 513, 110, ?, ?)""",
+        ((id, id, i + 1, rng.randint(1000, 2200), rng.randint(50, 350)) for i, id in enumerate(ids)))
+    now = datetime.now()
+    con.executemany("INSERT INTO matches (time, player1, player2, winner, stage) VALUES (?, ?, ?, ?, 'stage')",
+        ((now, *rng.sample(ids, 2), rng.choice((1, 2))) for _ in range(matches)))
+    con.executemany("INSERT INTO rating_cycles (ended_at, last_match) VALUES (?, ?)",
+        ((now, last_match) for last_match in range(cycle_length, matches, cycle_length)))
+    con.commit()
+    return ids
+
+def time_query(con, sql, params_list, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for params in params_list:
+            con.execute(sql, params).fetchall()
+        best = min(best, (time.perf_counter() - start) / len(params_list))
+    return best
+
+def run_queries(con, ids, repeat: int):
+    cycle_start = con.execute("SELECT last_match FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()['last_match']
+    last_match = con.execute("SELECT COALESCE(MAX(id), 0) FROM matches").fetchone()[0]
+    queries = {
+        "all fighters (Fighters.load_fighters)": ("SELECT * FROM fighters", [()]),
+        "latest rating cycle": ("SELECT id, last_match FROM rating_cycles ORDER BY id DESC LIMIT 1", [()]),
+        "cycle's matches (Fighters)": ("""
+            SELECT player1, player2, winner FROM matches
+            WHERE id > :start
+            ORDER BY id""", [{'start': cycle_start}]),
+        "cycle's matches (update_glicko)": ("""
+            SELECT player1, player2, winner FROM matches
+            WHERE id > ? AND id <= ? AND winner IN (1, 2)
+            ORDER BY id""", [(cycle_start, last_match)]),
+        "last match (update_glicko)": ("SELECT COALESCE(MAX(id), 0) FROM matches", [()]),
+        "last workshop index (import)": (
+            "SELECT COALESCE(MAX(workshop_index), 0) FROM fighters WHERE workshop_index >= 1", [()]),
+    }
+    return {name: time_query(con, sql, params, repeat) for name, (sql, params) in queries.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fighters', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=500000)
+    parser.add_argument('--cycle-length', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        con = connect(str(Path(tmp) / 'bench.sqlite3'))
+        schema.migrate(con)
+        start = time.perf_counter()
+        ids = seed(con, args.fighters, args.matches, args.cycle_length, random.Random(args.seed))
+        con.execute("ANALYZE")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"Seeded {args.fighters} fighters and {args.matches} matches in {time.perf_counter() - start:.1f} s")
+
+        indexed = run_queries(con, ids, args.repeat)
+        for index in INDEXES:
+            con.execute(f"DROP INDEX {index}")
+        con.execute("ANALYZE")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        unindexed = run_queries(con, ids, args.repeat)
+        con.close()
+
+    print(f"{'query':<45} {'indexed':>12} {'no indexes':>12}")
+    for name in indexed:
+        print(f"{name:<45} {indexed[name] * 1000:9.3f} ms {unindexed[name] * 1000:9.3f} ms")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
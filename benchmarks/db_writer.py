@@ -0,0 +1,144 @@
+"""
+Measures how long database work stalls the event loop, writing match results and
+phase timings on the loop thread (the old way) and through a DatabaseWriter, while
+another connection keeps closing rating cycles with update_glicko, taking the write lock
+the way db_actions does while the bot runs.
+
+A ticker coroutine wakes every few milliseconds; how late it wakes is the stall any
+controller input scheduled at that moment would have suffered.
+
+    python -m benchmarks.db_writer --matches 200 --cycle-every 0.5 --threshold 0.02
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from pathlib import Path
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from roabet import connect
+from roabet.db import DatabaseReader, DatabaseWriter, Matches, PhaseTimer, schema
+from db_actions.update_glicko import update_glicko
+from .db_queries import seed
+
+PHASES = ('matchmaking', 'select_fighters', 'confirm_fighters', 'select_stage', 'wait_for_result', 'record_result')
+
+def close_cycles(path: str, stop: threading.Event, every: float, durations: list[float]):
+    """
+    Closes a rating cycle on its own connection every few seconds, timing each closure.
+    """
+    con = connect(path)
+    while not stop.wait(every):
+        start = time.perf_counter()
+        update_glicko(con)
+        durations.append(time.perf_counter() - start)
+    con.close()
+
+async def ticker(stop: asyncio.Event, interval: float, lags: list[float]):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+def fake_match(ids: list[str], rng: random.Random):
+    fighters = [SimpleNamespace(id=id) for id in rng.sample(ids, 2)]
+    return fighters, rng.choice((1, 2)), SimpleNamespace(id='stage')
+
+async def match_loop(con, writer: DatabaseWriter, reader: DatabaseReader, ids: list[str], matches: int,
+        match_time: float, rng: random.Random):
+    all_matches = Matches(writer)
+    timer = PhaseTimer(writer)
+    check = "SELECT id FROM rating_cycles ORDER BY id DESC LIMIT 1"
+    for _ in range(matches):
+        for phase in PHASES[:-1]:
+            with timer.span(phase):
+                await asyncio.sleep(match_time / len(PHASES))
+        fighters, winner, stage = fake_match(ids, rng)
+        with timer.span('record_result'):
+            if writer is None:
+                match_id = Matches._insert(con, datetime.now(), fighters, winner, stage)
+                con.commit()
+            else:
+                match_id = await all_matches.record_async(fighters, winner, stage)
+        if writer is None:
+            con.execute(check).fetchone()
+            rows = [(match_id, phase, started_at, seconds) for phase, started_at, seconds in timer.spans]
+            timer.spans = []
+            PhaseTimer._insert(con, rows)
+            con.commit()
+        else:
+            await reader.run(lambda con: con.execute(check).fetchone())
+            timer.flush(match_id)
+
+def percentile(values: list[float], fraction: float) -> float:
+    ranked = sorted(values)
+    return ranked[min(int(fraction * len(ranked)), len(ranked) - 1)]
+
+async def run(path: str, mode: str, ids: list[str], args) -> list[float]:
+    con = connect(path)
+    writer = reader = None
+    if mode == 'writer':
+        writer = DatabaseWriter(path)
+        reader = DatabaseReader(path)
+    lags = []
+    closures = []
+    stop_ticker = asyncio.Event()
+    stop_locker = threading.Event()
+    locker = threading.Thread(target=close_cycles, args=(path, stop_locker, args.cycle_every, closures))
+    locker.start()
+    tick = asyncio.create_task(ticker(stop_ticker, args.tick, lags))
+    try:
+        await match_loop(con, writer, reader, ids, args.matches, args.match_time, random.Random(args.seed))
+    finally:
+        stop_ticker.set()
+        await tick
+        stop_locker.set()
+        locker.join()
+        if closures:
+            print(f"  {len(closures)} cycles closed, {percentile(closures, 0.5) * 1000:.1f} ms median, "
+                f"{max(closures) * 1000:.1f} ms max")
+        if writer is not None:
+            writer.close()
+            reader.close()
+            print(f"  writer: {writer.jobs} jobs in {writer.batches} commits, "
+                f"slowest commit {writer.max_commit_time * 1000:.1f} ms")
+        con.close()
+    return lags
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fighters', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=200000, help="matches already in the database")
+    parser.add_argument('--matches', type=int, default=200, help="matches to play")
+    parser.add_argument('--match-time', type=float, default=0.05, help="seconds of other work per match")
+    parser.add_argument('--cycle-every', type=float, default=0.5, help="seconds between cycle closures")
+    parser.add_argument('--tick', type=float, default=0.005)
+    parser.add_argument('--threshold', type=float, default=0.02, help="largest acceptable stall, in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'bench.sqlite3')
+        con = connect(path)
+        schema.migrate(con)
+        ids = seed(con, args.fighters, args.history, 5000, random.Random(args.seed))
+        con.close()
+
+        failed = False
+        for mode in ('sync', 'writer'):
+            print(f"{mode}:")
+            start = time.perf_counter()
+            lags = asyncio.run(run(path, mode, ids, args))
+            elapsed = time.perf_counter() - start
+            worst = max(lags)
+            verdict = 'PASS' if worst <= args.threshold else 'FAIL'
+            failed |= mode == 'writer' and verdict == 'FAIL'
+            print(f"  {args.matches / elapsed:.1f} matches/s, loop stall p50 {percentile(lags, 0.5) * 1000:.1f} ms, "
+                f"p99 {percentile(lags, 0.99) * 1000:.1f} ms, max {worst * 1000:.1f} ms  {verdict}")
+    raise SystemExit(failed)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Synthetic recordings for the screenreader benchmarks, for when no real recordings are at hand.
+Frames are noise shaped like the 480x260 detection crop; the last few frames of each
+recording have the results banner pasted in.
+"""
+from pathlib import Path
+import cv2
+import numpy
+
+WIDTH = 480
+HEIGHT = 260
+
+def _paste_result(frame, x, win_text, tag):
+    frame[10:10 + win_text.shape[0], x:x + win_text.shape[1]] = win_text
+    frame[80:80 + tag.shape[0], x + 90:x + 90 + tag.shape[1]] = tag
+
+def make_recording(path, winner: int, *, frames: int=200, result_frames: int=25, glitches: int=0,
+        seed: int=0) -> Path:
+    """
+    Writes a .npy recording where the last result_frames frames show winner in 1st place.
+    glitches adds that many isolated frames earlier on that wrongly show the other player
+    winning, to check that multi-frame confirmation rejects them.
+    """
+    rng = numpy.random.default_rng(seed)
+    win_text = cv2.imread('img/1st_template.png', cv2.IMREAD_COLOR)
+    # whichever player's tag sits in the top band is the winner
+    tag = cv2.imread(f'img/p{winner}_template.png', cv2.IMREAD_COLOR)
+
+    stack = rng.integers(0, 80, (frames, HEIGHT, WIDTH, 3), dtype=numpy.uint8)
+    wrong_tag = cv2.imread(f'img/p{3 - winner}_template.png', cv2.IMREAD_COLOR)
+
+    x = int(rng.integers(0, 200))
+    for frame in stack[frames - result_frames:]:
+        _paste_result(frame, x, win_text, tag)
+    glitch_at = rng.choice(frames - result_frames - 1, size=glitches, replace=False) if glitches else ()
+    for i in glitch_at:
+        _paste_result(stack[i], x, win_text, wrong_tag)
+
+    path = Path(path)
+    numpy.save(path, stack)
+    return path
+
+def make_recordings(directory, n: int, **kwargs) -> dict[str, int]:
+    """
+    Writes n recordings to directory and returns their labels.
+    """
+    labels = {}
+    for i in range(n):
+        winner = i % 2 + 1
+        path = make_recording(Path(directory) / f'synthetic_{i:03d}.npy', winner, seed=i, **kwargs)
+        labels[path.name] = winner
+    return labels
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Compares closing a rating cycle fighter by fighter with glicko.update_rating against
+the vectorized glicko_batch path, on a synthetic roster, and checks they agree.
+
+    python -m benchmarks.glicko --fighters 1000 --matches 1000 10000 100000
+"""
+import argparse
+import time
+import numpy
+from roabet.util import glicko, glicko_batch
+
+def scalar_cycle(ratings, devs, player1, player2, score1):
+    old = [glicko.tick_rating(glicko.Rating(int(r), int(d))) for r, d in zip(ratings, devs)]
+    matches = [[] for _ in old]
+    for a, b, score in zip(player1.tolist(), player2.tolist(), score1.tolist()):
+        matches[a].append((old[b], score))
+        matches[b].append((old[a], 1 - score))
+    return [glicko.update_rating(old[i], matches[i]) for i in range(len(old))]
+
+def batch_cycle(ratings, devs, player1, player2, score1):
+    ticked_ratings, ticked_devs = glicko_batch.tick_ratings(ratings, devs)
+    return glicko_batch.update_ratings(ticked_ratings, ticked_devs, player1, player2, score1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fighters', type=int, default=1000)
+    parser.add_argument('--matches', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(args.seed)
+    ratings = rng.integers(1000, 2200, args.fighters)
+    devs = rng.integers(glicko.MIN_DEVIATION, glicko.DEFAULT_DEVIATION + 1, args.fighters)
+
+    for n in args.matches:
+        player1 = rng.integers(0, args.fighters, n)
+        player2 = (player1 + rng.integers(1, args.fighters, n)) % args.fighters
+        score1 = rng.integers(0, 2, n).astype(numpy.float64)
+
+        start = time.perf_counter()
+        expected = scalar_cycle(ratings, devs, player1, player2, score1)
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_ratings, new_devs, games = batch_cycle(ratings, devs, player1, player2, score1)
+        batch_time = time.perf_counter() - start
+
+        mismatches = sum((rating.rating, rating.dev) != (int(r), int(d))
+            for rating, r, d in zip(expected, new_ratings, new_devs))
+        print(f"{n:>8} matches: scalar {scalar_time * 1000:8.1f} ms, batch {batch_time * 1000:7.1f} ms "
+            f"({scalar_time / batch_time:5.1f}x), {mismatches} mismatches")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
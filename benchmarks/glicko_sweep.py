@@ -0,0 +1,101 @@
+"""
+Checks that the sweep's replay rebuilds exactly the ratings update_glicko wrote, cycle
+by cycle, on a small synthetic history. Then times a parameter sweep over a large one
+(fighters whose real skill drifts between cycles) in one process and across a process
+pool, against replaying it fighter by fighter through glicko.update_rating.
+
+    python -m benchmarks.glicko_sweep --fighters 1000 --cycles 1000 --matches 500 --processes 1 2 4
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+import random
+import tempfile
+import time
+import numpy
+from roabet.context import connect, context
+from roabet.db import schema
+from db_actions.glicko_sweep import GlickoParams, History, load_history, make_grid, replay, sweep
+from db_actions.update_glicko import update_glicko
+from .glicko import scalar_cycle
+from .leaderboard import play
+
+def check_replay(cycles: int, matches: int, fighters: int, rng: random.Random) -> int:
+    """
+    Returns how many fighters' replayed ratings differ from update_glicko's.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        con = connect(str(Path(tmp) / 'replay.sqlite3'))
+        schema.migrate(con)
+        context.db = con
+        ids = [f'fighter_{i}' for i in range(fighters)]
+        skill = {id: rng.gauss(1500, 300) for id in ids}
+        con.executemany("INSERT INTO fighters (id, name, workshop_index, select_x, select_y) VALUES (?, ?, ?, 513, 110)",
+            ((id, id, i + 1) for i, id in enumerate(ids)))
+        for _ in range(cycles):
+            play(con, ids, skill, matches, rng, datetime.now())
+            update_glicko()
+        history = load_history(con)
+        ratings, devs, *_ = replay(history.matches, history.bounds, len(history.fighters), GlickoParams())
+        stored = {row['id']: (row['glicko_rating'], row['glicko_deviation'])
+            for row in con.execute("SELECT id, glicko_rating, glicko_deviation FROM fighters")}
+        con.close()
+        context.db = None
+    return sum(stored[id] != (ratings[i], devs[i]) for i, id in enumerate(history.fighters))
+
+def scalar_replay(history: History):
+    ratings = numpy.full(len(history.fighters), 1500)
+    devs = numpy.full(len(history.fighters), 350)
+    for start, end in zip(history.bounds[:-1], history.bounds[1:]):
+        cycle = history.matches[start:end]
+        result = scalar_cycle(ratings, devs, cycle[:, 0], cycle[:, 1], cycle[:, 2].astype(numpy.float64))
+        ratings = numpy.array([rating.rating for rating in result])
+        devs = numpy.array([rating.dev for rating in result])
+
+def make_history(fighters: int, cycles: int, matches: int, drift: float, rng: numpy.random.Generator) -> History:
+    skill = rng.normal(1500, 300, fighters)
+    rows = []
+    for _ in range(cycles):
+        player1 = rng.integers(0, fighters, matches)
+        player2 = (player1 + rng.integers(1, fighters, matches)) % fighters
+        p1_wins = rng.random(matches) < 1 / (1 + 10**((skill[player2] - skill[player1]) / 400))
+        rows.append(numpy.column_stack((player1, player2, p1_wins)).astype(numpy.int32))
+        skill += rng.normal(0, drift, fighters)
+    bounds = numpy.arange(0, cycles * matches + 1, matches)
+    return History(numpy.concatenate(rows), bounds, [f'fighter_{i}' for i in range(fighters)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fighters', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=500, help="matches per cycle")
+    parser.add_argument('--drift', type=float, default=15, help="how far real skill wanders each cycle")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    wrong = check_replay(20, 1000, 300, random.Random(args.seed))
+    print(f"replay vs update_glicko over 20 cycles: {wrong} fighters differ")
+
+    history = make_history(args.fighters, args.cycles, args.matches, args.drift, numpy.random.default_rng(args.seed))
+    grid = make_grid([10, 30, 100], [30, 50, 70], [250, 350])
+    print(f"{len(history.matches)} matches in {args.cycles} cycles, {args.fighters} fighters, "
+        f"{len(grid)} parameter sets")
+    start = time.perf_counter()
+    scalar_replay(history)
+    scalar = time.perf_counter() - start
+    print(f"glicko.update_rating: {scalar:6.1f} s per set, so {scalar * len(grid) / 60:.1f} min for the grid")
+    baseline = None
+    for processes in args.processes:
+        start = time.perf_counter()
+        results = sweep(history, grid, processes=processes)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        best = results[0]
+        print(f"{processes:2d} processes: {elapsed:6.1f} s ({elapsed / len(grid):.2f} s per set, "
+            f"{baseline / elapsed:.2f}x), best t_star={best.params.t_star:g} min_dev={best.params.min_dev:g} "
+            f"max_dev={best.params.max_dev:g} log-loss {best.log_loss:.4f} over {best.scored} matches")
+    raise SystemExit(bool(wrong))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Plays the same button presses on two fake controllers in real time, the old way
+(press, sleep, release, sleep for each press) and through an InputScheduler, and
+reports how far the inputs drifted from plan. --load adds coroutines that hog the
+event loop for a few milliseconds at a time, like screen capture and DB work do.
+
+    python -m benchmarks.input_timing --presses 40 --hold 0.05 --gap 0.05 --load
+"""
+import argparse
+import asyncio
+import random
+import time
+from roabet.controller.backend import BUTTONS, GamepadBackend
+from roabet.controller.timeline import InputScheduler, Timeline, TimingReport
+
+class RecordingBackend(GamepadBackend):
+    """
+    Remembers when each update() happened and what was held.
+    """
+    def __init__(self):
+        self.buttons = BUTTONS(0)
+        self.updates: list[tuple[float, BUTTONS]] = []
+
+    def press_button(self, button):
+        self.buttons |= button
+
+    def release_button(self, button):
+        self.buttons &= ~button
+
+    def update(self):
+        self.updates.append((asyncio.get_running_loop().time(), self.buttons))
+
+async def hog(stop: asyncio.Event, rng: random.Random):
+    while not stop.is_set():
+        time.sleep(rng.uniform(0.001, 0.008))
+        await asyncio.sleep(0.01)
+
+def sequence(rng: random.Random, presses: int):
+    buttons = (BUTTONS.XUSB_GAMEPAD_DPAD_UP, BUTTONS.XUSB_GAMEPAD_DPAD_DOWN,
+        BUTTONS.XUSB_GAMEPAD_DPAD_LEFT, BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT)
+    return [rng.choice(buttons) for _ in range(presses)]
+
+async def play_sleeps(backend: RecordingBackend, buttons, hold: float, gap: float):
+    for button in buttons:
+        backend.press_button(button)
+        backend.update()
+        await asyncio.sleep(hold)
+        backend.release_button(button)
+        backend.update()
+        await asyncio.sleep(gap)
+
+def drift(backend: RecordingBackend, start: float, hold: float, gap: float) -> TimingReport:
+    # update k is planned at start + k // 2 * (hold + gap), plus hold for releases
+    report = TimingReport()
+    for k, (at, _) in enumerate(backend.updates):
+        report.errors.append(at - (start + k // 2 * (hold + gap) + (hold if k % 2 else 0)))
+    return report
+
+async def run(args, scheduled: bool) -> tuple[TimingReport, int, float]:
+    rng = random.Random(args.seed)
+    backends = {1: RecordingBackend(), 2: RecordingBackend()}
+    sequences = {num: sequence(rng, args.presses) for num in backends}
+    stop = asyncio.Event()
+    hogs = [asyncio.create_task(hog(stop, rng)) for _ in range(args.load)]
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    if scheduled:
+        scheduler = InputScheduler(backends)
+        timeline = Timeline()
+        for num, buttons in sequences.items():
+            for button in buttons:
+                timeline.press(num, button, hold=args.hold, gap=args.gap)
+        await scheduler.play(timeline)
+    else:
+        await asyncio.gather(*(play_sleeps(backends[num], buttons, args.hold, args.gap)
+            for num, buttons in sequences.items()))
+    elapsed = loop.time() - start
+
+    stop.set()
+    await asyncio.gather(*hogs)
+    report = TimingReport()
+    for backend in backends.values():
+        report.extend(drift(backend, start, args.hold, args.gap))
+    return report, sum(len(backend.updates) for backend in backends.values()), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--presses', type=int, default=40, help="presses per controller")
+    parser.add_argument('--hold', type=float, default=0.05)
+    parser.add_argument('--gap', type=float, default=0.05)
+    parser.add_argument('--load', type=int, default=0, nargs='?', const=3,
+        help="number of coroutines hogging the event loop")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    planned = args.presses * (args.hold + args.gap)
+    for scheduled in (False, True):
+        report, updates, elapsed = asyncio.run(run(args, scheduled))
+        last = report.errors[-1] if report.errors else 0.0
+        print(f"{'scheduler' if scheduled else 'sleeps':>9}: {report}; last input {last * 1000:+.1f} ms, "
+            f"{elapsed:.2f} s for {planned:.2f} s planned, {updates} updates")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
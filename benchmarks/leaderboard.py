@@ -0,0 +1,164 @@
+"""
+Plays a synthetic history of rating cycles through update_glicko, then times answering
+leaderboard and rating history questions from the snapshots and the materialized
+leaderboard against replaying every match through glicko.update_rating, and checks the
+answers agree. Then plays more matches through Fighters.record_result and
+Leaderboard.record, timing the per-match update and checking the ranks against a full
+re-sort. Query plans are checked for full table scans.
+
+    python -m benchmarks.leaderboard --fighters 1000 --cycles 50 --matches 2000
+"""
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+import random
+import tempfile
+import time
+import numpy
+from roabet.context import connect, context
+from roabet.db import Fighters, Leaderboard, rating_at, rating_history, schema
+from db_actions.update_glicko import update_glicko
+from .glicko import scalar_cycle
+
+def play(con, ids: list[str], skill: dict[str, float], matches: int, rng: random.Random, when: datetime):
+    rows = []
+    for _ in range(matches):
+        player1, player2 = rng.sample(ids, 2)
+        p1_wins = rng.random() < 1 / (1 + 10 ** ((skill[player2] - skill[player1]) / 400))
+        rows.append((when, player1, player2, 1 if p1_wins else 2))
+    con.executemany("INSERT INTO matches (time, player1, player2, winner, stage) VALUES (?, ?, ?, ?, 'stage')", rows)
+    con.commit()
+
+def replay(con, ids: list[str]) -> list[dict[str, tuple[int, int, int]]]:
+    """
+    Every cycle's ratings, worked out from scratch from the matches.
+    """
+    index = {id: i for i, id in enumerate(ids)}
+    ratings = numpy.full(len(ids), 1500)
+    devs = numpy.full(len(ids), 350)
+    games = numpy.zeros(len(ids), dtype=numpy.int64)
+    cycles = []
+    bounds = [row['last_match'] for row in con.execute("SELECT last_match FROM rating_cycles ORDER BY id")]
+    for start, end in zip(bounds, bounds[1:]):
+        rows = con.execute("SELECT player1, player2, winner FROM matches WHERE id > ? AND id <= ? ORDER BY id",
+            (start, end)).fetchall()
+        player1 = numpy.array([index[row['player1']] for row in rows], dtype=numpy.intp)
+        player2 = numpy.array([index[row['player2']] for row in rows], dtype=numpy.intp)
+        score1 = numpy.array([float(row['winner'] == 1) for row in rows])
+        result = scalar_cycle(ratings, devs, player1, player2, score1)
+        ratings = numpy.array([rating.rating for rating in result])
+        devs = numpy.array([rating.dev for rating in result])
+        games += numpy.bincount(player1, minlength=len(ids)) + numpy.bincount(player2, minlength=len(ids))
+        cycles.append({id: (int(ratings[i]), int(devs[i]), int(games[i])) for i, id in enumerate(ids)})
+    return cycles
+
+def best_time(fn, repeat: int=20) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def full_scans(con, sql: str, params) -> list[str]:
+    return [row['detail'] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        if row['detail'].startswith('SCAN') and 'INDEX' not in row['detail']]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fighters', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--matches', type=int, default=2000, help="matches per cycle")
+    parser.add_argument('--live', type=int, default=2000, help="matches to play through the live leaderboard")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        con = connect(str(Path(tmp) / 'leaderboard.sqlite3'))
+        schema.migrate(con)
+        context.db = con
+        ids = [f'fighter_{i}' for i in range(args.fighters)]
+        skill = {id: rng.gauss(1500, 300) for id in ids}
+        con.executemany("INSERT INTO fighters (id, name, workshop_index, select_x, select_y) VALUES (?, ?, ?, 513, 110)",
+            ((id, id, i + 1) for i, id in enumerate(ids)))
+
+        start_time = datetime(2024, 1, 1)
+        close_times = []
+        for cycle in range(args.cycles):
+            play(con, ids, skill, args.matches, rng, start_time + timedelta(days=cycle))
+            start = time.perf_counter()
+            update_glicko()
+            close_times.append(time.perf_counter() - start)
+        # the cycles all closed just now; spread them out so rating_at has something to find
+        cycle_ids = [row['id'] for row in con.execute("SELECT id FROM rating_cycles ORDER BY id")]
+        con.executemany("UPDATE rating_cycles SET ended_at = ? WHERE id = ?",
+            ((start_time + timedelta(days=i), id) for i, id in enumerate(cycle_ids)))
+        con.commit()
+        print(f"{args.cycles} cycles of {args.matches} matches, {args.fighters} fighters: "
+            f"closing a cycle takes {numpy.median(close_times) * 1000:.1f} ms (median), snapshot included")
+
+        start = time.perf_counter()
+        cycles = replay(con, ids)
+        replay_time = time.perf_counter() - start
+
+        fighter = rng.choice(ids)
+        when = start_time + timedelta(days=args.cycles // 2, hours=12)
+        history = rating_history(fighter)
+        mismatches = sum((snapshot.rating, snapshot.deviation, snapshot.games) != cycle[fighter]
+            for snapshot, cycle in zip(history, cycles))
+        mismatches += len(history) != len(cycles)
+        expected_top = sorted(ids, key=lambda id: (cycles[-1][id][0], id), reverse=True)[:args.top]
+        mismatches += [entry.fighter for entry in Leaderboard.top(args.top)] != expected_top
+        at = rating_at(fighter, when)
+        mismatches += (at.rating, at.deviation) != cycles[args.cycles // 2 - 1][fighter][:2]
+
+        print(f"replaying every match: {replay_time * 1000:9.1f} ms")
+        for name, fn in (
+                (f"top {args.top}", lambda: Leaderboard.top(args.top)),
+                (f"ranks {args.fighters // 2}-{args.fighters // 2 + args.top}",
+                    lambda: Leaderboard.top(args.top, args.fighters // 2)),
+                ("one fighter's standing", lambda: Leaderboard.entry(fighter)),
+                ("one fighter's history", lambda: rating_history(fighter)),
+                ("one fighter's rating at T", lambda: rating_at(fighter, when))):
+            elapsed = best_time(fn)
+            print(f"{name:26s} {elapsed * 1000:8.3f} ms  ({replay_time / elapsed:8.0f}x)")
+        print(f"{mismatches} mismatches against the replay")
+
+        scans = []
+        for sql, params in (
+                ("SELECT * FROM leaderboard WHERE rank > ? ORDER BY rank LIMIT ?", (0, 10)),
+                ("SELECT * FROM rating_snapshots WHERE fighter = ? ORDER BY cycle", (fighter,)),
+                ("UPDATE leaderboard SET rank = rank + 1 WHERE (rating, fighter) < (?, ?) AND rank < ?", (1500, fighter, 5)),
+                ("SELECT id FROM rating_cycles WHERE ended_at <= ? ORDER BY ended_at DESC LIMIT 1", (when,))):
+            scans += full_scans(con, sql, params)
+        print(f"full table scans in the read and update queries: {scans or 'none'}")
+
+        # live: the match loop's per-match updates
+        fighters = Fighters(con=con)
+        leaderboard = Leaderboard()
+        leaderboard.refresh(fighters)
+        pool = list(fighters.fighters.values())
+        times = []
+        for _ in range(args.live):
+            fighter1, fighter2 = rng.sample(pool, 2)
+            winner = 1 if rng.random() < 1 / (1 + 10 ** ((skill[fighter2.id] - skill[fighter1.id]) / 400)) else 2
+            fighters.record_result(fighter1, fighter2, winner)
+            start = time.perf_counter()
+            leaderboard.record([fighter1, fighter2])
+            times.append(time.perf_counter() - start)
+        board = con.execute("SELECT fighter, rank, rating, games FROM leaderboard ORDER BY rank").fetchall()
+        expected = sorted(pool, key=lambda f: (f.provisional_rating.rating, f.id), reverse=True)
+        wrong = sum(row['fighter'] != f.id or row['rating'] != f.provisional_rating.rating
+            for row, f in zip(board, expected))
+        wrong += [row['rank'] for row in board] != list(range(1, len(board) + 1))
+        games = sum(row['games'] for row in board) - sum(cycles[-1][id][2] for id in ids)
+        print(f"live updates: {numpy.median(times) * 1000:.2f} ms median, {max(times) * 1000:.2f} ms max per match "
+            f"(commit included); {wrong} rank errors after {args.live} matches, "
+            f"{games} games counted for {args.live * 2} expected")
+        con.close()
+    raise SystemExit(bool(mismatches or wrong or scans or games != args.live * 2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Times Fighters.choose_fighters' opponent search on synthetic rosters: the old scan
+of the whole pool with ok_matchup against MatchmakingIndex, and checks both find
+the same set of eligible opponents.
+
+    python -m benchmarks.matchmaking --sizes 100 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from roabet.db.fighters import Character, ok_matchup
+from roabet.db.matchmaking import MatchmakingIndex
+from roabet.util import glicko
+
+def make_roster(n: int, rng: random.Random) -> list[Character]:
+    roster = []
+    for i in range(n):
+        # most fighters are settled, a few are new and still uncertain
+        dev = glicko.DEFAULT_DEVIATION if rng.random() < 0.05 else rng.randint(glicko.MIN_DEVIATION, 120)
+        roster.append(Character({
+            'id': f'fighter_{i}', 'official': False, 'name': f'Fighter {i}', 'steam_id': None,
+            'select_x': 513, 'select_y': 110, 'matchmaker_banned': False, 'is_uber': False, 'is_potato': False,
+            'load_time': 0, 'workshop_index': i + 1,
+            'glicko_rating': round(rng.gauss(1500, 250)), 'glicko_deviation': dev,
+        }))
+    return roster
+
+def scan_opponents(pool, fighter1, dev_range):
+    return [fighter for fighter in pool if ok_matchup(fighter1, fighter, dev_range)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--picks', type=int, default=200)
+    parser.add_argument('--dev-range', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for n in args.sizes:
+        pool = make_roster(n, rng)
+        start = time.perf_counter()
+        index = MatchmakingIndex(pool)
+        build_time = time.perf_counter() - start
+        fighters1 = [rng.choice(pool) for _ in range(args.picks)]
+
+        start = time.perf_counter()
+        for fighter1 in fighters1:
+            opponents = scan_opponents(pool, fighter1, args.dev_range)
+            if opponents:
+                rng.choice(opponents)
+        scan_time = (time.perf_counter() - start) / args.picks
+
+        start = time.perf_counter()
+        for fighter1 in fighters1:
+            index.random_opponent(fighter1, args.dev_range, rng)
+        index_time = (time.perf_counter() - start) / args.picks
+
+        mismatches = 0
+        for fighter1 in fighters1[:20]:
+            found = [f.id for fighters, start, end in index.eligible_slices(fighter1, args.dev_range)
+                for f in fighters[start:end] if f != fighter1]
+            mismatches += len(found) != len(set(found))
+            found = set(found)
+            mismatches += found != {f.id for f in scan_opponents(pool, fighter1, args.dev_range)}
+
+        # a re-sort after a result, as Fighters.record_result does
+        start = time.perf_counter()
+        for fighter in fighters1:
+            fighter.provisional_rating = glicko.Rating(fighter.provisional_rating.rating + rng.randint(-30, 30),
+                fighter.provisional_rating.dev)
+            index.update(fighter)
+        update_time = (time.perf_counter() - start) / args.picks
+
+        print(f"{n:>7} fighters: scan {scan_time * 1e6:9.1f} us, index {index_time * 1e6:7.1f} us "
+            f"({scan_time / index_time:6.1f}x), update {update_time * 1e6:6.1f} us, "
+            f"build {build_time * 1000:6.1f} ms, {mismatches} mismatched opponent sets")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
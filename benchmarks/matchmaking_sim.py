@@ -0,0 +1,50 @@
+"""
+Times the matchmaking simulator: matches simulated per second in one process and across
+a process pool, and how long comparing a few dev_range settings takes. Also checks that
+a run is reproducible from its seed.
+
+    python -m benchmarks.matchmaking_sim --runs 4 --matches 10000 --processes 1 2 --dev-ranges 1 2 4
+"""
+import argparse
+import time
+import numpy
+from db_actions.matchmaking_sim import SimParams, run_simulations, simulate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=4)
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--dev-ranges', type=float, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    params = SimParams(matches=args.matches)
+
+    first = simulate(params._replace(matches=2000), 7)
+    second = simulate(params._replace(matches=2000), 7)
+    reproducible = numpy.array_equal(first.favourite_odds, second.favourite_odds) \
+        and first.matches_to_dev == second.matches_to_dev
+    print(f"same seed, same run: {reproducible}")
+
+    baseline = None
+    for processes in args.processes:
+        start = time.perf_counter()
+        run_simulations(params, range(args.runs), processes)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{processes:2d} processes: {args.runs} runs of {args.matches} matches in {elapsed:5.1f} s, "
+            f"{args.runs * args.matches / elapsed:7.0f} matches/s ({baseline / elapsed:.2f}x)")
+
+    print("dev_range  lopsided (>75%)  matches to dev<150 (median)  error after 10 matches")
+    start = time.perf_counter()
+    for dev_range in args.dev_ranges:
+        results = run_simulations(params._replace(dev_range=dev_range), range(args.runs), args.processes[-1])
+        odds = numpy.concatenate([result.favourite_odds for result in results])
+        reached = [n for result in results for n in result.matches_to_dev[150] if n is not None]
+        errors = [error for result in results for error in result.rating_errors[10]]
+        print(f"{dev_range:9g}  {numpy.mean(odds > 0.75):15.1%}  {numpy.median(reached) if reached else float('nan'):27.0f}"
+            f"  {numpy.mean(errors) if errors else float('nan'):22.0f}")
+    print(f"compared {len(args.dev_ranges)} settings in {time.perf_counter() - start:.1f} s")
+    raise SystemExit(not reproducible)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Runs Controllers against the simulated game on a virtual clock: starting up, then
+selecting fighters and a stage for many matches. Reports how long the menus take per
+match in game time, how long the simulation took in real time, and checks that the
+controllers' idea of where their cursors are matches the simulated game.
+
+    python -m benchmarks.menu_navigation --matches 1000 --workshop 500
+"""
+import argparse
+import asyncio
+import random
+import time
+from roabet.controller import Controllers
+from roabet.controller.simulation import SimulatedGame, run_virtual
+from roabet.db import Stage
+from .matchmaking import make_roster
+
+def make_game_data(workshop: int, rng: random.Random):
+    fighters = make_roster(workshop, rng)
+    for fighter in fighters:
+        fighter.load_time = rng.uniform(0.5, 3)
+    # official fighters in two rows under the workshop button, stages across stage select
+    official = make_roster(20, rng)
+    for i, fighter in enumerate(official):
+        fighter.id = f'official_{i}'
+        fighter.official = True
+        fighter.select_x, fighter.select_y = 100 + 80 * (i % 10), 170 + 50 * (i // 10)
+    stages = [Stage({'id': f'stage_{i}', 'name': f'Stage {i}', 'official': True,
+        'select_x': 120 + 150 * (i % 5), 'select_y': 200 + 90 * (i // 5)}) for i in range(15)]
+    return fighters + official, stages
+
+def cursor_error(game: SimulatedGame, controllers: Controllers) -> float:
+    return max(max(abs(player.cursor_x - game.cursor(player.num)[0]), abs(player.cursor_y - game.cursor(player.num)[1]))
+        for player in controllers.players)
+
+async def session(args, parallel: bool, rng: random.Random) -> dict:
+    fighters, stages = make_game_data(args.workshop, rng)
+    game = SimulatedGame(fighters, stages, pixels_per_second=440 * (1 + args.speed_error))
+    controllers = Controllers(2, parallel_select=parallel, backend_factory=game.gamepad)
+    controllers.set_workshop_length(args.workshop)
+    loop = asyncio.get_running_loop()
+
+    await controllers.init_local_play()
+    await controllers.init_com_players()
+    await controllers.each_player(lambda p: p.set_difficulty(9))
+    await controllers.change_settings(stock=3, time=5)
+    mismatches = sum((
+        [p.difficulty for p in game.players] != [9, 9],
+        (game.stock, game.time) != (3, 5),
+    ))
+
+    stats = {'menu_time': 0.0, 'presses': 0, 'max_cursor_error': cursor_error(game, controllers)}
+    presses_before = game.presses
+    for _ in range(args.matches):
+        picked = rng.sample(fighters, 2)
+        stage = rng.choice(stages)
+        start = loop.time()
+        await controllers.select_fighters(*picked)
+        await controllers.confirm_fighters()
+        await controllers.select_stage(stage)
+        stats['menu_time'] += loop.time() - start
+
+        stats['max_cursor_error'] = max(stats['max_cursor_error'], cursor_error(game, controllers))
+        mismatches += game.stage is not stage
+        mismatches += [p.selected for p in game.players] != picked
+        mismatches += [p.workshop_slot for p in game.players] != [p.cursor_workshop for p in controllers.players]
+        game.end_match()
+        controllers.reset_cursor_pos()
+
+    stats['presses'] = game.presses - presses_before
+    stats['mismatches'] = mismatches
+    stats['problems'] = game.problems
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matches', type=int, default=1000)
+    parser.add_argument('--workshop', type=int, default=500, help="number of workshop fighters")
+    parser.add_argument('--speed-error', type=float, default=0.0,
+        help="how much faster the simulated cursor is than the controllers think, e.g. 0.02")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for parallel in (False, True):
+        start = time.perf_counter()
+        stats = run_virtual(session(args, parallel, random.Random(args.seed)))
+        wall = time.perf_counter() - start
+        menu = stats['menu_time'] / args.matches
+        print(f"{'parallel' if parallel else 'sequential':>10} select: {menu:6.2f} s of menus per match, "
+            f"{stats['presses'] / args.matches:5.1f} presses, simulated in {wall / args.matches * 1000:6.2f} ms "
+            f"({stats['menu_time'] / wall:,.0f}x real time); max cursor error {stats['max_cursor_error']:.1f} px, "
+            f"{stats['mismatches']} mismatches, {len(stats['problems'])} problems")
+        for problem in stats['problems'][:5]:
+            print(f"    {problem}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Measures what multi-frame result confirmation costs in detection latency and what it
+buys in rejected false positives. Every frame of a recording is scored once, then the
+scores are replayed through ResultVoter at several settings, with frame timestamps
+taken from the recording's frame rate.
+
+    python -m benchmarks.result_confirmation recordings/* --labels recordings/labels.json
+    python -m benchmarks.result_confirmation --synthetic 10 --glitches 3
+"""
+import argparse
+import json
+from pathlib import Path
+import tempfile
+import time
+from roabet.screenreader.confirmation import ResultVoter
+from roabet.screenreader.frame_source import open_replay
+from roabet.screenreader.win_detection import WinDetector
+from .frames import make_recordings
+
+SETTINGS = [
+    {'required': 1, 'window': 0},
+    {'required': 2, 'window': 0.25},
+    {'required': 3, 'window': 0.5},
+    {'required': 5, 'window': 0.5},
+]
+
+def score_recording(path, detector: WinDetector, region=None):
+    with open_replay(path, region=region) as source:
+        return [detector.score_frame(frame) for frame in source]
+
+def replay_votes(scores, voter: ResultVoter, fps: float):
+    """
+    Returns (frame index of the decision, decided winner, seconds from the start of the
+    streak of winning frames that led to the decision to the decision itself).
+    """
+    voter.reset()
+    streak_start = None
+    for i, frame_scores in enumerate(scores):
+        if frame_scores.winner is None:
+            streak_start = None
+        elif streak_start is None:
+            streak_start = i
+        result = voter.add(i / fps, frame_scores)
+        if result:
+            return i, result.winner, (i - streak_start) / fps
+    return None, None, None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='*', type=Path)
+    parser.add_argument('--labels', type=Path, help="JSON file mapping recording names to the expected winner")
+    parser.add_argument('--fps', type=float, default=25, help="frame rate the recordings were captured at")
+    parser.add_argument('--region', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'))
+    parser.add_argument('--synthetic', type=int, metavar='N', default=0,
+        help="also benchmark N generated recordings")
+    parser.add_argument('--glitches', type=int, default=2,
+        help="single-frame false results to put in each generated recording")
+    args = parser.parse_args()
+
+    labels = json.loads(args.labels.read_text()) if args.labels else {}
+    recordings = list(args.recordings)
+    detector = WinDetector(grayscale=True, roi=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            labels.update(make_recordings(tmp, args.synthetic, glitches=args.glitches))
+            recordings += sorted(Path(tmp).glob('*.npy'))
+        if not recordings:
+            parser.error("no recordings given; pass some or use --synthetic")
+        all_scores = {path.name: score_recording(path, detector, args.region) for path in recordings}
+
+    for settings in SETTINGS:
+        voter = ResultVoter(**settings)
+        correct = wrong = missed = 0
+        delays = []
+        start = time.process_time()
+        for name, scores in all_scores.items():
+            frame, winner, delay = replay_votes(scores, voter, args.fps)
+            if winner is None:
+                missed += 1
+                continue
+            delays.append(delay)
+            expected = labels.get(name)
+            if expected is not None:
+                if winner == expected:
+                    correct += 1
+                else:
+                    wrong += 1
+        cpu = time.process_time() - start
+        frames = sum(len(scores) for scores in all_scores.values())
+        delay = f"{sum(delays) / len(delays) * 1000:.0f} ms avg / {max(delays) * 1000:.0f} ms max" if delays else "n/a"
+        print(f"required={settings['required']} window={settings['window']}s: "
+            f"{correct} correct, {wrong} wrong, {missed} undecided; confirmation delay {delay}; "
+            f"voting {cpu / frames * 1e6:.1f} us CPU/frame")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
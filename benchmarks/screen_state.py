@@ -0,0 +1,89 @@
+"""
+Times ScreenClassifier on synthetic 960x540 frames of every screen at a few scales,
+and checks it tells them apart. Menu screens get a made-up marker image in a fixed
+spot (written out as their templates), results frames get the real "1st" text, and
+loading frames are near black.
+
+    python -m benchmarks.screen_state --frames 50 --scales 1 0.5 0.25
+"""
+import argparse
+from pathlib import Path
+import tempfile
+import time
+import cv2
+import numpy
+from roabet.screenreader.screen_state import ScreenClassifier, ScreenState
+
+WIDTH = 960
+HEIGHT = 540
+# where each menu screen's marker sits: x, y
+MARKERS = {
+    ScreenState.TITLE: (420, 60),
+    ScreenState.MAIN_MENU: (60, 240),
+    ScreenState.LOCAL_MENU: (800, 240),
+    ScreenState.CHARACTER_SELECT: (40, 20),
+    ScreenState.STAGE_SELECT: (700, 20),
+    ScreenState.IN_MATCH: (430, 470),
+}
+MARKER_SIZE = (96, 48)
+
+def blocky(rng: numpy.random.Generator, width: int, height: int, low: int, high: int, block: int=8):
+    # noise in blocks, so it still has structure after the frame is shrunk
+    small = rng.integers(low, high, (height // block + 1, width // block + 1, 3), dtype=numpy.uint8)
+    return cv2.resize(small, None, fx=block, fy=block, interpolation=cv2.INTER_NEAREST)[:height, :width].copy()
+
+def make_frame(state: ScreenState, rng: numpy.random.Generator, markers: dict, win_text):
+    if state == ScreenState.LOADING:
+        return rng.integers(0, 6, (HEIGHT, WIDTH, 3), dtype=numpy.uint8)
+    frame = blocky(rng, WIDTH, HEIGHT, 30, 200)
+    if state == ScreenState.RESULTS:
+        x = int(rng.integers(480, WIDTH - win_text.shape[1]))
+        y = int(rng.integers(70, 330 - win_text.shape[0]))
+        frame[y:y + win_text.shape[0], x:x + win_text.shape[1]] = win_text
+    elif state in markers:
+        x, y = MARKERS[state]
+        marker = markers[state]
+        frame[y:y + marker.shape[0], x:x + marker.shape[1]] = marker
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=50, help="frames per screen")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 0.5, 0.25])
+    parser.add_argument('--interval', type=float, default=0.2, help="polling interval to work out CPU use at")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(args.seed)
+    markers = {state: blocky(rng, *MARKER_SIZE, 0, 256) for state in MARKERS}
+    win_text = cv2.imread('img/1st_template.png', cv2.IMREAD_COLOR)
+    states = [state for state in ScreenState if state != ScreenState.UNKNOWN]
+    frames = [(state, make_frame(state, rng, markers, win_text)) for state in states for _ in range(args.frames)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        templates = {}
+        for state, marker in markers.items():
+            path = Path(directory) / f'{state.value}.png'
+            cv2.imwrite(str(path), marker)
+            x, y = MARKERS[state]
+            # search a little around the marker, like a real template's region would
+            templates[state.value] = {'path': str(path), 'region': [max(x - 20, 0), max(y - 20, 0),
+                MARKER_SIZE[0] + 40, MARKER_SIZE[1] + 40]}
+
+        for scale in args.scales:
+            classifier = ScreenClassifier(templates, scale=scale)
+            wrong = {}
+            start = time.perf_counter()
+            for state, frame in frames:
+                found = classifier.classify(frame)
+                if found != state:
+                    wrong[(state, found)] = wrong.get((state, found), 0) + 1
+            per_frame = (time.perf_counter() - start) / len(frames)
+            print(f"scale {scale:4}: {per_frame * 1000:6.2f} ms per frame "
+                f"(max {classifier.stats.max_latency * 1000:6.2f} ms, {per_frame / args.interval:6.2%} of a core "
+                f"polling every {args.interval} s), {sum(wrong.values())}/{len(frames)} wrong")
+            for (state, found), count in wrong.items():
+                print(f"    {count} {state.value} frames classified as {found.value}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Runs a SessionOrchestrator over simulated games with 1, 2, 4... sessions and reports
+aggregate matches per hour. Each session has its own SimulatedGame, Controllers and win
+detector reading replayed synthetic frames; all of them share one matchmaker and record
+into one database through a DatabaseWriter.
+
+This runs in real time, so the sessions really do compete for the CPU and the database.
+--speed makes menus, matches and the win detector's polling that many times faster
+(so a session puts that many times its real CPU load on the machine); matches per hour
+are reported both as measured and scaled back to game speed. Cursor timing errors grow
+with speed too, so keep it low: past about 3, missed presses start stalling sessions,
+which then drop out. Every recorded result is checked against what the games played.
+
+    python -m benchmarks.sessions --sessions 1 2 4 --duration 60 --speed 2
+"""
+import argparse
+import asyncio
+from collections import Counter
+import contextlib
+import io
+from pathlib import Path
+import random
+import tempfile
+import time
+import cv2
+import numpy
+from roabet import connect
+from roabet.controller import Controllers
+from roabet.controller.motion import PIXELS_PER_SECOND
+from roabet.controller.simulation import SimulatedGame, SimulatedScreen, SimulatedScreenWatcher
+from roabet.controller.timeline import PRESS_GAP, PRESS_HOLD
+from roabet.db import DatabaseReader, DatabaseWriter, Fighters, Matches, PhaseTimer, Stages, schema
+from roabet.screenreader.confirmation import ResultVoter
+from roabet.screenreader.polling import PollingPolicy
+from roabet.screenreader.win_detection import WinDetector
+from roabet.screenreader.win_detector_service import WinDetectorService
+from roabet.sessions import Session, SessionOrchestrator, SharedMatchmaker
+from .db_queries import seed
+from .frames import make_recording
+from .menu_navigation import make_game_data
+
+def load_frames(directory: Path, result_frames: int=25) -> dict[str, list[numpy.ndarray]]:
+    frames = {}
+    for winner in (1, 2):
+        stack = numpy.load(make_recording(directory / f'winner_{winner}.npy', winner, frames=100,
+            result_frames=result_frames, seed=winner))
+        # the win detector runs in its cheapest mode: grayscale, with roi
+        gray = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in stack]
+        frames['match'] = gray[:-result_frames]
+        frames[f'results_{winner}'] = gray[-result_frames:]
+    return frames
+
+def make_session(num: int, fighters: Fighters, stages: Stages, writer: DatabaseWriter, frames, args,
+        rng: random.Random) -> tuple[Session, SimulatedGame]:
+    speed = args.speed
+    game = SimulatedGame(fighters.fighters.values(), stages.stages, pixels_per_second=PIXELS_PER_SECOND * speed,
+        match_time=args.match_time / speed, results_time=args.results_time / speed, rng=rng)
+    controllers = Controllers(2, pixels_per_second=PIXELS_PER_SECOND * speed, select_stagger=0.05 / speed,
+        backend_factory=game.gamepad, press_hold=PRESS_HOLD / speed, press_gap=PRESS_GAP / speed,
+        input_tick=1 / 120 / speed,
+        screen_watcher=SimulatedScreenWatcher(game, interval=0.2 / speed))
+    # confirming a result takes a few frames' CPU time, which doesn't speed up, so the voter runs at game speed
+    win_detector = WinDetectorService(SimulatedScreen(game, frames, poll_interval=0.04 / speed),
+        WinDetector(grayscale=True, roi=True),
+        policy=PollingPolicy(match_time=args.match_time / speed, quiet_period=args.match_time / 4 / speed,
+            early_interval=0.5 / speed, late_interval=0.1 / speed, burst_interval=0.04 / speed,
+            burst_duration=3 / speed),
+        voter=ResultVoter())
+    return Session(controllers, win_detector, PhaseTimer(writer), name=f'session {num}',
+        result_timeout=args.match_time * 3 / speed), game
+
+async def run(path: str, sessions: int, frames, args) -> dict:
+    rng = random.Random(args.seed)
+    con = connect(path)
+    writer = DatabaseWriter(path)
+    reader = DatabaseReader(path)
+    fighters = Fighters(con=con)
+    stages = Stages(con)
+    orchestrator = SessionOrchestrator(SharedMatchmaker(fighters, rng), stages, Matches(writer), reader)
+    games = []
+    for i in range(sessions):
+        session, game = make_session(i + 1, fighters, stages, writer, frames, args, random.Random(rng.random()))
+        orchestrator.add(session)
+        games.append(game)
+
+    # the sessions print as they go; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        await orchestrator.start(len(fighters.fighters))
+        asyncio.get_running_loop().call_later(args.duration, orchestrator.stop)
+        await orchestrator.run()
+        per_hour = orchestrator.matches_per_hour()
+        for session in orchestrator.sessions:
+            session.stop()
+    writer.close()
+    reader.close()
+
+    recorded = Counter(((row['player1'], row['player2']), row['winner'])
+        for row in con.execute("SELECT player1, player2, winner FROM matches"))
+    played = Counter(result for game in games for result in game.results)
+    con.close()
+    return {
+        'matches': orchestrator.total_matches,
+        'per_hour': per_hour,
+        'mismatches': sum((recorded - played).values()) + sum((played - recorded).values()),
+        'problems': [problem for game in games for problem in game.problems],
+        'commits': writer.batches,
+        'dropped': sum(game.screen != 'character_select' for game in games),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=60, help="real seconds to run each session count for")
+    parser.add_argument('--speed', type=float, default=2, help="how many times faster than the real game to run")
+    parser.add_argument('--match-time', type=float, default=60, help="seconds each match lasts at game speed")
+    parser.add_argument('--results-time', type=float, default=10, help="seconds on the results screen at game speed")
+    parser.add_argument('--fighters', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = load_frames(Path(tmp))
+        baseline = None
+        for sessions in args.sessions:
+            path = str(Path(tmp) / f'sessions_{sessions}.sqlite3')
+            con = connect(path)
+            schema.migrate(con)
+            seed(con, args.fighters, 0, 5000, random.Random(args.seed))
+            _, stages = make_game_data(0, random.Random(args.seed))
+            con.executemany("INSERT INTO stages (id, name, official, select_x, select_y) VALUES (?, ?, ?, ?, ?)",
+                ((stage.id, stage.name, stage.official, stage.select_x, stage.select_y) for stage in stages))
+            con.commit()
+            con.close()
+
+            start = time.perf_counter()
+            stats = asyncio.run(run(path, sessions, frames, args))
+            wall = time.perf_counter() - start
+            game_speed = stats['per_hour'] / args.speed
+            baseline = baseline or game_speed
+            print(f"{sessions:2d} sessions: {stats['matches']:4d} matches in {wall:5.1f} s, "
+                f"{stats['per_hour']:7.1f}/h measured, {game_speed:5.1f}/h at game speed "
+                f"({game_speed / baseline if baseline else 0:.2f}x), {stats['commits']} commits, "
+                f"{stats['mismatches']} mismatches, {len(stats['problems'])} problems, {stats['dropped']} dropped")
+            for problem in stats['problems'][:5]:
+                print(f"    {problem}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
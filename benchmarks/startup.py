@@ -0,0 +1,82 @@
+"""
+Measures how long the main entry points take to import, each in a fresh interpreter with
+-X importtime, and checks them against a budget. Also checks that nothing is loaded that
+the module shouldn't need: importing roabet mustn't read config.yaml or open the
+database, the reports mustn't pull in numpy or asyncio, and the controllers mustn't
+pull in OpenCV.
+
+roabet.__main__ starts the bot when it's imported, so roabet.sessions and
+roabet.controller stand in for it.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# module: (budget in ms, modules it mustn't import)
+BUDGETS = {
+    'roabet': (40, ('yaml', 'asyncio', 'numpy', 'cv2')),
+    'roabet.db': (80, ('yaml', 'asyncio', 'numpy', 'cv2')),
+    'roabet.controller': (180, ('yaml', 'numpy', 'cv2')),
+    'roabet.sessions': (180, ('yaml', 'numpy', 'cv2')),
+    'db_actions.report': (60, ('yaml', 'asyncio', 'numpy', 'cv2')),
+    'db_actions.load_times': (60, ('yaml', 'asyncio', 'numpy', 'cv2')),
+    'db_actions.update_glicko': (250, ('yaml', 'asyncio', 'cv2')),
+}
+# wall time for `python -m db_actions --help`, over a bare interpreter's
+HELP_BUDGET = 100
+
+def import_time(module: str) -> tuple[float, set[str]]:
+    """
+    Returns the cumulative import time of module in seconds, and every module it imported.
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True).stderr
+    imported = set()
+    total = None
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            total = int(cumulative) / 1e6
+    return total, imported
+
+def wall_time(args: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], capture_output=True, check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="imports per module; the median is reported")
+    args = parser.parse_args()
+
+    failed = False
+    for module, (budget, forbidden) in BUDGETS.items():
+        times = []
+        for _ in range(args.runs):
+            seconds, imported = import_time(module)
+            times.append(seconds)
+        median = statistics.median(times) * 1000
+        loaded = sorted(name for name in forbidden if name in imported)
+        verdict = 'PASS' if median <= budget and not loaded else 'FAIL'
+        failed |= verdict == 'FAIL'
+        print(f"{module:26s} {median:6.1f} ms (budget {budget} ms)"
+            f"{', imports ' + ', '.join(loaded) if loaded else ''}  {verdict}")
+
+    bare = statistics.median(wall_time(['-c', 'pass']) for _ in range(args.runs)) * 1000
+    help_time = statistics.median(wall_time(['-m', 'db_actions', '--help']) for _ in range(args.runs)) * 1000
+    verdict = 'PASS' if help_time - bare <= HELP_BUDGET else 'FAIL'
+    failed |= verdict == 'FAIL'
+    print(f"{'db_actions --help':26s} {help_time:6.1f} ms wall, {help_time - bare:.1f} ms over a bare interpreter "
+        f"(budget {HELP_BUDGET} ms)  {verdict}")
+    raise SystemExit(failed)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
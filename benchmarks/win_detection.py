@@ -0,0 +1,103 @@
+"""
+Measures win detection throughput, per-frame CPU time and accuracy on recorded
+match endings, for each WinDetector mode. Recordings can be PNG directories,
+.npy stacks or video files; see roabet.screenreader.frame_source.
+
+    python -m benchmarks.win_detection recordings/* --labels recordings/labels.json
+    python -m benchmarks.win_detection --synthetic 10
+
+labels.json maps a recording's file name to the player (1 or 2) who won.
+"""
+import argparse
+import json
+from pathlib import Path
+import tempfile
+import time
+from roabet.screenreader.frame_source import open_replay
+from roabet.screenreader.win_detection import WinDetector
+from .frames import make_recordings
+
+MODES = {
+    'legacy': {},
+    'gray': {'grayscale': True},
+    'gray+roi': {'grayscale': True, 'roi': True},
+    'gray+roi+pyramid': {'grayscale': True, 'roi': True, 'pyramid': True},
+}
+
+def run_recording(path, detector: WinDetector, region=None):
+    """
+    Runs the detector over every frame of a recording.
+    Returns (frames, wall seconds, CPU seconds, detected winner, index of the first detecting frame).
+    """
+    frames = 0
+    wall_time = 0.0
+    cpu_time = 0.0
+    winner = None
+    first_hit = None
+    with open_replay(path, region=region) as source:
+        for frame in source:
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            result = detector.find_win_text(frame)
+            cpu_time += time.process_time() - cpu_start
+            wall_time += time.perf_counter() - wall_start
+            if result and winner is None:
+                winner = result
+                first_hit = frames
+            frames += 1
+    return frames, wall_time, cpu_time, winner, first_hit
+
+def run_mode(name, detector, recordings, labels, region=None, verbose=False):
+    total_frames = 0
+    total_wall = 0.0
+    total_cpu = 0.0
+    correct = 0
+    labelled = 0
+    for path in recordings:
+        frames, wall_time, cpu_time, winner, first_hit = run_recording(path, detector, region)
+        total_frames += frames
+        total_wall += wall_time
+        total_cpu += cpu_time
+        expected = labels.get(path.name)
+        verdict = ""
+        if expected is not None:
+            labelled += 1
+            correct += winner == expected
+            verdict = "ok" if winner == expected else f"WRONG (expected {expected})"
+        if verbose:
+            print(f"  {path.name}: {frames} frames, winner={winner} at frame {first_hit} {verdict}")
+
+    if not total_frames:
+        print(f"{name}: no frames")
+        return
+    accuracy = f", accuracy {correct}/{labelled}" if labelled else ""
+    print(f"{name:>18}: {total_frames / total_wall:8.1f} frames/s, "
+        f"{total_cpu / total_frames * 1000:6.2f} ms CPU/frame{accuracy}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='*', type=Path)
+    parser.add_argument('--labels', type=Path, help="JSON file mapping recording names to the expected winner")
+    parser.add_argument('--region', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'),
+        help="crop frames to this region before detecting (for full-window recordings)")
+    parser.add_argument('--synthetic', type=int, metavar='N', default=0,
+        help="also benchmark N generated recordings")
+    parser.add_argument('--mode', choices=MODES, action='append', help="only run these modes")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    labels = json.loads(args.labels.read_text()) if args.labels else {}
+    recordings = list(args.recordings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            labels.update(make_recordings(tmp, args.synthetic))
+            recordings += sorted(Path(tmp).glob('*.npy'))
+        if not recordings:
+            parser.error("no recordings given; pass some or use --synthetic")
+
+        for name in args.mode or MODES:
+            run_mode(name, WinDetector(**MODES[name]), recordings, labels, args.region, args.verbose)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Checks workshop_grid's press sequences on a simulated condensed workshop grid and
+compares how many presses a selection takes against the old page-then-D-pad routine.
+Every press is a 0.3 s press_button, so presses are also reported in seconds.
+
+    python -m benchmarks.workshop_nav --sizes 50 200 500 1000 2000
+"""
+import argparse
+import random
+from roabet.controller import workshop_grid
+from roabet.controller.backend import BUTTONS
+
+PRESS_TIME = 0.3
+
+class SimulatedGrid:
+    """
+    The grid as the game draws it, written separately from workshop_grid.step: a list
+    of pages, each a list of columns of slot numbers.
+    """
+    def __init__(self, workshop_length: int):
+        slots = list(range(workshop_length + 1))
+        self.pages = [[slots[p + c:p + c + 4] for c in range(0, 16, 4) if slots[p + c:p + c + 4]]
+            for p in range(0, len(slots), 16)]
+        self.page, self.column, self.row = 0, 0, 0
+
+    @property
+    def slot(self) -> int:
+        return self.pages[self.page][self.column][self.row]
+
+    def move_to(self, slot: int):
+        self.page, within = divmod(slot, 16)
+        self.column, self.row = divmod(within, 4)
+
+    def press(self, button):
+        if button in (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER, BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER):
+            self.page = (self.page + (1 if button == BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER else -1)) % len(self.pages)
+            columns = self.pages[self.page]
+            if self.column >= len(columns) or self.row >= len(columns[self.column]):
+                self.column, self.row = len(columns) - 1, len(columns[-1]) - 1
+            return
+        column, row = self.column, self.row
+        if button == BUTTONS.XUSB_GAMEPAD_DPAD_UP:
+            row -= 1
+        elif button == BUTTONS.XUSB_GAMEPAD_DPAD_DOWN:
+            row += 1
+        elif button == BUTTONS.XUSB_GAMEPAD_DPAD_LEFT:
+            column -= 1
+        elif button == BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT:
+            column += 1
+        columns = self.pages[self.page]
+        if 0 <= column < len(columns) and 0 <= row < len(columns[column]):
+            self.column, self.row = column, row
+
+def legacy_presses(workshop_length: int, from_index: int, to_index: int) -> list:
+    """
+    The presses the old Player.select_character made.
+    """
+    current_z, current_x, current_y = from_index // 16, (from_index % 16) // 4, from_index % 4
+    target_z, target_x, target_y = to_index // 16, (to_index % 16) // 4, to_index % 4
+    max_z = workshop_length // 16
+    last_page_length = ((workshop_length + 1) % 16) or 16
+
+    presses = []
+    if target_z != current_z:
+        if min(current_z, target_z) + max_z + 1 - max(current_z, target_z) < abs(current_z - target_z):
+            direction = (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER if current_z > target_z
+                else BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER)
+            magnitude = min(current_z, target_z) + max_z + 1 - max(current_z, target_z)
+            if current_x * 4 + current_y >= last_page_length:
+                current_x, current_y = (last_page_length - 1) // 4, (last_page_length - 1) % 4
+        else:
+            direction = (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER if current_z < target_z
+                else BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER)
+            magnitude = abs(current_z - target_z)
+            if target_z == max_z and current_x * 4 + current_y >= last_page_length:
+                current_x, current_y = (last_page_length - 1) // 4, (last_page_length - 1) % 4
+        presses += [direction] * magnitude
+    if current_y > target_y:
+        presses += [BUTTONS.XUSB_GAMEPAD_DPAD_UP] * (current_y - target_y)
+    presses += [BUTTONS.XUSB_GAMEPAD_DPAD_LEFT if target_x < current_x
+        else BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT] * abs(target_x - current_x)
+    if current_y < target_y:
+        presses += [BUTTONS.XUSB_GAMEPAD_DPAD_DOWN] * (target_y - current_y)
+    return presses
+
+def run(grid: SimulatedGrid, from_index: int, presses) -> int:
+    grid.move_to(from_index)
+    for button in presses:
+        grid.press(button)
+    return grid.slot
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 500, 1000, 2000])
+    parser.add_argument('--selections', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+
+    # every pair on small grids, including the awkward last pages, against the step model too
+    for n in range(1, 50):
+        grid = SimulatedGrid(n)
+        for from_index in range(n + 1):
+            for button in workshop_grid.MOVES:
+                failures += run(grid, from_index, (button,)) != workshop_grid.step(n, from_index, button)
+            for to_index in range(n + 1):
+                failures += run(grid, from_index, workshop_grid.shortest_presses(n, from_index, to_index)) != to_index
+    print(f"exhaustive check on 1-49 fighters: {failures} failures")
+
+    for n in args.sizes:
+        grid = SimulatedGrid(n)
+        # the cursor stays where the last selection left it, like Player.cursor_workshop
+        current = 0
+        new_presses = legacy_count = legacy_misses = longer = 0
+        for _ in range(args.selections):
+            target = rng.randint(1, n)
+            presses = workshop_grid.shortest_presses(n, current, target)
+            failures += run(grid, current, presses) != target
+            legacy = legacy_presses(n, current, target)
+            legacy_misses += run(grid, current, legacy) != target
+            longer += len(presses) > len(legacy)
+            new_presses += len(presses)
+            legacy_count += len(legacy)
+            current = target
+        new_avg = new_presses / args.selections
+        legacy_avg = legacy_count / args.selections
+        print(f"{n:>5} fighters: {new_avg:5.2f} presses ({new_avg * PRESS_TIME:5.2f} s) per selection, "
+            f"legacy {legacy_avg:5.2f} ({legacy_avg * PRESS_TIME:5.2f} s), "
+            f"legacy missed the target {legacy_misses} times, {longer} paths longer than legacy")
+    print(f"{failures} failures in total")
+    raise SystemExit(bool(failures))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Builds a synthetic workshop content directory of thousands of fighter folders and times
+importing it: one import_workshop_fighter call per folder (the old way), then a bulk
+sync-workshop into a fresh database, a second sync with nothing changed, and one after
+rewriting a few folders' config.ini. Plenty of fighters share a name, so id conflicts
+get resolved along the way. The resulting fighters are checked after every step.
+
+    python -m benchmarks.workshop_sync --folders 3000 --threads 1 8
+"""
+import argparse
+import contextlib
+import io
+import os
+from pathlib import Path
+import random
+import tempfile
+import time
+from roabet.context import connect, context
+from roabet.db import schema
+from db_actions.import_workshop_fighter import import_workshop_fighter
+from db_actions.sync_workshop import sync_workshop_dir
+
+NAMES = ('Goku', 'Sonic', 'Sandbert', 'Guadua', 'Ronald McDonald', 'Peacock', 'Hime Daisy', 'Acid Rainbows',
+    'Mario', 'Kirby', 'Trummel & Alto', 'Uza', 'Pomme', 'Olympia', 'Pikachu')
+
+def write_config(folder: Path, name: str, author: str, version: int):
+    folder.mkdir(exist_ok=True)
+    (folder / 'config.ini').write_text(
+        f'[general]\nname="{name}"\nauthor="{author}"\ndescription="A fighter for the benchmark."\n'
+        f'type="0"\nmajor version="{version}"\nminor version="0"\nfinal="1"\n')
+
+def make_workshop(directory: Path, folders: int, rng: random.Random) -> list[str]:
+    steam_ids = [str(id) for id in rng.sample(range(1_000_000_000, 3_000_000_000), folders)]
+    for steam_id in steam_ids:
+        # a third of the fighters share a handful of names; the rest are unique
+        name = rng.choice(NAMES) if rng.random() < 0.3 else f"Fighter {steam_id}"
+        write_config(directory / steam_id, name, f"author {rng.randrange(500)}", 1)
+    # a folder Steam hasn't finished downloading
+    (directory / 'incomplete').mkdir()
+    return steam_ids
+
+def fresh_db(path: Path):
+    if path.exists():
+        path.unlink()
+    con = connect(str(path))
+    schema.migrate(con)
+    return con
+
+def check(con, steam_ids: list[str]) -> str:
+    rows = con.execute("SELECT id, steam_id, workshop_index FROM fighters").fetchall()
+    problems = []
+    if sorted(row['steam_id'] for row in rows) != sorted(steam_ids):
+        problems.append(f"{len(rows)} fighters for {len(steam_ids)} folders")
+    if len({row['workshop_index'] for row in rows}) != len(rows):
+        problems.append("duplicate workshop indexes")
+    return ', '.join(problems) or 'ok'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folders', type=int, default=3000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--touch', type=float, default=0.02, help="fraction of folders to rewrite before the last sync")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workshop = Path(tmp) / 'workshop'
+        workshop.mkdir()
+        steam_ids = make_workshop(workshop, args.folders, rng)
+        path = Path(tmp) / 'sync.sqlite3'
+
+        context.config = {'steam_dir': '', 'workshop_path': str(workshop), 'basic_mode': False}
+        context.db = fresh_db(path)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for steam_id in steam_ids:
+                import_workshop_fighter(steam_id)
+        baseline = time.perf_counter() - start
+        print(f"one at a time:        {baseline:7.3f} s  {check(context.db, steam_ids)}")
+        context.close()
+
+        for threads in args.threads:
+            con = fresh_db(path)
+            start = time.perf_counter()
+            result = sync_workshop_dir(con, workshop, threads=threads)
+            cold = time.perf_counter() - start
+            print(f"sync, {threads:2d} threads:     {cold:7.3f} s  ({baseline / cold:5.1f}x)  "
+                f"{len(result.added)} added, {len(result.failed)} failed  {check(con, steam_ids)}")
+            con.close()
+
+        # the database from the last run is the one the incremental syncs go against
+        con = connect(str(path))
+        start = time.perf_counter()
+        result = sync_workshop_dir(con, workshop, threads=args.threads[-1])
+        elapsed = time.perf_counter() - start
+        print(f"resync, no changes:   {elapsed:7.3f} s  ({baseline / elapsed:5.1f}x)  "
+            f"{result.skipped} skipped, {len(result.added) + result.updated} written  {check(con, steam_ids)}")
+
+        touched = rng.sample(steam_ids, int(len(steam_ids) * args.touch))
+        for steam_id in touched:
+            write_config(workshop / steam_id, "Renamed", "new author", 2)
+            # make sure the mtime moves even on filesystems with coarse timestamps
+            stat = os.stat(workshop / steam_id / 'config.ini')
+            os.utime(workshop / steam_id / 'config.ini', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        start = time.perf_counter()
+        result = sync_workshop_dir(con, workshop, threads=args.threads[-1])
+        elapsed = time.perf_counter() - start
+        authors = con.execute(f"SELECT COUNT(*) FROM fighters WHERE author = 'new author'").fetchone()[0]
+        print(f"resync, {len(touched)} touched:  {elapsed:7.3f} s  ({baseline / elapsed:5.1f}x)  "
+            f"{result.updated} updated, {authors} with the new author  {check(con, steam_ids)}")
+        con.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,3 +1,122 @@
-from . import *
-
+import argparse
 import sys
+
+def migrate(args):
+    from roabet.context import context
+    from roabet.db import schema
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to migrate")
+    before = schema.schema_version(context.db)
+    applied = schema.migrate(context.db)
+    if applied:
+        print(f"Migrated from schema version {before} to {applied[-1]}")
+    else:
+        print(f"Already at schema version {before}")
+
+def load_times(args):
+    from roabet.context import context
+    from .load_times import load_time_report
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to report on")
+    load_time_report(args.matches)
+
+def report(args):
+    from roabet.context import context
+    from .report import timing_report
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to report on")
+    timing_report(args.hours)
+
+def sync_workshop(args):
+    from pathlib import Path
+    from roabet.context import context
+    from .sync_workshop import print_sync, sync_workshop_dir
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to sync into")
+    workshop_dir = Path(context.config['steam_dir']) / context.config['workshop_path']
+    print_sync(sync_workshop_dir(context.db, workshop_dir, threads=args.threads, full=args.full))
+
+def leaderboard(args):
+    from roabet.context import context
+    from .leaderboard import print_leaderboard
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to report on")
+    print_leaderboard(args.top, args.offset)
+
+def history(args):
+    from datetime import datetime
+    from roabet.context import context
+    from .leaderboard import print_history
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no database to report on")
+    print_history(args.fighter, datetime.fromisoformat(args.at) if args.at else None)
+
+def sweep(args):
+    from roabet.context import context
+    from .glicko_sweep import load_history, make_grid, print_sweep, sweep as run_sweep
+    if context.basic_mode:
+        sys.exit("basic_mode is on, so there's no match history to replay")
+    history = load_history(context.db, args.cycle_matches)
+    results = run_sweep(history, make_grid(args.t_star, args.min_dev, args.max_dev), holdout=args.holdout,
+        processes=args.processes)
+    print_sweep(history, results)
+
+def simulate(args):
+    from .matchmaking_sim import SimParams, print_simulations, run_simulations
+    params = SimParams(args.fighters, args.new_fighters, args.matches, args.cycle_matches, args.dev_range,
+        args.dev_range_growth, args.spread)
+    print_simulations(params, run_simulations(params, range(args.seed, args.seed + args.runs), args.processes))
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m db_actions')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="create or upgrade the database schema").set_defaults(func=migrate)
+    load_times_parser = commands.add_parser('load-times', help="report learned workshop fighter load times")
+    load_times_parser.set_defaults(func=load_times)
+    load_times_parser.add_argument('--matches', type=int, default=1000,
+        help="how many recent matches to count fighter picks over")
+    report_parser = commands.add_parser('report', help="report match loop phase timings and throughput")
+    report_parser.set_defaults(func=report)
+    report_parser.add_argument('--hours', type=float, default=24, help="how far back to report on")
+    sync_parser = commands.add_parser('sync-workshop', help="import new and changed workshop fighters")
+    sync_parser.set_defaults(func=sync_workshop)
+    sync_parser.add_argument('--threads', type=int, default=8, help="how many config.ini files to read at once")
+    sync_parser.add_argument('--full', action='store_true',
+        help="read every config.ini again, even ones that haven't changed since the last sync")
+    leaderboard_parser = commands.add_parser('leaderboard', help="show the current standings")
+    leaderboard_parser.set_defaults(func=leaderboard)
+    leaderboard_parser.add_argument('--top', type=int, default=20, help="how many fighters to show")
+    leaderboard_parser.add_argument('--offset', type=int, default=0, help="how many ranks to skip")
+    history_parser = commands.add_parser('history', help="show a fighter's rating at the end of each cycle")
+    history_parser.set_defaults(func=history)
+    history_parser.add_argument('fighter', help="the fighter's id")
+    history_parser.add_argument('--at', help="only show its rating as of this date and time, e.g. 2024-05-01T12:00")
+    sweep_parser = commands.add_parser('sweep', help="replay the match history under other Glicko constants")
+    sweep_parser.set_defaults(func=sweep)
+    sweep_parser.add_argument('--t-star', type=float, nargs='+', default=[10, 30, 100],
+        help="rating cycles for a deviation to grow back from min-dev to max-dev")
+    sweep_parser.add_argument('--min-dev', type=float, nargs='+', default=[30, 50, 70])
+    sweep_parser.add_argument('--max-dev', type=float, nargs='+', default=[250, 350],
+        help="deviation of a new fighter, and the most a deviation can grow to")
+    sweep_parser.add_argument('--holdout', type=float, default=0.2, help="fraction of cycles to score on, from the end")
+    sweep_parser.add_argument('--cycle-matches', type=int,
+        help="replay with a cycle every this many matches instead of the real cycles")
+    sweep_parser.add_argument('--processes', type=int, help="worker processes (default: one per CPU)")
+    simulate_parser = commands.add_parser('simulate', help="simulate the matchmaker and ratings on synthetic fighters")
+    simulate_parser.set_defaults(func=simulate)
+    simulate_parser.add_argument('--runs', type=int, default=8, help="independent runs, each with its own seed")
+    simulate_parser.add_argument('--matches', type=int, default=20000, help="matches per run")
+    simulate_parser.add_argument('--cycle-matches', type=int, default=500, help="close a rating cycle every this many matches")
+    simulate_parser.add_argument('--fighters', type=int, default=500, help="settled fighters, rated near their true strength")
+    simulate_parser.add_argument('--new-fighters', type=int, default=50, help="new fighters, starting at the default rating")
+    simulate_parser.add_argument('--dev-range', type=float, default=2.0)
+    simulate_parser.add_argument('--dev-range-growth', type=float, default=1.5)
+    simulate_parser.add_argument('--spread', type=float, default=300, help="standard deviation of true strengths")
+    simulate_parser.add_argument('--seed', type=int, default=0)
+    simulate_parser.add_argument('--processes', type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    args.func(args)
+
+# sweep's worker processes import this module again on Windows
+if __name__ == "__main__":
+    main()
\ No newline at end of file
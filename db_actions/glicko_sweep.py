@@ -0,0 +1,163 @@
+"""
+Replays every rating cycle in the match history under other Glicko constants, to see
+which ones predict results best.
+
+The history is read once and saved as a memory-mapped array, which a pool of processes
+shares read-only; each process replays whole parameter sets with glicko_batch. A set is
+scored by its log-loss on the held-out matches: those in the last cycles, each predicted
+from the ratings at the start of its cycle, the way matchmaking sees them.
+
+    python -m db_actions sweep --t-star 10 30 100 --min-dev 30 50 70 --max-dev 250 350
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+from typing import NamedTuple, Optional
+import numpy
+from roabet.util import glicko, glicko_batch
+
+class GlickoParams(NamedTuple):
+    t_star: float = glicko.T_STAR
+    min_dev: float = glicko.MIN_DEVIATION
+    max_dev: float = glicko.DEFAULT_DEVIATION
+
+    @property
+    def c_squared(self) -> float:
+        return (self.max_dev**2 - self.min_dev**2) / self.t_star
+
+class History(NamedTuple):
+    # one row per rated match, in order: player1's index, player2's index, player1's score
+    matches: numpy.ndarray
+    # where each cycle's matches start in matches, plus the end of the last one
+    bounds: numpy.ndarray
+    fighters: list[str]
+
+class SweepResult(NamedTuple):
+    params: GlickoParams
+    log_loss: float
+    # how often the favourite won
+    accuracy: float
+    scored: int
+
+def load_history(con: sqlite3.Connection, cycle_matches: Optional[int]=None) -> History:
+    """
+    Reads every match between two rated fighters, split at the rating cycles' ends (or
+    every cycle_matches matches instead). Matches since the last cycle closed make a
+    final cycle of their own.
+    """
+    fighters = [row['id'] for row in con.execute("SELECT id FROM fighters WHERE NOT is_uber AND NOT is_potato ORDER BY id")]
+    index = {id: i for i, id in enumerate(fighters)}
+    ids = []
+    rows = []
+    for row in con.execute("SELECT id, player1, player2, winner FROM matches WHERE winner IN (1, 2) ORDER BY id"):
+        if row['player1'] in index and row['player2'] in index:
+            ids.append(row['id'])
+            rows.append((index[row['player1']], index[row['player2']], row['winner'] == 1))
+    matches = numpy.array(rows, dtype=numpy.int32).reshape(-1, 3)
+    if cycle_matches:
+        bounds = numpy.arange(0, len(matches), cycle_matches)
+    else:
+        ends = [row['last_match'] for row in con.execute("SELECT last_match FROM rating_cycles ORDER BY id")]
+        bounds = numpy.searchsorted(numpy.array(ids), ends, side='right')
+    bounds = numpy.unique(numpy.concatenate(([0], bounds, [len(matches)])))
+    return History(matches, bounds, fighters)
+
+def replay(matches: numpy.ndarray, bounds: numpy.ndarray, fighters: int, params: GlickoParams,
+        scored_from: int=0) -> tuple[numpy.ndarray, numpy.ndarray, float, float, int]:
+    """
+    Closes every cycle in turn from a fresh start, like update_glicko would have with
+    params. Matches from scored_from on are predicted before their cycle is applied.
+    Returns the final ratings and deviations, the summed log-loss, the number of
+    correctly favoured results (ties count half) and how many matches were scored.
+    """
+    ratings = numpy.full(fighters, glicko.DEFAULT_RATING, dtype=numpy.int64)
+    devs = numpy.full(fighters, params.max_dev, dtype=numpy.int64)
+    loss = 0.0
+    correct = 0.0
+    scored = 0
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        ratings, devs = glicko_batch.tick_ratings(ratings, devs, c_squared=params.c_squared, max_dev=params.max_dev)
+        cycle = numpy.asarray(matches[start:end])
+        player1, player2, score1 = cycle[:, 0], cycle[:, 1], cycle[:, 2].astype(numpy.float64)
+        if end > scored_from:
+            first = max(scored_from - start, 0)
+            p1, p2, s = player1[first:], player2[first:], score1[first:]
+            expected = expected_scores(ratings[p1], devs[p1], ratings[p2], devs[p2])
+            loss -= numpy.sum(s * numpy.log(expected) + (1 - s) * numpy.log1p(-expected))
+            correct += numpy.sum(numpy.where(expected == 0.5, 0.5, (expected > 0.5) == (s == 1)))
+            scored += len(s)
+        ratings, devs, _ = glicko_batch.update_ratings(ratings, devs, player1, player2, score1,
+            min_dev=params.min_dev)
+    return ratings, devs, float(loss), float(correct), scored
+
+def expected_scores(rating1, dev1, rating2, dev2) -> numpy.ndarray:
+    """
+    Glicko's predicted score for player 1, allowing for both players' deviations.
+    """
+    combined = numpy.sqrt(dev1.astype(numpy.float64)**2 + dev2**2)
+    g = (1 + 3*glicko.Q_SQUARED * combined**2 / glicko.PI_SQUARED)**-0.5
+    expected = 1 / (1 + 10**(-g * (rating1 - rating2) / 400))
+    return numpy.clip(expected, 1e-12, 1 - 1e-12)
+
+# the history each worker process replays, memory-mapped from the file sweep writes
+_history: dict = {}
+
+def _open_history(path: str, bounds: numpy.ndarray, fighters: int, scored_from: int):
+    _history.update(matches=numpy.load(path, mmap_mode='r'), bounds=bounds, fighters=fighters,
+        scored_from=scored_from)
+
+def _score(params: GlickoParams) -> SweepResult:
+    _, _, loss, correct, scored = replay(_history['matches'], _history['bounds'], _history['fighters'], params,
+        _history['scored_from'])
+    return SweepResult(params, loss / scored if scored else float('nan'), correct / scored if scored else float('nan'),
+        scored)
+
+def sweep(history: History, grid: list[GlickoParams], *, holdout: float=0.2,
+        processes: Optional[int]=None) -> list[SweepResult]:
+    """
+    Scores every parameter set in grid on the last holdout of history's cycles, best first.
+    With processes=1 everything runs in this process.
+    """
+    cycles = len(history.bounds) - 1
+    scored_from = int(history.bounds[min(int(cycles * (1 - holdout)), cycles - 1)]) if cycles else 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'matches.npy')
+        numpy.save(path, history.matches)
+        initargs = (path, history.bounds, len(history.fighters), scored_from)
+        if processes == 1:
+            _open_history(*initargs)
+            results = [_score(params) for params in grid]
+            _history.clear()
+        else:
+            with ProcessPoolExecutor(processes or os.cpu_count(), initializer=_open_history,
+                    initargs=initargs) as pool:
+                results = list(pool.map(_score, grid))
+    return sorted(results, key=lambda result: result.log_loss)
+
+def make_grid(t_stars, min_devs, max_devs) -> list[GlickoParams]:
+    return [GlickoParams(*values) for values in itertools.product(t_stars, min_devs, max_devs)
+        if values[1] < values[2]]
+
+def print_sweep(history: History, results: list[SweepResult], shown: int=15):
+    current = GlickoParams()
+    cycles = len(history.bounds) - 1
+    print(f"{len(history.matches)} rated matches in {cycles} cycles, {len(history.fighters)} fighters; "
+        f"scored on the last {results[0].scored if results else 0} matches")
+    if cycles < 5:
+        print(f"Only {cycles} cycles to learn from; --cycle-matches replays with shorter ones")
+    print(f"{'t_star':>7} {'min_dev':>8} {'max_dev':>8} {'log-loss':>9} {'accuracy':>9}")
+    for result in results[:shown]:
+        params = result.params
+        print(f"{params.t_star:7g} {params.min_dev:8g} {params.max_dev:8g} {result.log_loss:9.4f} "
+            f"{result.accuracy:9.1%}{'  (current)' if params == current else ''}")
+    if current not in [result.params for result in results[:shown]]:
+        for rank, result in enumerate(results, 1):
+            if result.params == current:
+                print(f"current constants rank {rank} of {len(results)}, log-loss {result.log_loss:.4f}")
+    # for scale: a coin flip scores log(2)
+    print(f"(a coin flip scores {numpy.log(2):.4f})")
\ No newline at end of file
@@ -3,8 +3,7 @@ from pathlib import Path
 import re
 import sqlite3
 import sys
-import yaml
-from roabet import config, db_con
+from roabet.context import context, load_yaml
 
 __all__ = ("import_workshop_fighter")
 
@@ -15,8 +14,7 @@ def to_id(s: str):
     return s
 
 def import_official_fighters():
-    with open('config/fighters.yaml') as f:
-        fighter_data = yaml.load(f, yaml.Loader)
+    fighter_data = load_yaml('config/fighters.yaml')
     
     con = sqlite3.connect('config/db/roabet.sqlite3')
     cur = con.cursor()
@@ -35,8 +33,7 @@ def import_official_fighters():
     con.close()
 
 def import_workshop_fighters_from_yaml():
-    with open('config/workshop_fighters.yaml') as f:
-        fighter_data: list[dict] = yaml.load(f, yaml.Loader)
+    fighter_data: list[dict] = load_yaml('config/workshop_fighters.yaml')
     
     con = sqlite3.connect('config/db/roabet.sqlite3')
     cur = con.cursor()
@@ -44,7 +41,7 @@ def import_workshop_fighters_from_yaml():
     i = 1
 
     for fighter in fighter_data:
-        configfile = Path(config['steam_dir']) / config['workshop_path'] / fighter['workshop_id'] / 'config.ini'
+        configfile = Path(context.config['steam_dir']) / context.config['workshop_path'] / fighter['workshop_id'] / 'config.ini'
         wsconfig = configparser.ConfigParser()
         wsconfig.read(configfile)
         wsdata = wsconfig['general']
@@ -60,43 +57,65 @@ def import_workshop_fighters_from_yaml():
     con.commit()
     con.close()
 
-def import_workshop_fighter(steam_id):
-    configfile: Path = Path(config['steam_dir']) / config['workshop_path'] / steam_id / 'config.ini'
-    if not configfile.exists():
-        raise FileNotFoundError(str(configfile))
-    wsconfig = configparser.ConfigParser()
-    wsconfig.read(configfile)
-    wsdata = wsconfig['general']
-    name = wsdata.get('name')
+# key = value (or key: value), as configparser reads them
+CONFIG_LINE = re.compile(r"([^=:]+?)\s*[=:]\s*(.*)")
+
+def read_workshop_config(text: str) -> tuple[str, str]:
+    """
+    Returns the name and author from a workshop fighter's config.ini. Only the general
+    section is looked at, which is a lot quicker than having configparser read it all.
+    """
+    section = None
+    general = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        if line[0] == '[' and line[-1] == ']':
+            section = line[1:-1].strip()
+        elif section == 'general' and (match := CONFIG_LINE.fullmatch(line)):
+            general.setdefault(match[1].lower(), match[2])
+    name = general.get('name')
     if name:
         name = re.sub(r'"(.*)"', r'\1', name)
-    if not name:
-        raise ValueError("That character has no name!")
-    author = wsdata.get('author')
+    author = general.get('author')
     if author:
         author = re.sub(r'"(.*)"', r'\1', author) or None
-    
+    return name, author
+
+def unique_id(name: str, taken: set[str]) -> str:
+    """
+    Picks an id for name that isn't in taken, and adds it to taken.
+    """
     base_id = id = to_id(name)
     id_extra = 1
-    
-    cur = db_con.execute("""
-        SELECT id FROM fighters
-        WHERE id = ?""", (id,))
-    while cur.fetchone():
+    while id in taken:
         # prevent conflicts
         id = base_id + "-" + str(id_extra)
-        cur = db_con.execute("""
-            SELECT id FROM fighters
-            WHERE id = ?""", (id,))
-
-    cur = db_con.execute("""
-        SELECT workshop_index FROM fighters
-        WHERE workshop_index >= 1
-        ORDER BY workshop_index DESC
-        LIMIT 1""")
+        id_extra += 1
+    taken.add(id)
+    return id
+
+def import_workshop_fighter(steam_id):
+    configfile: Path = Path(context.config['steam_dir']) / context.config['workshop_path'] / steam_id / 'config.ini'
+    if not configfile.exists():
+        raise FileNotFoundError(str(configfile))
+    name, author = read_workshop_config(configfile.read_text())
+    if not name:
+        raise ValueError("That character has no name!")
+
+    base_id = to_id(name)
+    taken = {row['id'] for row in context.db.execute("""
+        SELECT id FROM fighters
+        WHERE id = :id OR (id > :id || '-' AND id < :id || '.')""", {'id': base_id})}
+    id = unique_id(name, taken)
+
+    cur = context.db.execute("""
+        SELECT COALESCE(MAX(workshop_index), 0) AS workshop_index FROM fighters
+        WHERE workshop_index >= 1""")
     last_index = cur.fetchone()['workshop_index']
 
-    db_con.execute("""
+    context.db.execute("""
         INSERT INTO fighters (id, name, steam_id, author, workshop_index, select_x, select_y)
         VALUES (?, ?, ?, ?, ?, 513, 110)""",
         (id, name, steam_id, author, last_index + 1)
@@ -104,7 +123,7 @@ def import_workshop_fighter(steam_id):
 
     print(f"Successfully imported {name}")
 
-    db_con.commit()
+    context.db.commit()
 
 if __name__ == "__main__":
     match = re.search(r"id=(\d+)", sys.argv[1])
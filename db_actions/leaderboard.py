@@ -0,0 +1,37 @@
+from datetime import datetime
+from roabet.db.ratings import Leaderboard, rating_at, rating_history
+
+def print_leaderboard(n: int=20, offset: int=0):
+    entries = Leaderboard.top(n, offset)
+    if not entries:
+        print("The leaderboard is empty. It's filled from schema version 7 on, and kept up by the match loop.")
+        return
+    print(f"{'rank':>5} {'fighter':30} {'rating':>7} {'dev':>5} {'games':>6}")
+    for entry in entries:
+        print(f"{entry.rank:5} {entry.name[:30]:30} {entry.rating:7} {entry.deviation:5} {entry.games:6}")
+
+def print_history(fighter: str, at: datetime=None):
+    """
+    Prints the fighter's standing now and its rating at the end of each cycle, or only
+    its rating as of at.
+    """
+    if at is not None:
+        snapshot = rating_at(fighter, at)
+        if snapshot is None:
+            print(f"No rating snapshot for {fighter} from before {at}")
+        else:
+            print(f"{fighter} as of cycle {snapshot.cycle} (ended {snapshot.ended_at:%Y-%m-%d %H:%M}): "
+                f"{snapshot.rating} ± {snapshot.deviation}, {snapshot.games} games")
+        return
+
+    entry = Leaderboard.entry(fighter)
+    if entry is None:
+        print(f"{fighter} isn't on the leaderboard")
+    else:
+        print(f"{entry.name}: rank {entry.rank}, {entry.rating} ± {entry.deviation}, {entry.games} games")
+    history = rating_history(fighter)
+    if history:
+        print(f"{'cycle':>6} {'ended':16} {'rating':>7} {'dev':>5} {'games':>6}")
+    for snapshot in history:
+        print(f"{snapshot.cycle:6} {snapshot.ended_at:%Y-%m-%d %H:%M} {snapshot.rating:7} {snapshot.deviation:5} "
+            f"{snapshot.games:6}")
\ No newline at end of file
@@ -0,0 +1,45 @@
+from statistics import median
+from roabet.context import context
+
+def load_time_report(matches: int=1000):
+    """
+    Prints each workshop fighter's learned load time and how much waiting it saves
+    against the static load_time it was waited for before, based on how often fighters
+    were picked over the last matches matches.
+    """
+    fighters = {row['id']: row for row in context.db.execute(
+        "SELECT id, name, load_time, static_load_time FROM fighters WHERE NOT official")}
+    samples = {}
+    for row in context.db.execute("SELECT fighter, seconds FROM fighter_load_times ORDER BY id"):
+        samples.setdefault(row['fighter'], []).append(row['seconds'])
+    picks = {row['fighter']: row['picks'] for row in context.db.execute("""
+        SELECT fighter, COUNT(*) AS picks FROM (
+            SELECT player1 AS fighter FROM (SELECT player1 FROM matches ORDER BY id DESC LIMIT :n)
+            UNION ALL
+            SELECT player2 FROM (SELECT player2 FROM matches ORDER BY id DESC LIMIT :n)
+        )
+        GROUP BY fighter""", {'n': matches})}
+    played = context.db.execute("SELECT COUNT(*) FROM (SELECT id FROM matches ORDER BY id DESC LIMIT ?)",
+        (matches,)).fetchone()[0]
+
+    learned = {id: fighters[id]['load_time'] for id in samples if id in fighters}
+    if not learned:
+        print("No load times measured yet. Set load_detection.portrait_region in config.yaml to measure them.")
+        return
+    print(f"{len(learned)} of {len(fighters)} workshop fighters measured, "
+        f"{sum(len(s) for s in samples.values())} measurements")
+    print(f"{'fighter':30} {'loads':>6} {'median':>7} {'estimate':>9} {'static':>7} {'picks':>6}")
+    for id in sorted(learned, key=learned.get, reverse=True)[:15]:
+        print(f"{fighters[id]['name'][:30]:30} {len(samples[id]):6} {median(samples[id]):6.1f}s "
+            f"{learned[id]:8.1f}s {fighters[id]['static_load_time']:6.1f}s {picks.get(id, 0):6}")
+
+    if not played:
+        return
+    per_100 = 100 / played
+    saved = sum(picks.get(id, 0) * (fighters[id]['static_load_time'] - estimate)
+        for id, estimate in learned.items()) * per_100
+    detected = sum(picks.get(id, 0) * (estimate - median(samples[id])) for id, estimate in learned.items()) * per_100
+    # a negative saving means the static load_time was too short for the fighter to finish loading
+    print(f"Over the last {played} matches: learned load times save {saved:.0f} s per 100 matches "
+        f"against each fighter's static load_time,")
+    print(f"and waiting for the load to be seen saves another {detected:.0f} s per 100 matches on top.")
\ No newline at end of file
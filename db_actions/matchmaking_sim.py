@@ -0,0 +1,171 @@
+"""
+Monte Carlo simulation of the matchmaker and the rating system, to see how a change to
+either plays out without running the game for days.
+
+Each run gets a fresh in-memory database holding a settled roster and a batch of new
+workshop fighters, each with a hidden true strength. Matches are picked by the real
+SharedMatchmaker and Fighters, decided by a coin weighted by the two true strengths,
+recorded like the match loop records them, and every cycle_matches matches the cycle is
+closed with update_glicko. Runs with different seeds go to a process pool.
+
+    python -m db_actions simulate --runs 8 --matches 20000 --cycle-matches 500
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+from typing import NamedTuple, Optional
+import numpy
+from roabet.context import connect
+from roabet.db import Fighters, Matches, schema
+from roabet.db.stages import Stage
+from roabet.sessions import SharedMatchmaker
+from roabet.util import glicko
+from .update_glicko import update_glicko
+
+# how low a new fighter's deviation has to get to count as settled
+DEV_THRESHOLDS = (200, 150, 100, 75)
+# after how many of its matches a new fighter's rating error is measured
+CHECKPOINTS = (0, 5, 10, 20, 40, 80)
+STAGE = Stage({'id': 'simulated', 'name': 'Simulated', 'official': True, 'select_x': 0, 'select_y': 0})
+
+class SimParams(NamedTuple):
+    fighters: int = 500
+    new_fighters: int = 50
+    matches: int = 20000
+    cycle_matches: int = 500
+    dev_range: float = Fighters.dev_range
+    dev_range_growth: float = Fighters.dev_range_growth
+    # spread of true strengths, on the rating scale
+    spread: float = 300
+
+class SimResult(NamedTuple):
+    # the true win chance of the favourite in each match
+    favourite_odds: numpy.ndarray
+    # for each threshold, how many matches each new fighter took to get its deviation
+    # below it (None if it never did)
+    matches_to_dev: dict[int, list[Optional[int]]]
+    # for each checkpoint, each new fighter's |rating - true strength| after that many matches
+    rating_errors: dict[int, list[float]]
+    # how many times the matchmaker had to widen dev_range to find an opponent
+    widened: int
+
+def win_chance(strength1: float, strength2: float) -> float:
+    return 1 / (1 + 10 ** ((strength2 - strength1) / 400))
+
+def seed_roster(con, params: SimParams, rng: random.Random) -> dict[str, float]:
+    """
+    Adds a settled roster, rated close to its true strengths, and new fighters at the
+    default rating. Returns every fighter's true strength.
+    """
+    strength = {}
+    rows = []
+    for i in range(params.fighters + params.new_fighters):
+        new = i >= params.fighters
+        id = f'new_{i}' if new else f'fighter_{i}'
+        strength[id] = rng.gauss(glicko.DEFAULT_RATING, params.spread)
+        rating = glicko.DEFAULT_RATING if new else round(strength[id] + rng.gauss(0, 40))
+        dev = glicko.DEFAULT_DEVIATION if new else rng.randint(glicko.MIN_DEVIATION, 80)
+        rows.append((id, id, i + 1, rating, dev))
+    con.executemany("""
+        INSERT INTO fighters (id, name, workshop_index, select_x, select_y, glicko_rating, glicko_deviation)
+        VALUES (?, ?, ?, 513, 110, ?, ?)""", rows)
+    con.commit()
+    return strength
+
+def simulate(params: SimParams, seed: int) -> SimResult:
+    rng = random.Random(seed)
+    con = connect(':memory:')
+    try:
+        schema.migrate(con)
+        strength = seed_roster(con, params, rng)
+        new = {id for id in strength if id.startswith('new_')}
+        games = dict.fromkeys(new, 0)
+        matches_to_dev = {threshold: dict.fromkeys(new) for threshold in DEV_THRESHOLDS}
+        rating_errors = {checkpoint: [] for checkpoint in CHECKPOINTS}
+        for id in new:
+            rating_errors[0].append(abs(glicko.DEFAULT_RATING - strength[id]))
+
+        def load():
+            fighters = Fighters(con=con)
+            fighters.dev_range = params.dev_range
+            fighters.dev_range_growth = params.dev_range_growth
+            # counted in widened instead
+            fighters.report_widening = False
+            return fighters
+        matchmaker = SharedMatchmaker(load(), rng)
+        recorder = Matches()
+        favourite_odds = numpy.empty(params.matches)
+        widened = 0
+        for match in range(params.matches):
+            fighters = matchmaker.claim()
+            matchmaker.prefetch()
+            chance = win_chance(strength[fighters[0].id], strength[fighters[1].id])
+            favourite_odds[match] = max(chance, 1 - chance)
+            winner = 1 if rng.random() < chance else 2
+            recorder.record(fighters, winner, STAGE, con=con)
+            matchmaker.finish(fighters, winner)
+
+            for fighter in fighters:
+                if fighter.id not in new:
+                    continue
+                games[fighter.id] += 1
+                rating = matchmaker.fighters.fighters[fighter.id].provisional_rating
+                for threshold, reached in matches_to_dev.items():
+                    if reached[fighter.id] is None and rating.dev < threshold:
+                        reached[fighter.id] = games[fighter.id]
+                if games[fighter.id] in rating_errors:
+                    rating_errors[games[fighter.id]].append(abs(rating.rating - strength[fighter.id]))
+
+            if (match + 1) % params.cycle_matches == 0:
+                update_glicko(con)
+                widened += matchmaker.fighters.widened
+                matchmaker.fighters = load()
+        widened += matchmaker.fighters.widened
+    finally:
+        con.close()
+    return SimResult(favourite_odds, {threshold: list(reached.values()) for threshold, reached in matches_to_dev.items()},
+        rating_errors, widened)
+
+def _simulate(args: tuple[SimParams, int]) -> SimResult:
+    return simulate(*args)
+
+def run_simulations(params: SimParams, seeds: list[int], processes: Optional[int]=None) -> list[SimResult]:
+    """
+    Runs one simulation per seed. With processes=1 they all run in this process.
+    """
+    jobs = [(params, seed) for seed in seeds]
+    if processes == 1:
+        return [_simulate(job) for job in jobs]
+    with ProcessPoolExecutor(processes or os.cpu_count()) as pool:
+        return list(pool.map(_simulate, jobs))
+
+def print_simulations(params: SimParams, results: list[SimResult]):
+    odds = numpy.concatenate([result.favourite_odds for result in results])
+    print(f"{len(results)} runs of {params.matches} matches, {params.fighters} settled + {params.new_fighters} new "
+        f"fighters, a cycle every {params.cycle_matches} matches, dev_range {params.dev_range:g}")
+
+    print("Match quality (the favourite's true chance of winning):")
+    p50, p90, p99 = numpy.percentile(odds, (50, 90, 99))
+    print(f"  p50 {p50:.1%}, p90 {p90:.1%}, p99 {p99:.1%}; "
+        f"{numpy.mean(odds > 0.75):.1%} of matches over 75%, {numpy.mean(odds > 0.9):.1%} over 90%")
+    counts, edges = numpy.histogram(odds, bins=10, range=(0.5, 1.0))
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print(f"  {low:4.0%}-{high:4.0%} {count / len(odds):6.1%} {'#' * round(50 * count / len(odds))}")
+    widened = sum(result.widened for result in results)
+    print(f"  dev_range had to be widened {widened} times ({widened / len(odds):.2%} of picks)")
+
+    print("New fighters' convergence (matches until their deviation drops below):")
+    for threshold in DEV_THRESHOLDS:
+        reached = [n for result in results for n in result.matches_to_dev[threshold]]
+        done = [n for n in reached if n is not None]
+        summary = f"median {numpy.median(done):5.0f}, p90 {numpy.percentile(done, 90):5.0f}" if done else "never"
+        print(f"  {threshold:4d}: {summary}  ({len(reached) - len(done)} of {len(reached)} never got there)")
+
+    print("New fighters' rating error (|rating - true strength|) after:")
+    for checkpoint in CHECKPOINTS:
+        errors = [error for result in results for error in result.rating_errors[checkpoint]]
+        if errors:
+            print(f"  {checkpoint:4d} matches: mean {numpy.mean(errors):5.0f}, p90 {numpy.percentile(errors, 90):5.0f} "
+                f"({len(errors)} fighters)")
\ No newline at end of file
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from statistics import median, quantiles
+from roabet.context import context
+
+def _p95(values: list[float]) -> float:
+    return quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+def timing_report(hours: float=24):
+    """
+    Prints p50/p95 for each phase of the match loop and match throughput over the last hours hours.
+    """
+    since = datetime.now() - timedelta(hours=hours)
+    phases: dict[str, list[float]] = {}
+    for row in context.db.execute("SELECT phase, seconds FROM match_timings WHERE started_at >= ? ORDER BY id", (since,)):
+        phases.setdefault(row['phase'], []).append(row['seconds'])
+    matches = context.db.execute("SELECT COUNT(*), MIN(time), MAX(time) FROM matches WHERE time >= ?", (since,)).fetchone()
+
+    print(f"Last {hours:g} hours:")
+    if not phases:
+        print("No timings recorded. They're written by the match loop, from schema version 5 on.")
+    else:
+        total = sum(sum(values) for values in phases.values())
+        print(f"{'phase':20} {'count':>6} {'p50':>8} {'p95':>8} {'total':>9} {'share':>6}")
+        for phase, values in sorted(phases.items(), key=lambda item: sum(item[1]), reverse=True):
+            print(f"{phase:20} {len(values):6} {median(values):7.2f}s {_p95(values):7.2f}s "
+                f"{sum(values) / 60:8.1f}m {sum(values) / total:6.1%}")
+
+    count, first, last = matches[0], matches[1], matches[2]
+    print(f"{count} matches, {count / hours:.1f} per hour", end='')
+    if count > 1:
+        running = datetime.fromisoformat(last) - datetime.fromisoformat(first)
+        print(f", {(count - 1) / (running.total_seconds() / 3600):.1f} per hour while running", end='')
+    print()
\ No newline at end of file
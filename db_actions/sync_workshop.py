@@ -0,0 +1,164 @@
+"""
+Brings the fighters table up to date with the whole workshop content directory at once.
+
+Each folder's config.ini is read on a thread pool. A folder whose config.ini has the same
+mtime as at the last sync isn't read at all, and one whose contents hash the same isn't
+parsed. New fighters get ids picked in memory against every id already taken, and
+everything is written in one transaction.
+
+    python -m db_actions sync-workshop
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import os
+from pathlib import Path
+import sqlite3
+from typing import NamedTuple, Optional
+from .import_workshop_fighter import read_workshop_config, unique_id
+
+class WorkshopFolder(NamedTuple):
+    steam_id: str
+    mtime_ns: int
+    # None if the folder was skipped because its config.ini hasn't been touched
+    hash: Optional[str] = None
+    # None if config.ini wasn't parsed because its hash hasn't changed
+    name: Optional[str] = None
+    author: Optional[str] = None
+    error: Optional[str] = None
+
+class WorkshopSync(NamedTuple):
+    scanned: int
+    # folders whose config.ini hasn't been touched since the last sync
+    skipped: int
+    # touched, but with the same contents
+    unchanged: int
+    # names of the fighters added
+    added: list[str]
+    # existing fighters whose config.ini changed
+    updated: int
+    # fighters imported before syncing existed, now tracked
+    adopted: int
+    # (steam id, problem) for each folder that couldn't be imported
+    failed: list[tuple[str, str]]
+    # workshop fighters in the database whose folder is gone
+    missing: int
+
+def decode(data: bytes) -> str:
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+def scan_folder(folder: Path, known: Optional[tuple[int, str]]) -> WorkshopFolder:
+    """
+    Reads one workshop folder's config.ini, unless known (its mtime and hash at the last
+    sync) shows it hasn't changed.
+    """
+    steam_id = folder.name
+    configfile = folder / 'config.ini'
+    try:
+        mtime_ns = configfile.stat().st_mtime_ns
+        if known is not None and known[0] == mtime_ns:
+            return WorkshopFolder(steam_id, mtime_ns)
+        data = configfile.read_bytes()
+    except OSError as e:
+        return WorkshopFolder(steam_id, 0, error=e.strerror or str(e))
+    hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if known is not None and known[1] == hash:
+        return WorkshopFolder(steam_id, mtime_ns, hash)
+    name, author = read_workshop_config(decode(data))
+    if not name:
+        return WorkshopFolder(steam_id, mtime_ns, hash, error="no name")
+    return WorkshopFolder(steam_id, mtime_ns, hash, name, author)
+
+def folder_order(entry: os.DirEntry):
+    # new fighters are numbered in Steam ID order, numerically
+    return (0, int(entry.name), '') if entry.name.isdigit() else (1, 0, entry.name)
+
+def sync_workshop_dir(con: sqlite3.Connection, workshop_dir, *, threads: int=8, full: bool=False) -> WorkshopSync:
+    """
+    Imports every new workshop fighter in workshop_dir and updates the author of every
+    changed one. Existing fighters keep their id and name. With full, every config.ini
+    is read and parsed again regardless of what the last sync saw.
+    """
+    known = {} if full else {row['steam_id']: (row['mtime_ns'], row['hash'])
+        for row in con.execute("SELECT steam_id, mtime_ns, hash FROM workshop_sync")}
+    existing = {row['steam_id']: row['id']
+        for row in con.execute("SELECT id, steam_id FROM fighters WHERE steam_id IS NOT NULL")}
+    taken = {row['id'] for row in con.execute("SELECT id FROM fighters")}
+    last_index = con.execute(
+        "SELECT COALESCE(MAX(workshop_index), 0) FROM fighters WHERE workshop_index >= 1").fetchone()[0]
+
+    with os.scandir(workshop_dir) as entries:
+        folders = sorted((entry for entry in entries if entry.is_dir()), key=folder_order)
+    # a few big jobs rather than one per folder: most folders are a single stat, cheaper than a future
+    size = -(-len(folders) // (threads * 4)) or 1
+    chunks = [folders[i:i + size] for i in range(0, len(folders), size)]
+    with ThreadPoolExecutor(threads) as pool:
+        scanned = [folder for chunk in pool.map(
+            lambda chunk: [scan_folder(Path(entry.path), known.get(entry.name)) for entry in chunk], chunks)
+            for folder in chunk]
+
+    inserts = []
+    author_updates = []
+    synced = []
+    failed = []
+    skipped = unchanged = adopted = 0
+    now = datetime.now()
+    for folder in scanned:
+        if folder.error is not None:
+            failed.append((folder.steam_id, folder.error))
+            continue
+        if folder.hash is None:
+            skipped += 1
+            continue
+        synced.append((folder.steam_id, folder.mtime_ns, folder.hash, now))
+        if folder.name is None:
+            unchanged += 1
+        elif folder.steam_id not in existing:
+            last_index += 1
+            inserts.append((unique_id(folder.name, taken), folder.name, folder.steam_id, folder.author, last_index))
+        elif folder.steam_id in known:
+            author_updates.append((folder.author, folder.steam_id))
+        else:
+            # imported one at a time before; keep whatever name it was given
+            adopted += 1
+
+    try:
+        con.executemany("""
+            INSERT INTO fighters (id, name, steam_id, author, workshop_index, select_x, select_y)
+            VALUES (?, ?, ?, ?, ?, 513, 110)""", inserts)
+        con.executemany("UPDATE fighters SET author = ? WHERE steam_id = ?", author_updates)
+        con.executemany("INSERT OR REPLACE INTO workshop_sync (steam_id, mtime_ns, hash, synced_at) VALUES (?, ?, ?, ?)",
+            synced)
+        con.commit()
+    except sqlite3.Error:
+        con.rollback()
+        raise
+
+    present = {folder.name for folder in folders}
+    return WorkshopSync(
+        scanned=len(scanned),
+        skipped=skipped,
+        unchanged=unchanged,
+        added=[row[1] for row in inserts],
+        updated=len(author_updates),
+        adopted=adopted,
+        failed=failed,
+        missing=sum(steam_id not in present for steam_id in existing),
+    )
+
+def print_sync(result: WorkshopSync):
+    print(f"Scanned {result.scanned} workshop folders: {len(result.added)} added, {result.updated} updated, "
+        f"{result.adopted} adopted, {result.unchanged} unchanged, {result.skipped} untouched since the last sync")
+    for name in result.added[:20]:
+        print(f"  + {name}")
+    if len(result.added) > 20:
+        print(f"  ... and {len(result.added) - 20} more")
+    for steam_id, problem in result.failed:
+        print(f"  ! {steam_id}: {problem}")
+    if result.missing:
+        print(f"{result.missing} workshop fighters in the database have no folder (unsubscribed?); they were left alone")
\ No newline at end of file
@@ -1,17 +1,79 @@
 from datetime import datetime
+import sqlite3
 import sys
-from roabet import db_con
-from roabet.db.fighters import Fighters
+import numpy
+from roabet.context import context
+from roabet.db.ratings import Leaderboard, save_snapshot
+from roabet.util import glicko_batch
 
-def update_glicko():
-    fighters = Fighters(always_update_ratings=True)
+def games_before(cycle, index: dict[str, int], con: sqlite3.Connection=None) -> numpy.ndarray:
+    """
+    Each rated fighter's games played up to the end of cycle: from cycle's snapshot if
+    it has one, otherwise counted from the matches themselves.
+    """
+    con = con or context.db
+    games = numpy.zeros(len(index), dtype=numpy.int64)
+    snapshot = con.execute("SELECT fighter, games FROM rating_snapshots WHERE cycle = ?", (cycle['id'],)).fetchall()
+    if not snapshot:
+        snapshot = con.execute("""
+            SELECT fighter, COUNT(*) AS games FROM (
+                SELECT player1 AS fighter, player2 AS opponent FROM matches WHERE id <= :last AND winner IN (1, 2)
+                UNION ALL
+                SELECT player2, player1 FROM matches WHERE id <= :last AND winner IN (1, 2)
+            )
+            WHERE opponent IN (SELECT id FROM fighters WHERE NOT is_uber AND NOT is_potato)
+            GROUP BY fighter""", {'last': cycle['last_match']}).fetchall()
+    for row in snapshot:
+        if row['fighter'] in index:
+            games[index[row['fighter']]] = row['games']
+    return games
 
-    db_con.executemany("UPDATE fighters SET glicko_rating=?, glicko_deviation=? WHERE id=?", 
-        ((fighter.provisional_rating.rating, fighter.provisional_rating.dev, fighter.id) for fighter in fighters.fighters.values()))
+def update_glicko(con: sqlite3.Connection=None):
+    """
+    Closes the current rating cycle: applies every match since the last cycle to every
+    rated fighter in one vectorized pass and writes the new ratings back, along with a
+    snapshot of them and a freshly ranked leaderboard.
+    """
+    con = con or context.db
+    cycle = con.execute("SELECT id, last_match FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()
+    last_period = cycle['last_match']
+    # matches recorded while this runs belong to the next cycle
+    last_match = con.execute("SELECT COALESCE(MAX(id), 0) FROM matches").fetchone()[0]
 
-    last_match = db_con.execute("SELECT id FROM matches ORDER BY id DESC LIMIT 1").fetchone()['id']
-    db_con.execute("INSERT INTO rating_cycles (ended_at, last_match) VALUES (?, ?)", (datetime.now(), last_match))
-    db_con.commit()
+    # ubers and potatoes don't get rated
+    rated = [row for row in con.execute("SELECT id, glicko_rating, glicko_deviation, is_uber, is_potato FROM fighters")
+        if not row['is_uber'] and not row['is_potato']]
+    index = {row['id']: i for i, row in enumerate(rated)}
+    ratings, devs = glicko_batch.tick_ratings(
+        [row['glicko_rating'] for row in rated],
+        [row['glicko_deviation'] for row in rated])
+
+    player1 = []
+    player2 = []
+    score1 = []
+    for row in con.execute("""
+            SELECT player1, player2, winner FROM matches
+            WHERE id > ? AND id <= ? AND winner IN (1, 2)
+            ORDER BY id""", (last_period, last_match)):
+        if row['player1'] in index and row['player2'] in index:
+            player1.append(index[row['player1']])
+            player2.append(index[row['player2']])
+            score1.append(1.0 if row['winner'] == 1 else 0.0)
+
+    ratings, devs, games = glicko_batch.update_ratings(ratings, devs,
+        numpy.array(player1, dtype=numpy.intp), numpy.array(player2, dtype=numpy.intp), numpy.array(score1))
+
+    games += games_before(cycle, index, con)
+
+    con.executemany("UPDATE fighters SET glicko_rating=?, glicko_deviation=? WHERE id=?", 
+        ((int(ratings[i]), int(devs[i]), row['id']) for i, row in enumerate(rated)))
+
+    new_cycle = con.execute("INSERT INTO rating_cycles (ended_at, last_match) VALUES (?, ?)",
+        (datetime.now(), last_match)).lastrowid
+    standings = [(row['id'], int(ratings[i]), int(devs[i]), int(games[i])) for i, row in enumerate(rated)]
+    save_snapshot(con, new_cycle, standings)
+    Leaderboard.rebuild(con, standings)
+    con.commit()
 
 if __name__ == "__main__":
     update_glicko()
\ No newline at end of file
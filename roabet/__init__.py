@@ -1,10 +1,9 @@
-import sqlite3
-import yaml
+from .context import DB_PATH, AppContext, connect, context
 
-with open('config/config.yaml') as f:
-    config = yaml.load(f, yaml.Loader)
-
-db_con = None
-if not config['basic_mode']:
-    db_con = sqlite3.connect('config/db/roabet.sqlite3')
-    db_con.row_factory = sqlite3.Row
+def __getattr__(name):
+    # config and db_con used to be loaded on import; now they're loaded on first use
+    if name == 'config':
+        return context.config
+    if name == 'db_con':
+        return context.db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
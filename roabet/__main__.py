@@ -1,102 +1,171 @@
 import asyncio
-from datetime import datetime
-import json
 import os
 from pathlib import Path
-from roabet import config, db_con
+import traceback
+from roabet.context import context
 from roabet.controller import Controllers
-from roabet.db import Fighters, Stages
+from roabet.db import Character, Fighters, Leaderboard, LoadTimes, Matches, PhaseTimer, Stages, schema
+from roabet.screenreader.confirmation import ResultVoter
+from roabet.screenreader.polling import PollingPolicy
+from roabet.screenreader.states import ScreenState
+from roabet.screenreader.win_detection import WinDetector
+from roabet.screenreader.win_detector_service import WinDetectorService
+from roabet.sessions import Session, SessionOrchestrator, SharedMatchmaker
+
+# minutes per match
+MATCH_TIME = 5
+
+def controller_options(hwnd=None) -> dict:
+    """
+    Controllers keyword arguments from the cursor, inputs, screen_state and load_detection
+    sections of config.yaml. hwnd picks the game window to look at, if there are several.
+    """
+    options = dict(context.config.get('cursor') or {})
+    options.update(context.config.get('inputs') or {})
+    templates = options.pop('templates', None)
+    hotspot = options.pop('hotspot', (0, 0))
+    if templates:
+        from roabet.screenreader.cursor import CursorLocator
+        from roabet.screenreader.screenshot import WindowCapture
+        options['cursor_locator'] = CursorLocator(WindowCapture(region=(0, 0, 960, 540), hwnd=hwnd), templates,
+            hotspot=tuple(hotspot))
+
+    screen_options = dict(context.config.get('screen_state') or {})
+    if screen_templates := screen_options.pop('templates', None):
+        from roabet.screenreader.screen_state import ScreenClassifier, ScreenWatcher
+        from roabet.screenreader.screenshot import PersistentWindowCapture
+        watcher_options = {key: screen_options.pop(key) for key in ('interval', 'confirm_frames') if key in screen_options}
+        options['screen_watcher'] = ScreenWatcher(PersistentWindowCapture(region=(0, 0, 960, 540), output='gray', hwnd=hwnd),
+            ScreenClassifier(screen_templates, **screen_options), **watcher_options)
+
+    load_options = dict(context.config.get('load_detection') or {})
+    if portrait_region := load_options.pop('portrait_region', None):
+        from roabet.screenreader.load_detection import LoadDetector
+        from roabet.screenreader.screenshot import PersistentWindowCapture
+        options['load_detector'] = LoadDetector(PersistentWindowCapture(region=(0, 0, 960, 540), output='gray', hwnd=hwnd),
+            portrait_region, **load_options)
+    return options
+
+def make_win_detector(source=None, detector: WinDetector=None) -> WinDetectorService:
+    return WinDetectorService(source, detector=detector or WinDetector(**context.config.get('win_detection', {})),
+        policy=PollingPolicy(match_time=MATCH_TIME * 60, **context.config.get('win_polling', {})),
+        voter=ResultVoter(**context.config.get('win_confirmation', {})))
+
+def workshop_length(fighters: Fighters) -> int:
+    return len([f for f in fighters.fighters.values() if not f.official])
 
 async def main():
     print("Loading data...")
+    if applied := schema.migrate(context.db):
+        print(f"Migrated database to schema version {applied[-1]}")
     all_fighters = Fighters()
     all_stages = Stages()
+    # keep SQLite's commits and locks off the event loop, which is busy timing inputs
+    db_writer = context.writer
+    db_reader = context.reader
+    all_matches = Matches(db_writer)
+    load_times = LoadTimes(db_writer)
 
-    print("Starting game...")
-    os.startfile(Path(config['steam_dir']) / config['game_path'])
-
-    print("Starting controllers...")
-    controllers = Controllers(2)
-    controllers.set_workshop_length(len([f for f in all_fighters.fighters.values() if not f.official]))
-    await asyncio.sleep(30)
-    await controllers.init_local_play()
-    await controllers.init_com_players()
-    await controllers.each_player(lambda p: p.set_difficulty(9))
-    await controllers.change_settings(stock=3, time=5)
-
-    while True:
-        fighters = all_fighters.choose_fighters()
-        stage = all_stages.select_stage()
+    async def save_load_time(fighter: Character, seconds: float, settled: bool):
+        estimate = await load_times.record_async(fighter, seconds)
+        print(f"{fighter.name} {'loaded in' if settled else 'still loading after'} {seconds:.1f} s, "
+            f"load time estimate now {estimate:.1f} s")
 
-        print(f"Next match: {fighters[0].name} ({fighters[0].provisional_rating.rating})"
-            f" vs {fighters[1].name} ({fighters[1].provisional_rating.rating}) on {stage.name}")
+    saving = set()
+    def load_measured(fighter: Character, seconds: float, settled: bool):
+        task = asyncio.create_task(save_load_time(fighter, seconds, settled))
+        saving.add(task)
+        task.add_done_callback(saving.discard)
 
-        await controllers.select_fighters(*fighters)
-        await controllers.confirm_fighters()
-        await controllers.select_stage(stage)
+    print("Starting game...")
+    os.startfile(Path(context.config['steam_dir']) / context.config['game_path'])
 
-        win_detection_process = await asyncio.create_subprocess_exec(
-            'env/Scripts/python', '-m', 'roabet.screenreader.win_detection_process', 
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE)
-        print("Game started. Awaiting result...")
-        stdout, stderr = await win_detection_process.communicate()
-        if win_detection_process.returncode:
-            print("Win detector crashed!")
-            print(stderr.decode())
-            break
-        else:
-            winner = json.loads(stdout.decode())['winner']
-            print(f"Result: {fighters[winner - 1].name} wins!")
-            db_con.execute("""INSERT INTO matches
-            (time, player1, player2, winner, stage)
-            VALUES (?, ?, ?, ?, ?)""", (datetime.now(), fighters[0].id, fighters[1].id, winner, stage.id))
-            db_con.commit()
+    print("Starting controllers...")
+    controllers = Controllers(2, **controller_options(), on_load_measured=load_measured)
+    session = Session(controllers, make_win_detector(), PhaseTimer(db_writer), time=MATCH_TIME)
+    print("Setting up the game...")
+    await session.start(workshop_length(all_fighters))
 
-        await asyncio.sleep(10)
+    leaderboard = Leaderboard(db_writer)
+    # bring the standings up to this cycle's provisional ratings and any newly imported fighters
+    leaderboard.refresh(all_fighters)
+    matchmaker = SharedMatchmaker(all_fighters, leaderboard=leaderboard)
+    try:
+        while await session.play_match(matchmaker, all_stages, all_matches, db_reader):
+            pass
+    finally:
+        # let the writer commit whatever's still queued
+        context.close()
 
-        controllers.reset_cursor_pos()
+async def sessions_main():
+    """
+    Runs one session per game window listed in the sessions section of config.yaml.
+    The game instances have to be started by hand.
+    """
+    from roabet.screenreader.screenshot import PersistentWindowCapture, find_windows
+    print("Loading data...")
+    if applied := schema.migrate(context.db):
+        print(f"Migrated database to schema version {applied[-1]}")
+    db_writer = context.writer
+    db_reader = context.reader
+    all_fighters = Fighters()
+    leaderboard = Leaderboard(db_writer)
+    leaderboard.refresh(all_fighters)
+    orchestrator = SessionOrchestrator(SharedMatchmaker(all_fighters, leaderboard=leaderboard), Stages(),
+        Matches(db_writer), db_reader)
 
-        print("Refreshing fighters")
-        all_fighters.load_fighters()
+    windows = find_windows()
+    print(f"Found {len(windows)} game windows")
+    for i, session_config in enumerate(context.config['sessions']):
+        hwnd = windows[session_config.get('window', i)]
+        detector = WinDetector(**context.config.get('win_detection', {}))
+        source = PersistentWindowCapture(output='gray' if detector.grayscale else 'bgr', hwnd=hwnd)
+        controllers = Controllers(2, **controller_options(hwnd))
+        orchestrator.add(Session(controllers, make_win_detector(source, detector), PhaseTimer(db_writer),
+            name=session_config.get('name', f'session {i + 1}'), time=MATCH_TIME))
 
-        # await controllers.quit()
-        # break
+    print("Starting sessions...")
+    await orchestrator.start(workshop_length(all_fighters))
+    try:
+        await orchestrator.run()
+    finally:
+        print(f"{orchestrator.total_matches} matches, {orchestrator.matches_per_hour():.1f} per hour")
+        context.close()
 
 async def basic_main():
-    from vgamepad import XUSB_BUTTON as BUTTONS
+    from roabet.controller.backend import BUTTONS
     print("Starting game...")
-    os.startfile(Path(config['steam_dir']) / config['game_path'])
+    os.startfile(Path(context.config['steam_dir']) / context.config['game_path'])
     print("Starting controllers...")
-    controllers = Controllers(2)
-    await asyncio.sleep(30)
+    controllers = Controllers(2, **controller_options())
+    await controllers.wait_for_screen(ScreenState.TITLE, 30, timeout=120)
     await controllers.init_local_play()
     await controllers.init_com_players()
     await controllers.each_player(lambda p: p.set_difficulty(9))
-    await controllers.change_settings(stock=3, time=5)
+    await controllers.change_settings(stock=3, time=MATCH_TIME)
+    win_detector = make_win_detector()
+    win_detector.start()
     while True:
         # controllers are already set to random cpu
         await controllers.players[0].press_button(BUTTONS.XUSB_GAMEPAD_START)
-        await asyncio.sleep(2)
+        await controllers.wait_for_screen(ScreenState.STAGE_SELECT, 2)
         await controllers.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
 
-        win_detection_process = await asyncio.create_subprocess_exec(
-            'env/Scripts/python', '-m', 'roabet.screenreader.win_detection_process', 
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE)
         print("Game started. Awaiting result...")
-        stdout, stderr = await win_detection_process.communicate()
-        if win_detection_process.returncode:
+        try:
+            detection = await win_detector.wait_for_result()
+        except Exception:
             print("Win detector crashed!")
-            print(stderr.decode())
+            traceback.print_exc()
             break
         else:
-            winner = json.loads(stdout.decode())['winner']
-            print(f"Result: Player {winner} wins!")
+            print(f"Result: Player {detection.winner} wins! (detected in {detection.latency * 1000:.0f} ms, {detection.frames} frames captured)")
         
-        await asyncio.sleep(10)
+        await controllers.wait_for_screen(ScreenState.CHARACTER_SELECT, 10, timeout=30)
 
-if config['basic_mode']:
+if context.config['basic_mode']:
     asyncio.run(basic_main())
+elif context.config.get('sessions'):
+    asyncio.run(sessions_main())
 else:
     asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+The app's shared state: config.yaml, the database connection and the background database
+threads. Nothing is loaded on import. Each piece is set up the first time it's used, so a
+tool that only needs some of it (or none, like the benchmarks) doesn't pay for the rest.
+
+    from roabet.context import context
+    context.db.execute(...)
+"""
+from __future__ import annotations
+
+from functools import cached_property
+import sqlite3
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from roabet.db.writer import DatabaseReader, DatabaseWriter
+
+CONFIG_PATH = 'config/config.yaml'
+DB_PATH = 'config/db/roabet.sqlite3'
+
+def load_yaml(path):
+    """
+    Reads a YAML file, with libyaml's loader if PyYAML was built with it (several times
+    faster than the pure Python one).
+    """
+    import yaml
+    with open(path) as f:
+        return yaml.load(f, getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+def connect(path=DB_PATH, *, check_same_thread: bool=True) -> sqlite3.Connection:
+    """
+    Opens the database with the settings the app expects: WAL so readers (like
+    update_glicko) don't block the match loop's writes, and no fsync on every commit.
+    """
+    con = sqlite3.connect(path, check_same_thread=check_same_thread)
+    con.row_factory = sqlite3.Row
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('PRAGMA synchronous=NORMAL')
+    con.execute('PRAGMA busy_timeout=5000')
+    con.execute('PRAGMA temp_store=MEMORY')
+    return con
+
+class AppContext:
+    def __init__(self, config_path=CONFIG_PATH, db_path=DB_PATH):
+        self.config_path = config_path
+        self.db_path = db_path
+
+    @cached_property
+    def config(self) -> dict:
+        return load_yaml(self.config_path)
+
+    @property
+    def basic_mode(self) -> bool:
+        return bool(self.config['basic_mode'])
+
+    @cached_property
+    def db(self) -> Optional[sqlite3.Connection]:
+        """
+        The main thread's connection, or None in basic mode.
+        """
+        return None if self.basic_mode else connect(self.db_path)
+
+    @cached_property
+    def writer(self) -> DatabaseWriter:
+        from roabet.db.writer import DatabaseWriter
+        return DatabaseWriter(self.db_path, **(self.config.get('db_writer') or {}))
+
+    @cached_property
+    def reader(self) -> DatabaseReader:
+        from roabet.db.writer import DatabaseReader
+        return DatabaseReader(self.db_path)
+
+    def close(self):
+        """
+        Finishes queued writes and closes whatever was opened.
+        """
+        for name in ('writer', 'reader', 'db'):
+            if (resource := self.__dict__.pop(name, None)) is not None:
+                resource.close()
+
+context = AppContext()
\ No newline at end of file
@@ -2,21 +2,60 @@ from __future__ import annotations
 
 import asyncio
 from typing import TYPE_CHECKING
-from vgamepad import XUSB_BUTTON as BUTTONS
+from roabet.screenreader.states import ScreenState
+from .backend import BUTTONS, GamepadBackend, VGamepadBackend
+from .motion import MotionPlanner, PIXELS_PER_SECOND
 from .player import Player
+from .timeline import PRESS_GAP, PRESS_HOLD, InputScheduler, TimingReport
 
 if TYPE_CHECKING:
     from roabet.db import Character, Stage
+    from roabet.screenreader.load_detection import LoadDetector
+    from roabet.screenreader.screen_state import ScreenWatcher
     from collections.abc import Callable, Awaitable
 
 class Controllers:
     """
     Class that manages controllers with asyncio.
     """
-    def __init__(self, n: int, *, hazards=False):
-        self.players = [Player(i + 1, woken=i==0) for i in range(n)]
+    def __init__(self, n: int, *, hazards=False, cursor_locator=None,
+            pixels_per_second: float=PIXELS_PER_SECOND, diagonal_factor: float=1.0,
+            parallel_select=True, select_stagger: float=0.05,
+            backend_factory: Callable[[int], GamepadBackend]=None,
+            press_hold: float=PRESS_HOLD, press_gap: float=PRESS_GAP, input_tick: float=1/120,
+            screen_watcher: ScreenWatcher=None, load_detector: LoadDetector=None,
+            on_load_measured: Callable[[Character, float, bool], object]=None):
+        """
+        cursor_locator (a roabet.screenreader.cursor.CursorLocator) lets players re-anchor
+        their cursors on screen; see MotionPlanner for the motion options.
+        With parallel_select, every player picks their character at once, each starting
+        select_stagger seconds after the last so their inputs don't land on the same frames.
+        backend_factory makes each player's controller from their player num; the default
+        is a vgamepad controller.
+        Every player's inputs go through one InputScheduler, merged into ticks of input_tick
+        seconds; press_hold and press_gap set the length of a button press and the pause after.
+        With a screen_watcher, steps that wait for the game to change screens wait until the
+        screen is recognized, instead of for a fixed time.
+        load_detector and on_load_measured are passed on to each Player.
+        """
+        backends = {i + 1: backend_factory(i + 1) if backend_factory else VGamepadBackend() for i in range(n)}
+        self.scheduler = InputScheduler(backends, tick=input_tick)
+        self.players = [Player(i + 1, woken=i==0, cursor_locator=cursor_locator,
+            planner=MotionPlanner(pixels_per_second, diagonal_factor=diagonal_factor),
+            backend=backends[i + 1], scheduler=self.scheduler, press_hold=press_hold, press_gap=press_gap,
+            load_detector=load_detector, on_load_measured=on_load_measured)
+            for i in range(n)]
 
         self.condensed_workshop: bool = False
+        # the condensed view is shared, so only one player may toggle it
+        self._condensed_lock = asyncio.Lock()
+        self.parallel_select = parallel_select
+        self.select_stagger = select_stagger
+
+        self.screen_watcher = screen_watcher
+        # seconds spent waiting for screens, and what the fixed sleeps would have taken
+        self.screen_wait_time = 0.0
+        self.screen_fallback_time = 0.0
         
         # match settings
         self.stock: int = 3
@@ -30,7 +69,54 @@ class Controllers:
     def set_workshop_length(self, n):
         for player in self.players:
             player.set_workshop_length(n)
+
+    def pop_motion_stats(self) -> tuple[float, float]:
+        """
+        Returns (seconds spent moving cursors, seconds saved over one-axis-at-a-time moves)
+        across all players since the last call.
+        """
+        planned = sum(player.planner.planned_time for player in self.players)
+        saved = sum(player.planner.time_saved for player in self.players)
+        for player in self.players:
+            player.planner.reset_stats()
+        return planned, saved
     
+    def pop_timing_stats(self) -> TimingReport:
+        """
+        How late inputs went out compared to plan, since the last call.
+        """
+        return self.scheduler.pop_stats()
+
+    def pop_screen_wait_stats(self) -> tuple[float, float]:
+        """
+        Returns (seconds spent waiting for screens, seconds the fixed sleeps would have taken)
+        since the last call.
+        """
+        stats = self.screen_wait_time, self.screen_fallback_time
+        self.screen_wait_time = self.screen_fallback_time = 0.0
+        return stats
+
+    async def wait_for_screen(self, state: ScreenState, fallback: float, *, timeout: float=None) -> bool:
+        """
+        Waits until state is on screen, for at most timeout seconds (3x fallback by default).
+        Without a screen watcher, or one that can't recognize state, just sleeps for
+        fallback seconds.
+        Returns whether the screen was actually seen.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if self.screen_watcher is None or not self.screen_watcher.recognizes(state):
+            await asyncio.sleep(fallback)
+            reached = False
+        else:
+            reached = await self.screen_watcher.wait_for(state,
+                timeout=timeout if timeout is not None else fallback * 3) is not None
+            if not reached:
+                print(f"Didn't see {state.value} after {loop.time() - started:.1f} s, carrying on")
+        self.screen_wait_time += loop.time() - started
+        self.screen_fallback_time += fallback
+        return reached
+
     async def each_player(self, f: Callable[[Player], Awaitable]):
         """
         Runs a coroutine for each player.
@@ -47,11 +133,11 @@ class Controllers:
         To be called while on the start screen.
         """
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.MAIN_MENU, 2)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.LOCAL_MENU, 2)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.CHARACTER_SELECT, 2)
     
     async def init_com_players(self):
         """
@@ -64,14 +150,12 @@ class Controllers:
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
     
     async def _navigate_settings(self, delta):
-        for _ in range(abs(delta)):
-            await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_DPAD_DOWN if delta > 0
-                else BUTTONS.XUSB_GAMEPAD_DPAD_UP)
+        await self.players[0].press_buttons((BUTTONS.XUSB_GAMEPAD_DPAD_DOWN if delta > 0
+            else BUTTONS.XUSB_GAMEPAD_DPAD_UP,) * abs(delta))
     
     async def _change_setting(self, delta):
-        for _ in range(abs(delta)):
-            await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT if delta > 0
-                else BUTTONS.XUSB_GAMEPAD_DPAD_LEFT)
+        await self.players[0].press_buttons((BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT if delta > 0
+            else BUTTONS.XUSB_GAMEPAD_DPAD_LEFT,) * abs(delta))
     
     async def change_settings(self, **kwargs):
         opened_settings = False
@@ -97,14 +181,22 @@ class Controllers:
         if opened_settings:
             await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
     
-    async def select_fighters(self, *fighters: Character):
-        await self.each_player(lambda p: p.cancel_character())
-        for i, player in enumerate(self.players):
-            set_condensed = False
+    async def _set_condensed(self, player: Player):
+        async with self._condensed_lock:
             if not self.condensed_workshop:
-                set_condensed = True
+                await player.press_button(BUTTONS.XUSB_GAMEPAD_Y)
                 self.condensed_workshop = True
-            await player.select_character(fighters[i], set_condensed=set_condensed)
+
+    async def select_fighters(self, *fighters: Character):
+        await self.each_player(lambda p: p.cancel_character())
+        if self.parallel_select:
+            async def select(i: int, player: Player):
+                await asyncio.sleep(i * self.select_stagger)
+                await player.select_character(fighters[i], before_workshop=self._set_condensed)
+            await asyncio.gather(*(select(i, player) for i, player in enumerate(self.players)))
+        else:
+            for i, player in enumerate(self.players):
+                await player.select_character(fighters[i], before_workshop=self._set_condensed)
     
     async def confirm_fighters(self):
         """
@@ -112,7 +204,7 @@ class Controllers:
         In Tetherball mode, starts the battle.
         """
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_START)
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.STAGE_SELECT, 2)
         self.players[0].reset_cursor_pos(854, 354) # Random Stage is selected by default
     
     async def set_hazards(self, hazards: bool):
@@ -143,9 +235,9 @@ class Controllers:
         Quits the game from the character select screen.
         """
         await self.exit_versus()
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.LOCAL_MENU, 2)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_B)
-        await asyncio.sleep(2)
+        await self.wait_for_screen(ScreenState.MAIN_MENU, 2)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_DPAD_UP)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
         await self.players[0].press_button(BUTTONS.XUSB_GAMEPAD_A)
@@ -0,0 +1,57 @@
+"""
+Where controller inputs go. Players drive a GamepadBackend instead of a virtual
+gamepad directly, so the navigation logic can also run against a simulated game.
+"""
+from __future__ import annotations
+
+from enum import IntFlag
+
+class BUTTONS(IntFlag):
+    """
+    Xbox 360 buttons, with the same names and values as vgamepad's XUSB_BUTTON.
+    """
+    XUSB_GAMEPAD_DPAD_UP = 0x0001
+    XUSB_GAMEPAD_DPAD_DOWN = 0x0002
+    XUSB_GAMEPAD_DPAD_LEFT = 0x0004
+    XUSB_GAMEPAD_DPAD_RIGHT = 0x0008
+    XUSB_GAMEPAD_START = 0x0010
+    XUSB_GAMEPAD_BACK = 0x0020
+    XUSB_GAMEPAD_LEFT_THUMB = 0x0040
+    XUSB_GAMEPAD_RIGHT_THUMB = 0x0080
+    XUSB_GAMEPAD_LEFT_SHOULDER = 0x0100
+    XUSB_GAMEPAD_RIGHT_SHOULDER = 0x0200
+    XUSB_GAMEPAD_GUIDE = 0x0400
+    XUSB_GAMEPAD_A = 0x1000
+    XUSB_GAMEPAD_B = 0x2000
+    XUSB_GAMEPAD_X = 0x4000
+    XUSB_GAMEPAD_Y = 0x8000
+
+class GamepadBackend:
+    """
+    A controller. Button presses and releases are staged, then sent together by update().
+    """
+    def press_button(self, button: BUTTONS):
+        raise NotImplementedError
+
+    def release_button(self, button: BUTTONS):
+        raise NotImplementedError
+
+    def update(self):
+        raise NotImplementedError
+
+class VGamepadBackend(GamepadBackend):
+    """
+    A virtual Xbox 360 controller plugged in through vgamepad (Windows only).
+    """
+    def __init__(self):
+        import vgamepad
+        self.gamepad = vgamepad.VX360Gamepad()
+
+    def press_button(self, button: BUTTONS):
+        self.gamepad.press_button(int(button))
+
+    def release_button(self, button: BUTTONS):
+        self.gamepad.release_button(int(button))
+
+    def update(self):
+        self.gamepad.update()
\ No newline at end of file
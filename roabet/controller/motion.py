@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+from .backend import BUTTONS
+
+# Since lag may cause positions to drift, we don't need everything to be super exact.
+# My standard is to round values to the nearest 5.
+PIXELS_PER_SECOND = 440
+
+class Hold(NamedTuple):
+    buttons: tuple
+    time: float
+
+class MotionPlanner:
+    """
+    Plans the D-pad holds that move a cursor by (dx, dy).
+
+    Both axes move at once by holding a diagonal for the shared part of the move,
+    then the longer axis finishes on its own. diagonal_factor is how fast each axis
+    moves while a diagonal is held, relative to a straight hold; diagonals are only
+    used when that's actually quicker than one axis after the other.
+
+    Cursor speed is calibrated per axis as the session goes on, from observed
+    cursor positions (see observe).
+    """
+    # how much a single observation moves the speed estimate
+    calibration_weight = 0.3
+    # ignore observations of moves shorter than this, they're mostly rounding
+    min_calibration_distance = 40
+
+    def __init__(self, pixels_per_second: float=PIXELS_PER_SECOND, *, diagonal_factor: float=1.0):
+        self.speed_x = pixels_per_second
+        self.speed_y = pixels_per_second
+        self.diagonal_factor = diagonal_factor
+
+        # seconds spent holding the D-pad, and what the old one-axis-at-a-time moves would have taken
+        self.planned_time = 0.0
+        self.sequential_time = 0.0
+
+    def plan(self, dx: float, dy: float) -> list[Hold]:
+        horizontal = BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT if dx > 0 else BUTTONS.XUSB_GAMEPAD_DPAD_LEFT
+        vertical = BUTTONS.XUSB_GAMEPAD_DPAD_DOWN if dy > 0 else BUTTONS.XUSB_GAMEPAD_DPAD_UP
+        time_x = abs(dx) / self.speed_x
+        time_y = abs(dy) / self.speed_y
+        self.sequential_time += time_x + time_y
+
+        holds = []
+        if self.diagonal_factor > 0.5 and time_x and time_y:
+            # hold the diagonal until the shorter axis is done
+            shared = min(time_x, time_y) / self.diagonal_factor
+            holds.append(Hold((horizontal, vertical), shared))
+            time_x = max(time_x - shared * self.diagonal_factor, 0)
+            time_y = max(time_y - shared * self.diagonal_factor, 0)
+        if time_x:
+            holds.append(Hold((horizontal,), time_x))
+        if time_y:
+            holds.append(Hold((vertical,), time_y))
+
+        self.planned_time += sum(hold.time for hold in holds)
+        return holds
+
+    def _calibrated(self, speed: float, planned: float, actual: float) -> float:
+        if abs(planned) < self.min_calibration_distance or planned * actual <= 0:
+            return speed
+        observed = speed * actual / planned
+        return speed + (observed - speed) * self.calibration_weight
+
+    def observe(self, planned: tuple[float, float], actual: tuple[float, float]):
+        """
+        Recalibrates speed from moves that were planned to cover planned=(dx, dy) in
+        total but were seen to cover actual=(dx, dy).
+        """
+        self.speed_x = self._calibrated(self.speed_x, planned[0], actual[0])
+        self.speed_y = self._calibrated(self.speed_y, planned[1], actual[1])
+
+    @property
+    def time_saved(self) -> float:
+        return self.sequential_time - self.planned_time
+
+    def reset_stats(self):
+        self.planned_time = 0.0
+        self.sequential_time = 0.0
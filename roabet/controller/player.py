@@ -1,33 +1,69 @@
+from __future__ import annotations
+
 import asyncio
-from cv2 import magnitude
-import vgamepad
-from vgamepad import XUSB_BUTTON as BUTTONS
+from typing import TYPE_CHECKING
 from roabet.db import Character
+from . import workshop_grid
+from .backend import BUTTONS, GamepadBackend, VGamepadBackend
+from .motion import MotionPlanner
+from .timeline import PRESS_GAP, PRESS_HOLD, InputScheduler, Timeline
 
-PLAYER_SPACING = 238 # This is exact
+if TYPE_CHECKING:
+    from collections.abc import Callable, Awaitable
+    from roabet.screenreader.load_detection import LoadDetector
 
-# Since lag may cause positions to drift, we don't need everything to be super exact.
-# My standard is to round values to the nearest 5.
-PIXELS_PER_SECOND = 440
+PLAYER_SPACING = 238 # This is exact
 
 class Player:
     """
     Represents a player's controller.
     """
     
-    def __init__(self, num, *, woken=True):
+    # re-anchor the tracked cursor on screen after this many moves (if there's a cursor locator)
+    anchor_every = 5
+    # correct the cursor if it's found further than this from where it should be
+    anchor_tolerance = 10
+    # with a load detector, how long to wait for a fighter with no load time learned yet
+    first_load_timeout = 10
+    # and how many times its learned load time to wait for one that has, up to max_load_timeout
+    load_timeout_factor = 2
+    max_load_timeout = 30
+
+    def __init__(self, num, *, woken=True, planner: MotionPlanner=None, cursor_locator=None,
+            backend: GamepadBackend=None, scheduler: InputScheduler=None,
+            press_hold: float=PRESS_HOLD, press_gap: float=PRESS_GAP, load_detector: LoadDetector=None,
+            on_load_measured: Callable[[Character, float, bool], object]=None):
         """
         Connects a new controller with the given player num.
         The module itself doesn't guarantee num matches with the actual controller port,
         so please initialize them in order. Cursor positions are also uninitialized.
+        cursor_locator is an optional roabet.screenreader.cursor.CursorLocator.
+        backend defaults to a new vgamepad controller.
+        scheduler plays this player's inputs; players sharing one have their inputs merged.
+        press_hold and press_gap are how long press_button holds a button and then waits.
+        With a load_detector (a roabet.screenreader.load_detection.LoadDetector), workshop
+        picks wait until the fighter is seen to load rather than for its load_time, and
+        on_load_measured is called with each measured load time and whether the load
+        was seen to finish (if not, the time is how long it was waited for).
         """
         self.num: int = num
-        self.gamepad = vgamepad.VX360Gamepad()
+        self.gamepad = backend or VGamepadBackend()
+        self.scheduler = scheduler or InputScheduler({num: self.gamepad})
+        self.press_hold = press_hold
+        self.press_gap = press_gap
+        self.load_detector = load_detector
+        self.on_load_measured = on_load_measured
         self.cursor_x: int = 0
         self.cursor_y: int = 0
         self.cursor_workshop: int = 0
         self.woken = woken
 
+        self.planner = planner or MotionPlanner()
+        self.cursor_locator = cursor_locator
+        # moves and planned distance since the cursor position was last known for sure
+        self._moves_since_anchor = 0
+        self._planned_since_anchor = [0, 0]
+
         self.difficulty: int = 5
         self.workshop_length: int = 0
     
@@ -41,18 +77,37 @@ class Player:
         """
         Holds down button for time seconds, then releases it.
         """
-        self.gamepad.press_button(button)
-        self.gamepad.update()
-        await asyncio.sleep(time)
-        self.gamepad.release_button(button)
-        self.gamepad.update()
+        await self.hold_buttons_for((button,), time)
+
+    async def hold_buttons_for(self, buttons, time: float):
+        """
+        Holds down several buttons at once for time seconds, then releases them.
+        """
+        await self.scheduler.play(Timeline().hold(self.num, buttons, time))
     
     async def press_button(self, button):
         """
         A single firm button press with a pause after.
         """
-        await self.hold_button_for(button, 0.15)
-        await asyncio.sleep(0.15)
+        await self.press_buttons((button,))
+
+    async def press_buttons(self, buttons):
+        """
+        Presses each button in turn, as one timeline.
+        """
+        timeline = Timeline()
+        for button in buttons:
+            timeline.press(self.num, button, hold=self.press_hold, gap=self.press_gap)
+        await self.scheduler.play(timeline)
+
+    async def play_holds(self, holds):
+        """
+        Plays MotionPlanner holds back to back, as one timeline.
+        """
+        timeline = Timeline()
+        for hold in holds:
+            timeline.hold(self.num, hold.buttons, hold.time)
+        await self.scheduler.play(timeline)
     
     async def init_com_player(self):
         """
@@ -83,6 +138,8 @@ class Player:
         """
         self.cursor_x = x if x is not None else 120 + self.horiz_offset()
         self.cursor_y = y
+        self._moves_since_anchor = 0
+        self._planned_since_anchor = [0, 0]
         # self.cursor_workshop = 0 # does this happen sometimes?
 
     async def move_cursor_to(self, x: int, y: int):
@@ -92,81 +149,79 @@ class Player:
         delta_x = x - self.cursor_x
         delta_y = y - self.cursor_y
 
-        if delta_x > 0:
-            await self.hold_button_for(BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT, delta_x / PIXELS_PER_SECOND)
-        elif delta_x < 0:
-            await self.hold_button_for(BUTTONS.XUSB_GAMEPAD_DPAD_LEFT, -delta_x / PIXELS_PER_SECOND)
-        
-        if delta_y > 0:
-            await self.hold_button_for(BUTTONS.XUSB_GAMEPAD_DPAD_DOWN, delta_y / PIXELS_PER_SECOND)
-        elif delta_y < 0:
-            await self.hold_button_for(BUTTONS.XUSB_GAMEPAD_DPAD_UP, -delta_y / PIXELS_PER_SECOND)
+        await self.play_holds(self.planner.plan(delta_x, delta_y))
         
         self.cursor_x = x
         self.cursor_y = y
+        self._moves_since_anchor += 1
+        self._planned_since_anchor[0] += delta_x
+        self._planned_since_anchor[1] += delta_y
+
+        if self.cursor_locator and self._moves_since_anchor >= self.anchor_every:
+            await self.reanchor_cursor()
+
+    async def reanchor_cursor(self):
+        """
+        Looks for the cursor on screen, recalibrates the planner's speed from how far it
+        actually went, and corrects the position if it's drifted.
+        """
+        found = await asyncio.to_thread(self.cursor_locator.locate, self.num)
+        if found is None:
+            return
+        planned_x, planned_y = self._planned_since_anchor
+        start_x, start_y = self.cursor_x - planned_x, self.cursor_y - planned_y
+        self.planner.observe((planned_x, planned_y), (found[0] - start_x, found[1] - start_y))
+
+        target_x, target_y = self.cursor_x, self.cursor_y
+        self.reset_cursor_pos(*found)
+        if abs(found[0] - target_x) > self.anchor_tolerance or abs(found[1] - target_y) > self.anchor_tolerance:
+            await self.play_holds(self.planner.plan(target_x - found[0], target_y - found[1]))
+            self.cursor_x = target_x
+            self.cursor_y = target_y
+            self._planned_since_anchor = [target_x - found[0], target_y - found[1]]
     
     async def cancel_character(self):
         await self.press_button(BUTTONS.XUSB_GAMEPAD_B)
     
-    async def select_character(self, character: Character, *, set_condensed=False):
+    async def select_character(self, character: Character, *, set_condensed=False,
+            before_workshop: Callable[[Player], Awaitable]=None):
         """
         Selects the chosen Character.
+        before_workshop is awaited once the workshop grid is open, before navigating it.
         """
         await self.move_cursor_to(character.select_x, character.select_y)
         await self.press_button(BUTTONS.XUSB_GAMEPAD_A)
         if not character.official:
             if set_condensed:
                 await self.press_button(BUTTONS.XUSB_GAMEPAD_Y)
+            if before_workshop:
+                await before_workshop(self)
 
-            current_z = self.cursor_workshop // 16
-            current_x = (self.cursor_workshop % 16) // 4
-            current_y = self.cursor_workshop % 4
-            target_z = character.workshop_index // 16
-            target_x = (character.workshop_index % 16) // 4
-            target_y = character.workshop_index % 4
-
-            # 15 fighters = only 1 page. 16 fighters = 2 pages because of the random button
-            max_z = self.workshop_length // 16
-            last_page_length = ((self.workshop_length + 1) % 16) or 16
-
-            if target_z != current_z:
-                if min(current_z, target_z) + max_z + 1 - max(current_z, target_z) < abs(current_z - target_z):
-                    direction = (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER if current_z > target_z 
-                        else BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER)
-                    magnitude = min(current_z, target_z) + max_z + 1 - max(current_z, target_z)
-                    if current_x * 4 + current_y >= last_page_length:
-                        # moving thru last page will move cursor to end of last page
-                        current_x = (last_page_length - 1) // 4
-                        current_y = (last_page_length - 1) % 4
-                else:
-                    direction = (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER if current_z < target_z 
-                        else BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER)
-                    magnitude = abs(current_z - target_z)
-                    if target_z == max_z and current_x * 4 + current_y >= last_page_length:
-                        # adjust to end of last page
-                        current_x = (last_page_length - 1) // 4
-                        current_y = (last_page_length - 1) % 4
-                for _ in range(magnitude):
-                    await self.press_button(direction)
-            
-            if current_y > target_y:
-                # move up first
-                for _ in range(current_y - target_y):
-                    await self.press_button(BUTTONS.XUSB_GAMEPAD_DPAD_UP)
-
-            for _ in range(abs(target_x - current_x)):
-                await self.press_button(BUTTONS.XUSB_GAMEPAD_DPAD_LEFT if target_x < current_x 
-                    else BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT)
-            
-            if current_y < target_y:
-                # move down last
-                for _ in range(target_y - current_y):
-                    await self.press_button(BUTTONS.XUSB_GAMEPAD_DPAD_DOWN)
+            await self.press_buttons(workshop_grid.shortest_presses(self.workshop_length, self.cursor_workshop,
+                character.workshop_index))
             
             self.cursor_workshop = character.workshop_index
 
+            before = await self.load_detector.snapshot(self.num) if self.load_detector else None
             await self.press_button(BUTTONS.XUSB_GAMEPAD_A)
-            await asyncio.sleep(character.load_time) # give character time to load
+            await self.wait_for_load(character, before)
+
+    async def wait_for_load(self, character: Character, before=None):
+        """
+        Gives a just-picked workshop fighter time to load.
+        before is the load detector's snapshot from just before the pick.
+        With a load detector, the wait is bounded above the learned load_time, so a
+        fighter whose estimate is too low can still be seen to take longer; a load still
+        going at the timeout is reported at the timeout, which the estimate then grows to.
+        """
+        if self.load_detector is None:
+            await asyncio.sleep(character.load_time)
+            return
+        timeout = (min(character.load_time * self.load_timeout_factor, self.max_load_timeout)
+            if character.load_time else self.first_load_timeout)
+        loaded = await self.load_detector.wait_loaded(self.num, before, timeout=timeout)
+        if loaded is not None and self.on_load_measured:
+            self.on_load_measured(character, loaded.seconds, loaded.settled)
 
     async def set_difficulty(self, level: int):
         """
@@ -176,7 +231,6 @@ class Player:
             await self.move_cursor_to(210 + self.horiz_offset(), 505)
         elif level < self.difficulty:
             await self.move_cursor_to(125 + self.horiz_offset(), 505)
-        for _ in range(abs(level - self.difficulty)):
-            await self.press_button(BUTTONS.XUSB_GAMEPAD_A)
+        await self.press_buttons((BUTTONS.XUSB_GAMEPAD_A,) * abs(level - self.difficulty))
         
         self.difficulty = level
@@ -0,0 +1,375 @@
+"""
+A simulated game for running Controllers without Windows, vgamepad or the game.
+
+SimulatedGame models the menus the controllers drive: the title screens, character
+select (cursors, COM setup, difficulty, the settings menu and the workshop grid), and
+stage select. Cursors move while the D-pad is held, like the real game; everything
+else reacts to presses. Pressing A on nothing, or anything else the real game would
+ignore, is recorded in SimulatedGame.problems rather than raising.
+
+Run it on a VirtualClockLoop and the controllers' sleeps and holds take no real time,
+so whole menu sequences can be benchmarked thousands of times faster than real time.
+
+With a match_time, matches also play out: the game picks a winner, shows the results
+screen and goes back to character select by itself, and SimulatedScreen turns that into
+replayed frames for a win detector.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping, Sequence
+import random
+import selectors
+from typing import TYPE_CHECKING, Optional
+from roabet.screenreader.frame_source import FrameSource
+from roabet.screenreader.states import ScreenState
+from . import workshop_grid
+from .backend import BUTTONS, GamepadBackend
+from .motion import PIXELS_PER_SECOND
+from .player import PLAYER_SPACING
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Iterable
+    import numpy
+    from roabet.db import Character, Stage
+
+SCREEN_SIZE = (960, 540)
+WORKSHOP_BUTTON = (513, 110)
+SETTINGS_BUTTON = (295, 35)
+HAZARDS_BUTTON = (600, 30)
+DEFAULT_STAGE_CURSOR = (854, 354)
+
+SCREEN_STATES = {
+    'title': ScreenState.TITLE,
+    'main_menu': ScreenState.MAIN_MENU,
+    'local_menu': ScreenState.LOCAL_MENU,
+    'character_select': ScreenState.CHARACTER_SELECT,
+    'stage_select': ScreenState.STAGE_SELECT,
+    'match': ScreenState.IN_MATCH,
+    'results': ScreenState.RESULTS,
+}
+
+# where pressing A on each screen before character select leads
+MENU_PATH = {
+    'title': 'main_menu',
+    'main_menu': 'local_menu',
+    'local_menu': 'character_select',
+}
+
+DPAD = {
+    BUTTONS.XUSB_GAMEPAD_DPAD_UP: (0, -1),
+    BUTTONS.XUSB_GAMEPAD_DPAD_DOWN: (0, 1),
+    BUTTONS.XUSB_GAMEPAD_DPAD_LEFT: (-1, 0),
+    BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT: (1, 0),
+}
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Never blocks waiting for a timer: advances the loop's clock past the timeout instead.
+    """
+    def __init__(self, loop: VirtualClockLoop):
+        super().__init__()
+        self.loop = loop
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # nothing scheduled, so only I/O (e.g. a thread finishing) can wake us
+            return super().select(None)
+        events = super().select(0)
+        if not events and timeout > 0:
+            self.loop.virtual_time += timeout
+        return events
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop whose clock jumps straight to the next timer instead of waiting for it.
+    """
+    def __init__(self):
+        self.virtual_time = 0.0
+        super().__init__(_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self.virtual_time
+
+def run_virtual(main: Awaitable):
+    """
+    Like asyncio.run, on a VirtualClockLoop.
+    """
+    loop = VirtualClockLoop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+class SimulatedPlayer:
+    def __init__(self, num: int, woken: bool):
+        self.num = num
+        self.woken = woken
+        self.joined_woken = woken
+        self.com = False
+        self.difficulty = 5
+        self.cursor_x, self.cursor_y = default_cursor(num)
+        self.held = BUTTONS(0)
+        self.updated_at = 0.0
+        self.selected: Character = None
+        self.in_workshop = False
+        self.workshop_slot = 0
+
+def default_cursor(num: int) -> tuple[float, float]:
+    return 120 + PLAYER_SPACING * (num - 1), 216
+
+class SimulatedGame:
+    """
+    The game's menus, driven by SimulatedGamepads from gamepad().
+    fighters and stages are what's on the select screens, at their select_x/select_y;
+    workshop fighters all sit behind the workshop button, in workshop_index order.
+    A press only hits something if the cursor is within hit_radius of it.
+    With a match_time, a match picks a random winner match_time seconds after it starts,
+    then shows the results screen for results_time seconds before ending by itself.
+    """
+    def __init__(self, fighters: Iterable[Character], stages: Iterable[Stage], *, players: int=2,
+            pixels_per_second: float=PIXELS_PER_SECOND, diagonal_factor: float=1.0, hit_radius: float=20,
+            match_time: float=None, results_time: float=0, rng=random):
+        fighters = list(fighters)
+        self.official = [fighter for fighter in fighters if fighter.official]
+        workshop = {fighter.workshop_index: fighter for fighter in fighters if not fighter.official}
+        self.workshop = [workshop.get(i) for i in range(1, max(workshop, default=0) + 1)]
+        self.stages = list(stages)
+        self.pixels_per_second = pixels_per_second
+        self.diagonal_factor = diagonal_factor
+        self.hit_radius = hit_radius
+
+        self.players = [SimulatedPlayer(i + 1, woken=i == 0) for i in range(players)]
+        self.screen = 'title'
+        self.condensed_workshop = False
+        self.settings_open = False
+        self.settings_row = 0
+        self.stock = 3
+        self.time = 8
+        self.hazards = False
+        self.stage: Stage = None
+
+        self.match_time = match_time
+        self.results_time = results_time
+        self.rng = rng
+        self.winner: Optional[int] = None
+        # (ids of the fighters picked, winner) for every match played out so far
+        self.results: list[tuple[tuple[str, ...], int]] = []
+
+        self.presses = 0
+        self.problems: list[str] = []
+
+    def gamepad(self, num: int) -> SimulatedGamepad:
+        return SimulatedGamepad(self, num)
+
+    def cursor(self, num: int) -> tuple[float, float]:
+        player = self.players[num - 1]
+        return player.cursor_x, player.cursor_y
+
+    def end_match(self):
+        """
+        The match is over: back to character select, with cursors on their default spots.
+        """
+        self.screen = 'character_select'
+        self.stage = None
+        self.winner = None
+        for player in self.players:
+            player.cursor_x, player.cursor_y = default_cursor(player.num)
+
+    def finish_match(self, winner: int):
+        """
+        Someone won: on to the results screen.
+        """
+        # winner first: SimulatedScreen reads these from the win detector's thread
+        self.winner = winner
+        self.screen = 'results'
+        self.results.append((tuple(p.selected.id if p.selected else None for p in self.players), winner))
+        if self.match_time is not None:
+            asyncio.get_running_loop().call_later(self.results_time, self.end_match)
+
+    def _start_match(self, stage: Stage):
+        self.stage = stage
+        self.screen = 'match'
+        if self.match_time is not None:
+            asyncio.get_running_loop().call_later(self.match_time, self.finish_match, self.rng.choice((1, 2)))
+
+    def _problem(self, player: SimulatedPlayer, message: str):
+        self.problems.append(f"P{player.num} on {self.screen}: {message}")
+
+    def _move_cursor(self, player: SimulatedPlayer, now: float):
+        elapsed = now - player.updated_at
+        player.updated_at = now
+        if not elapsed or self.screen not in ('character_select', 'stage_select'):
+            return
+        if player.in_workshop or (self.settings_open and player.num == 1):
+            return
+        dx = sum(DPAD[button][0] for button in DPAD if button in player.held)
+        dy = sum(DPAD[button][1] for button in DPAD if button in player.held)
+        speed = self.pixels_per_second * (self.diagonal_factor if dx and dy else 1)
+        player.cursor_x = min(max(player.cursor_x + dx * speed * elapsed, 0), SCREEN_SIZE[0])
+        player.cursor_y = min(max(player.cursor_y + dy * speed * elapsed, 0), SCREEN_SIZE[1])
+
+    def _hit(self, player: SimulatedPlayer, x: float, y: float) -> bool:
+        return abs(player.cursor_x - x) <= self.hit_radius and abs(player.cursor_y - y) <= self.hit_radius
+
+    def update(self, num: int, held: BUTTONS, now: float):
+        player = self.players[num - 1]
+        self._move_cursor(player, now)
+        pressed = held & ~player.held
+        player.held = held
+        for button in BUTTONS:
+            if button in pressed:
+                self.presses += 1
+                self._press(player, button)
+
+    def _press(self, player: SimulatedPlayer, button: BUTTONS):
+        if self.screen in MENU_PATH:
+            if player.num == 1 and button == BUTTONS.XUSB_GAMEPAD_A:
+                self.screen = MENU_PATH[self.screen]
+        elif self.screen == 'character_select':
+            if self.settings_open and player.num == 1:
+                self._press_settings(button)
+            elif player.in_workshop:
+                self._press_workshop(player, button)
+            else:
+                self._press_character_select(player, button)
+        elif self.screen == 'stage_select':
+            if player.num == 1 and button == BUTTONS.XUSB_GAMEPAD_A:
+                self._press_stage_select(player)
+
+    def _press_settings(self, button: BUTTONS):
+        if button in (BUTTONS.XUSB_GAMEPAD_DPAD_UP, BUTTONS.XUSB_GAMEPAD_DPAD_DOWN):
+            self.settings_row = max(self.settings_row + DPAD[button][1], 0)
+        elif button in (BUTTONS.XUSB_GAMEPAD_DPAD_LEFT, BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT):
+            if self.settings_row == 1:
+                self.stock += DPAD[button][0]
+            elif self.settings_row == 2:
+                self.time += DPAD[button][0]
+        elif button == BUTTONS.XUSB_GAMEPAD_A:
+            self.settings_open = False
+            self.settings_row = 0
+
+    def _press_workshop(self, player: SimulatedPlayer, button: BUTTONS):
+        if button == BUTTONS.XUSB_GAMEPAD_Y:
+            self.condensed_workshop = not self.condensed_workshop
+        elif button == BUTTONS.XUSB_GAMEPAD_B:
+            player.in_workshop = False
+        elif button == BUTTONS.XUSB_GAMEPAD_A:
+            player.in_workshop = False
+            # slot 0 is the random button
+            player.selected = self.workshop[player.workshop_slot - 1] if player.workshop_slot else None
+        elif button in workshop_grid.MOVES:
+            if not self.condensed_workshop:
+                self._problem(player, "navigated the workshop grid while it wasn't condensed")
+            player.workshop_slot = workshop_grid.step(len(self.workshop), player.workshop_slot, button)
+
+    def _press_character_select(self, player: SimulatedPlayer, button: BUTTONS):
+        offset = PLAYER_SPACING * (player.num - 1)
+        if button == BUTTONS.XUSB_GAMEPAD_B:
+            player.selected = None
+        elif button == BUTTONS.XUSB_GAMEPAD_START:
+            if player.num == 1:
+                if all(p.selected for p in self.players):
+                    self.screen = 'stage_select'
+                    player.cursor_x, player.cursor_y = DEFAULT_STAGE_CURSOR
+                else:
+                    self._problem(player, "pressed start before every player had picked")
+        elif button == BUTTONS.XUSB_GAMEPAD_A:
+            # the player card isn't modeled: the first press joins, the next one makes a COM,
+            # leaving the cursor where Player.init_com_player expects
+            if not player.woken:
+                player.woken = True
+            elif not player.com:
+                player.com = True
+                player.cursor_x = 55 + offset
+                player.cursor_y = 335 if player.joined_woken else 325
+            elif player.num == 1 and self._hit(player, *SETTINGS_BUTTON):
+                self.settings_open = True
+            elif self._hit(player, 210 + offset, 505):
+                player.difficulty = min(player.difficulty + 1, 9)
+            elif self._hit(player, 125 + offset, 505):
+                player.difficulty = max(player.difficulty - 1, 1)
+            elif self._hit(player, *WORKSHOP_BUTTON):
+                player.in_workshop = True
+            else:
+                for fighter in self.official:
+                    if self._hit(player, fighter.select_x, fighter.select_y):
+                        player.selected = fighter
+                        return
+                self._problem(player, f"pressed A on nothing at {player.cursor_x:.0f}, {player.cursor_y:.0f}")
+
+    def _press_stage_select(self, player: SimulatedPlayer):
+        if self._hit(player, *HAZARDS_BUTTON):
+            self.hazards = not self.hazards
+            return
+        for stage in self.stages:
+            if self._hit(player, stage.select_x, stage.select_y):
+                self._start_match(stage)
+                return
+        self._problem(player, f"pressed A on nothing at {player.cursor_x:.0f}, {player.cursor_y:.0f}")
+
+class SimulatedGamepad(GamepadBackend):
+    """
+    One player's controller plugged into a SimulatedGame. Times come from the running event loop.
+    """
+    def __init__(self, game: SimulatedGame, num: int):
+        self.game = game
+        self.num = num
+        self.buttons = BUTTONS(0)
+
+    def press_button(self, button: BUTTONS):
+        self.buttons |= button
+
+    def release_button(self, button: BUTTONS):
+        self.buttons &= ~button
+
+    def update(self):
+        self.game.update(self.num, self.buttons, asyncio.get_running_loop().time())
+
+class SimulatedScreen(FrameSource):
+    """
+    What a SimulatedGame's window shows, from recorded frames: frames['match'] while a
+    match is on and frames['results_1'] or frames['results_2'] on the results screen,
+    each looped. Any other screen shows frames['menu'] if there is one, or else the match
+    frames. Frames should be cropped like the win detector's source, e.g. to results_region.
+    """
+    def __init__(self, game: SimulatedGame, frames: Mapping[str, Sequence[numpy.ndarray]], *, poll_interval: float=0.04):
+        self.game = game
+        self.frames = frames
+        self.poll_interval = poll_interval
+        self._pos = 0
+
+    def get_frame(self):
+        if self.game.screen == 'results':
+            frames = self.frames[f'results_{self.game.winner}']
+        elif self.game.screen == 'match' or 'menu' not in self.frames:
+            frames = self.frames['match']
+        else:
+            frames = self.frames['menu']
+        self._pos += 1
+        return frames[self._pos % len(frames)]
+
+class SimulatedScreenWatcher:
+    """
+    Stands in for a ScreenWatcher, reading the screen straight off a SimulatedGame.
+    """
+    def __init__(self, game: SimulatedGame, *, interval: float=0.2):
+        self.game = game
+        self.interval = interval
+        self.state = ScreenState.UNKNOWN
+
+    def recognizes(self, state: ScreenState) -> bool:
+        return True
+
+    async def wait_for(self, *states: ScreenState, timeout: float=None) -> Optional[ScreenState]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        while True:
+            self.state = SCREEN_STATES[self.game.screen]
+            if self.state in states:
+                return self.state
+            if deadline is not None and loop.time() + self.interval > deadline:
+                return None
+            await asyncio.sleep(self.interval)
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+Controller inputs compiled ahead of time into timelines, and one scheduler that plays
+them for every controller against the event loop's monotonic clock.
+
+Every input is due at an absolute time from when its timeline started, so lateness in
+one press doesn't push back the ones after it. Inputs that fall due in the same tick
+go out together, with one update() per controller.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+from itertools import count
+from statistics import fmean, quantiles
+from typing import TYPE_CHECKING, NamedTuple
+from .backend import BUTTONS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from .backend import GamepadBackend
+
+# a firm press, and the pause before the next one
+PRESS_HOLD = 0.15
+PRESS_GAP = 0.15
+
+class InputEvent(NamedTuple):
+    at: float
+    player: int
+    button: BUTTONS
+    pressed: bool
+
+class Timeline:
+    """
+    A plan of button presses and releases, each at a time from the start of the timeline.
+    Every player has their own write position, so one timeline can drive several
+    players side by side.
+    """
+    def __init__(self):
+        self.events: list[InputEvent] = []
+        self._ends: dict[int, float] = {}
+
+    def end(self, player: int) -> float:
+        return self._ends.get(player, 0.0)
+
+    @property
+    def duration(self) -> float:
+        return max(max(self._ends.values(), default=0.0), max((event.at for event in self.events), default=0.0))
+
+    def wait(self, player: int, time: float) -> Timeline:
+        self._ends[player] = self.end(player) + time
+        return self
+
+    def hold(self, player: int, buttons: Iterable[BUTTONS], time: float) -> Timeline:
+        """
+        Holds buttons down together for time seconds. A button released at the very moment
+        it's held again just stays held, so back-to-back holds don't flicker.
+        """
+        start = self.end(player)
+        for button in buttons:
+            released = InputEvent(start, player, button, False)
+            if released in self.events:
+                self.events.remove(released)
+            else:
+                self.events.append(InputEvent(start, player, button, True))
+            self.events.append(InputEvent(start + time, player, button, False))
+        self._ends[player] = start + time
+        return self
+
+    def press(self, player: int, button: BUTTONS, *, hold: float=PRESS_HOLD, gap: float=PRESS_GAP) -> Timeline:
+        """
+        A single firm press with a pause after, like Player.press_button.
+        """
+        return self.hold(player, (button,), hold).wait(player, gap)
+
+    def sorted_events(self) -> list[InputEvent]:
+        return sorted(self.events, key=lambda event: event.at)
+
+class TimingReport:
+    """
+    How far each input went out from its planned time, in seconds. Inputs merged into
+    an earlier tick count as early (negative); the stats are of the size of the error.
+    """
+    def __init__(self):
+        self.errors: list[float] = []
+
+    def extend(self, other: TimingReport):
+        self.errors += other.errors
+
+    @property
+    def mean(self) -> float:
+        return fmean(map(abs, self.errors)) if self.errors else 0.0
+
+    @property
+    def p95(self) -> float:
+        if len(self.errors) < 2:
+            return self.max
+        return quantiles(map(abs, self.errors), n=20)[-1]
+
+    @property
+    def max(self) -> float:
+        return max(map(abs, self.errors), default=0.0)
+
+    def __str__(self):
+        return (f"{len(self.errors)} inputs, off by {self.mean * 1000:.1f} ms on average, "
+            f"{self.p95 * 1000:.1f} ms p95, {self.max * 1000:.1f} ms max")
+
+class _Playback:
+    def __init__(self, remaining: int, future: asyncio.Future):
+        self.remaining = remaining
+        self.future = future
+        self.report = TimingReport()
+
+class InputScheduler:
+    """
+    Plays timelines on a set of controllers, keyed by player num.
+    Any number of timelines can play at once; their inputs are merged.
+    """
+    def __init__(self, gamepads: dict[int, GamepadBackend], *, tick: float=1/120):
+        self.gamepads = gamepads
+        self.tick = tick
+        self.stats = TimingReport()
+        self._queue: list[tuple[float, int, InputEvent, _Playback]] = []
+        self._order = count()
+        self._runner: asyncio.Task = None
+        self._wakeup: asyncio.Event = None
+
+    async def play(self, timeline: Timeline) -> TimingReport:
+        """
+        Plays a timeline starting now, and returns once it's over: its last input has gone
+        out and any wait at the end has passed.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        events = timeline.sorted_events()
+        playback = _Playback(len(events), loop.create_future())
+        if not events:
+            await asyncio.sleep(timeline.duration)
+            return playback.report
+
+        for event in events:
+            heapq.heappush(self._queue, (start + event.at, next(self._order), event, playback))
+        if self._runner is None or self._runner.done() or self._runner.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._runner = loop.create_task(self._run())
+        else:
+            self._wakeup.set()
+        report = await playback.future
+        if (remaining := start + timeline.duration - loop.time()) > 0:
+            await asyncio.sleep(remaining)
+        return report
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._queue:
+                delay = self._queue[0][0] - loop.time()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        # wake early if a new timeline has something due sooner
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._send_due(loop.time())
+        except Exception as e:
+            # a gamepad failed: every waiting play raises it instead of hanging, and the
+            # next play starts a fresh runner on an empty queue
+            pending, self._queue = self._queue, []
+            for playback in {id(entry[3]): entry[3] for entry in pending}.values():
+                if not playback.future.done():
+                    playback.future.set_exception(e)
+
+    def _send_due(self, now: float):
+        touched = {}
+        changed = set()
+        while self._queue and self._queue[0][0] <= now + self.tick / 2:
+            deadline, _, event, playback = self._queue[0]
+            if (event.player, event.button) in changed:
+                # a press and release of the same button can't share an update
+                break
+            changed.add((event.player, event.button))
+
+            gamepad = touched[event.player] = self.gamepads[event.player]
+            if event.pressed:
+                gamepad.press_button(event.button)
+            else:
+                gamepad.release_button(event.button)
+            # only taken off the queue once sent, so a failed event's playback fails with it
+            heapq.heappop(self._queue)
+            playback.report.errors.append(now - deadline)
+            playback.remaining -= 1
+            if not playback.remaining:
+                self.stats.extend(playback.report)
+                if not playback.future.done():
+                    playback.future.set_result(playback.report)
+        for gamepad in touched.values():
+            gamepad.update()
+
+    def pop_stats(self) -> TimingReport:
+        stats, self.stats = self.stats, TimingReport()
+        return stats
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+The condensed workshop character grid, as a graph for finding the fewest presses
+between two slots.
+
+Slots are numbered like workshop_index: slot 0 is the random button and workshop
+fighters start at 1. Each page holds 16 slots in 4 columns of 4, filled top to
+bottom, so 15 fighters fit on 1 page and 16 need 2. The shoulder buttons flip pages
+and wrap around; landing past the end of the (shorter) last page puts the cursor on
+its last slot. The D-pad doesn't wrap and can't move onto slots that don't exist.
+"""
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from .backend import BUTTONS
+
+PAGE_SIZE = 16
+ROWS = 4
+
+# tried in this order, so among equally short routes the earlier buttons come first
+MOVES = (
+    BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER,
+    BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER,
+    BUTTONS.XUSB_GAMEPAD_DPAD_UP,
+    BUTTONS.XUSB_GAMEPAD_DPAD_LEFT,
+    BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT,
+    BUTTONS.XUSB_GAMEPAD_DPAD_DOWN,
+)
+
+def slot_count(workshop_length: int) -> int:
+    # every workshop fighter plus the random button
+    return workshop_length + 1
+
+def step(workshop_length: int, index: int, button) -> int:
+    """
+    Where the cursor ends up after pressing button on slot index.
+    """
+    slots = slot_count(workshop_length)
+    last = slots - 1
+    page, slot = divmod(index, PAGE_SIZE)
+    column, row = divmod(slot, ROWS)
+
+    if button in (BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER, BUTTONS.XUSB_GAMEPAD_LEFT_SHOULDER):
+        pages = last // PAGE_SIZE + 1
+        page = (page + (1 if button == BUTTONS.XUSB_GAMEPAD_RIGHT_SHOULDER else -1)) % pages
+        return min(page * PAGE_SIZE + slot, last)
+
+    if button == BUTTONS.XUSB_GAMEPAD_DPAD_UP:
+        row -= 1
+    elif button == BUTTONS.XUSB_GAMEPAD_DPAD_DOWN:
+        row += 1
+    elif button == BUTTONS.XUSB_GAMEPAD_DPAD_LEFT:
+        column -= 1
+    elif button == BUTTONS.XUSB_GAMEPAD_DPAD_RIGHT:
+        column += 1
+    else:
+        return index
+
+    if not (0 <= row < ROWS and 0 <= column < PAGE_SIZE // ROWS):
+        return index
+    moved = page * PAGE_SIZE + column * ROWS + row
+    return moved if moved <= last else index
+
+@lru_cache(maxsize=8)
+def _neighbours(workshop_length: int) -> list[tuple[tuple[int, object], ...]]:
+    # (slot, button) for every press that leaves each slot
+    return [tuple((moved, button) for button in MOVES
+            if (moved := step(workshop_length, index, button)) != index)
+        for index in range(slot_count(workshop_length))]
+
+@lru_cache(maxsize=64)
+def _routes_from(workshop_length: int, from_index: int) -> dict[int, tuple[int, object]]:
+    """
+    Breadth-first search over the whole grid: maps each reachable slot to the slot and
+    button it was first reached by.
+    """
+    neighbours = _neighbours(workshop_length)
+    came_from = {from_index: None}
+    queue = deque((from_index,))
+    while queue:
+        index = queue.popleft()
+        for moved, button in neighbours[index]:
+            if moved not in came_from:
+                came_from[moved] = (index, button)
+                queue.append(moved)
+    return came_from
+
+@lru_cache(maxsize=4096)
+def shortest_presses(workshop_length: int, from_index: int, to_index: int) -> tuple:
+    """
+    The fewest button presses that move the cursor from from_index to to_index.
+    """
+    if not (0 <= from_index < slot_count(workshop_length) and 0 <= to_index < slot_count(workshop_length)):
+        raise ValueError(f"Slots {from_index} and {to_index} aren't both in a workshop of {workshop_length}")
+    came_from = _routes_from(workshop_length, from_index)
+    presses = []
+    index = to_index
+    while came_from[index] is not None:
+        index, button = came_from[index]
+        presses.append(button)
+    return tuple(reversed(presses))
\ No newline at end of file
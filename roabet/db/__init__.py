@@ -1,2 +1,13 @@
 from .fighters import Character, Fighters
+from .load_times import LoadTimes
+from .matches import Matches
+from .ratings import Leaderboard, LeaderboardEntry, RatingSnapshot, rating_at, rating_history
 from .stages import Stage, Stages
+from .timings import PhaseTimer
+
+def __getattr__(name):
+    # the writer pulls in asyncio, which the reports and db_actions don't need
+    if name in ('DatabaseReader', 'DatabaseWriter'):
+        from . import writer
+        return getattr(writer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
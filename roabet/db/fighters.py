@@ -1,6 +1,8 @@
 import random
-from roabet import db_con
+import sqlite3
+from roabet.context import context
 from roabet.util import glicko
+from .matchmaking import MatchmakingIndex
 
 from typing import Optional
 
@@ -36,69 +38,138 @@ def ok_matchup(fighter1: Character, fighter2: Character, dev_range: float) -> bo
     return abs(fighter1.provisional_rating.rating - fighter2.provisional_rating.rating) <= max_diff
 
 class Fighters:
-    def __init__(self, *, always_update_ratings: bool=False):
+    # how many deviations apart two fighters' ratings can be for them to be matched up
+    dev_range = 2.0
+    # how much to widen dev_range by when a fighter has no eligible opponents
+    dev_range_growth = 1.5
+    # whether to print a line when a pick had to widen dev_range (one per pick, with the final range)
+    report_widening = True
+
+    def __init__(self, *, always_update_ratings: bool=False, con: sqlite3.Connection=None):
         self.always_update_ratings = always_update_ratings
-        self.load_fighters()
+        self.next_matchup: Optional[list[Character]] = None
+        # how many times _pick_matchup had to widen dev_range to find an opponent
+        self.widened = 0
+        self.load_fighters(con)
     
-    def load_fighters(self):
-        cur = db_con.execute('SELECT * FROM fighters')
+    def load_fighters(self, con: sqlite3.Connection=None):
+        con = con or context.db
+        cur = con.execute('SELECT * FROM fighters')
         self.fighters = {row['id']: Character(row) for row in cur}
         self.matchmaker_pool = [fighter for fighter in self.fighters.values() if not fighter.banned 
             and not fighter.uber and not fighter.potato]
-        self.calc_provisional_ratings()
+        self.calc_provisional_ratings(con)
+        self.matchmaker_index = MatchmakingIndex(self.matchmaker_pool)
+        self.next_matchup = None
     
-    def calc_provisional_ratings(self):
-        last_period = db_con.execute("SELECT last_match FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()['last_match']
-
-        old_ratings: dict[str, glicko.Rating] = {}
+    def calc_provisional_ratings(self, con: sqlite3.Connection=None):
+        """
+        Loads this rating cycle's matches in one go and builds up each fighter's Glicko
+        sums, so later results can be applied with record_result instead of a reload.
+        """
+        con = con or context.db
+        cycle = con.execute("SELECT id, last_match FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()
+        self.rating_cycle: int = cycle['id']
 
-        # Step 1
+        # Step 1: ratings at the start of this cycle, which every match this cycle is scored against
+        self.cycle_ratings: dict[str, glicko.Rating] = {}
         for fighter in self.fighters.values():
             if fighter.exclude_from_rating():
                 continue
-            old_ratings[fighter.id] = glicko.tick_rating(fighter.rating)
+            self.cycle_ratings[fighter.id] = glicko.tick_rating(fighter.rating)
         
-        # Step 2
-        for fighter in old_ratings:
-            cur = db_con.execute("""
-                SELECT player1, player2, winner FROM matches
-                WHERE (player1=:fighter OR player2=:fighter)
-                AND id > :start""", {'fighter': fighter, 'start': last_period})
-            
-            matches = []
-            for row in cur:
-                if row['winner'] not in {1, 2}: continue
-                if (row['player1'] == fighter and row['winner'] == 1) or (row['player2'] == fighter and row['winner'] == 2):
-                    score = 1.0
-                else:
-                    score = 0.0
-                if row['player1'] == fighter:
-                    opponent = row['player2']
-                else:
-                    opponent = row['player1']
-                
-                if opponent not in old_ratings:
-                    continue
-                
-                matches.append((old_ratings[opponent], score))
-            
-            if self.always_update_ratings or len(matches) > 0:
-                # should only give a provisional rating if we've completed at least 1 match this cycle
-                self.fighters[fighter].provisional_rating = glicko.update_rating(old_ratings[fighter], matches)
+        # Step 2: running sums of each fighter's match terms, [variance sum, delta sum, matches]
+        self.cycle_sums: dict[str, list] = {fighter: [0.0, 0.0, 0] for fighter in self.cycle_ratings}
+        cur = con.execute("""
+            SELECT player1, player2, winner FROM matches
+            WHERE id > :start
+            ORDER BY id""", {'start': cycle['last_match']})
+        for row in cur:
+            self._add_result(row['player1'], row['player2'], row['winner'])
 
-    
-    def choose_fighters(self):
-        dev_range = 2.0
+        for fighter in self.cycle_ratings:
+            self._update_provisional_rating(fighter)
+
+    def _add_result(self, player1: str, player2: str, winner: int):
+        if winner not in {1, 2}:
+            return
+        if player1 not in self.cycle_ratings or player2 not in self.cycle_ratings:
+            return
+        for fighter, opponent, score in ((player1, player2, float(winner == 1)), (player2, player1, float(winner == 2))):
+            variance_term, delta_term = glicko.match_terms(self.cycle_ratings[fighter], self.cycle_ratings[opponent], score)
+            sums = self.cycle_sums[fighter]
+            sums[0] += variance_term
+            sums[1] += delta_term
+            sums[2] += 1
+
+    def _update_provisional_rating(self, fighter: str):
+        variance_sum, delta_sum, matches = self.cycle_sums[fighter]
+        if self.always_update_ratings or matches > 0:
+            # should only give a provisional rating if we've completed at least 1 match this cycle
+            old = self.cycle_ratings[fighter]
+            self.fighters[fighter].provisional_rating = (glicko.rating_from_sums(old, variance_sum, delta_sum)
+                if matches else old)
+
+    def record_result(self, fighter1: Character, fighter2: Character, winner: int):
+        """
+        Applies a newly recorded match to the two fighters' provisional ratings.
+        """
+        self._add_result(fighter1.id, fighter2.id, winner)
+        for fighter in (fighter1.id, fighter2.id):
+            if fighter in self.cycle_sums:
+                self._update_provisional_rating(fighter)
+                self.matchmaker_index.update(self.fighters[fighter])
+
+    def check_rating_cycle(self, con: sqlite3.Connection=None) -> bool:
+        """
+        Reloads everything if a rating cycle has ended since we last loaded.
+        Returns whether it did.
+        """
+        con = con or context.db
+        cycle = con.execute("SELECT id FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()
+        if cycle['id'] == self.rating_cycle:
+            return False
+        self.load_fighters(con)
+        return True
+
+    def _pick_matchup(self, rng=random) -> list[Character]:
+        # fighters taken out of the index (e.g. playing in another session) can't be picked
+        if len(self.matchmaker_index) < 2:
+            raise ValueError("Need at least 2 fighters in the matchmaker pool")
+        dev_range = self.dev_range
         # if random.random() > 0.7:
         #     dev_range = 2
         
+        fighter1 = rng.choice(self.matchmaker_pool)
+        while fighter1 not in self.matchmaker_index:
+            fighter1 = rng.choice(self.matchmaker_pool)
         while True:
-            fighter1 = random.choice(self.matchmaker_pool)
-            possible_opponents = [fighter for fighter in self.matchmaker_pool if ok_matchup(fighter1, fighter, dev_range)]
-            if not possible_opponents:
-                print(f"Couldn't find a matchup for {fighter1.name} ({fighter1.provisional_rating})")
-                continue
-            fighter2 = random.choice(possible_opponents)
-            result = [fighter1, fighter2]
-            random.shuffle(result)
-            return result
+            fighter2 = self.matchmaker_index.random_opponent(fighter1, dev_range, rng)
+            if fighter2 is not None:
+                break
+            # widening always ends: eventually the window covers the whole pool
+            dev_range *= self.dev_range_growth
+            self.widened += 1
+        if dev_range != self.dev_range and self.report_widening:
+            print(f"Couldn't find a matchup for {fighter1.name} ({fighter1.provisional_rating}) "
+                f"within {self.dev_range:g} deviations, matched at {dev_range:.2f}")
+        result = [fighter1, fighter2]
+        rng.shuffle(result)
+        return result
+
+    def prefetch_matchup(self, rng=random):
+        """
+        Picks the next matchup ahead of time, e.g. while the current match is playing.
+        """
+        self.next_matchup = self._pick_matchup(rng)
+
+    def choose_fighters(self, rng=random) -> list[Character]:
+        """
+        Returns the prefetched matchup if it's still fair after the latest results,
+        otherwise picks a new one.
+        """
+        matchup, self.next_matchup = self.next_matchup, None
+        if matchup and all(fighter in self.matchmaker_index for fighter in matchup) \
+                and ok_matchup(*matchup, self.dev_range):
+            return matchup
+        return self._pick_matchup(rng)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import datetime
+from math import ceil
+import sqlite3
+from typing import TYPE_CHECKING
+from roabet.context import context
+
+if TYPE_CHECKING:
+    from .fighters import Character
+    from .writer import DatabaseWriter
+
+class LoadTimes:
+    """
+    Learns how long each workshop fighter takes to load from measured selections.
+    A fighter's load_time is a high percentile of its recent measurements plus a margin,
+    so Player.select_character waits long enough nearly every time without padding
+    light fighters with a heavy one's wait. A load still going when the wait timed out
+    is saved at the timeout, so an estimate that's too low grows.
+    With a writer, record_async saves measurements on the writer's thread.
+    """
+    # how many recent measurements the estimate is taken from
+    window = 20
+    percentile = 0.9
+    # seconds added on top, for lag on the rig
+    margin = 0.25
+
+    @classmethod
+    def estimate(cls, samples: list[float]) -> float:
+        ranked = sorted(samples)
+        return ranked[max(ceil(cls.percentile * len(ranked)) - 1, 0)] + cls.margin
+
+    def __init__(self, writer: DatabaseWriter=None):
+        self.writer = writer
+
+    def _save(self, con: sqlite3.Connection, fighter_id: str, measured_at: datetime, seconds: float) -> float:
+        # fighters added since migrating still have the load_time they were waited for before
+        con.execute("""
+            UPDATE fighters SET static_load_time = load_time
+            WHERE id = ? AND NOT EXISTS (SELECT 1 FROM fighter_load_times WHERE fighter = fighters.id)""",
+            (fighter_id,))
+        con.execute("INSERT INTO fighter_load_times (fighter, measured_at, seconds) VALUES (?, ?, ?)",
+            (fighter_id, measured_at, seconds))
+        samples = [row['seconds'] for row in con.execute("""
+            SELECT seconds FROM fighter_load_times
+            WHERE fighter = ?
+            ORDER BY id DESC
+            LIMIT ?""", (fighter_id, self.window))]
+        load_time = self.estimate(samples)
+        con.execute("UPDATE fighters SET load_time = ? WHERE id = ?", (load_time, fighter_id))
+        return load_time
+
+    def record(self, fighter: Character, seconds: float) -> float:
+        """
+        Saves a measured load time and updates the fighter's load_time, in the DB and on
+        the Character. Returns the new estimate.
+        """
+        fighter.load_time = self._save(context.db, fighter.id, datetime.now(), seconds)
+        context.db.commit()
+        return fighter.load_time
+
+    async def record_async(self, fighter: Character, seconds: float) -> float:
+        """
+        Like record, but waits on the writer instead of blocking on the commit.
+        """
+        if self.writer is None:
+            return self.record(fighter, seconds)
+        measured_at = datetime.now()
+        fighter.load_time = await self.writer.run(lambda con: self._save(con, fighter.id, measured_at, seconds))
+        return fighter.load_time
\ No newline at end of file
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from datetime import datetime
+import json
+import sqlite3
+from typing import TYPE_CHECKING
+from roabet.context import context
+
+if TYPE_CHECKING:
+    from roabet.db import Character, Stage
+    from roabet.screenreader.confirmation import MatchResult
+    from .writer import DatabaseWriter
+
+class Matches:
+    """
+    Records match results, along with how the win detector arrived at them.
+    With a writer, record_async does the inserts on the writer's thread.
+    """
+    def __init__(self, writer: DatabaseWriter=None):
+        self.writer = writer
+
+    @staticmethod
+    def _insert(con: sqlite3.Connection, time: datetime, fighters: list[Character], winner: int, stage: Stage,
+            result: MatchResult=None) -> int:
+        cur = con.execute("""INSERT INTO matches
+            (time, player1, player2, winner, stage)
+            VALUES (?, ?, ?, ?, ?)""", (time, fighters[0].id, fighters[1].id, winner, stage.id))
+        match_id = cur.lastrowid
+        if result is not None:
+            con.execute("""INSERT INTO match_results
+                (match_id, confidence, details)
+                VALUES (?, ?, ?)""", (match_id, result.confidence, json.dumps(result.to_json())))
+        return match_id
+
+    def record(self, fighters: list[Character], winner: int, stage: Stage, result: MatchResult=None,
+            con: sqlite3.Connection=None) -> int:
+        """
+        Inserts a finished match and returns its id.
+        """
+        con = con or context.db
+        match_id = self._insert(con, datetime.now(), fighters, winner, stage, result)
+        con.commit()
+        return match_id
+
+    async def record_async(self, fighters: list[Character], winner: int, stage: Stage, result: MatchResult=None) -> int:
+        """
+        Like record, but waits on the writer instead of blocking on the commit.
+        """
+        if self.writer is None:
+            return self.record(fighters, winner, stage, result)
+        time = datetime.now()
+        return await self.writer.run(lambda con: self._insert(con, time, fighters, winner, stage, result))
\ No newline at end of file
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+import random
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from .fighters import Character
+
+class MatchmakingIndex:
+    """
+    The matchmaker pool kept sorted by provisional rating, so eligible opponents
+    (see ok_matchup) can be found by bisection instead of scanning the pool.
+
+    Opponents within fighter1's own deviation window form one contiguous slice of the
+    rating order. The only other eligible opponents are ones whose own, larger
+    deviation reaches fighter1. Fighters are also bucketed by deviation (deviations
+    are whole numbers, so there are at most a few hundred buckets), and each bucket
+    with a larger deviation contributes two more slices: the parts of its own window
+    that stick out past fighter1's.
+    """
+    def __init__(self, fighters: Iterable[Character]=()):
+        self._keys: dict[str, tuple[int, int]] = {}
+        self._ratings: list[int] = []
+        self._by_rating: list[Character] = []
+        self._dev_values: list[int] = []
+        self._buckets: dict[int, tuple[list[int], list[Character]]] = {}
+        for fighter in sorted(fighters, key=lambda f: f.provisional_rating.rating):
+            rating, dev = self._keys[fighter.id] = tuple(fighter.provisional_rating)
+            self._ratings.append(rating)
+            self._by_rating.append(fighter)
+            if dev not in self._buckets:
+                self._buckets[dev] = ([], [])
+                insort(self._dev_values, dev)
+            self._buckets[dev][0].append(rating)
+            self._buckets[dev][1].append(fighter)
+
+    def __len__(self):
+        return len(self._by_rating)
+
+    def __contains__(self, fighter: Character):
+        return fighter.id in self._keys
+
+    @staticmethod
+    def _find(keys: list, fighters: list, key, fighter: Character) -> int:
+        i = bisect_left(keys, key)
+        while fighters[i].id != fighter.id:
+            i += 1
+        return i
+
+    def add(self, fighter: Character):
+        rating, dev = self._keys[fighter.id] = tuple(fighter.provisional_rating)
+        i = bisect_right(self._ratings, rating)
+        self._ratings.insert(i, rating)
+        self._by_rating.insert(i, fighter)
+        if dev not in self._buckets:
+            self._buckets[dev] = ([], [])
+            insort(self._dev_values, dev)
+        ratings, fighters = self._buckets[dev]
+        i = bisect_right(ratings, rating)
+        ratings.insert(i, rating)
+        fighters.insert(i, fighter)
+
+    def remove(self, fighter: Character):
+        rating, dev = self._keys.pop(fighter.id)
+        i = self._find(self._ratings, self._by_rating, rating, fighter)
+        del self._ratings[i]
+        del self._by_rating[i]
+        ratings, fighters = self._buckets[dev]
+        i = self._find(ratings, fighters, rating, fighter)
+        del ratings[i]
+        del fighters[i]
+        if not fighters:
+            del self._buckets[dev]
+            self._dev_values.remove(dev)
+
+    def update(self, fighter: Character):
+        """
+        Re-sorts a fighter whose provisional rating changed.
+        """
+        if fighter.id in self._keys and self._keys[fighter.id] != tuple(fighter.provisional_rating):
+            self.remove(fighter)
+            self.add(fighter)
+
+    def eligible_slices(self, fighter1: Character, dev_range: float) -> list[tuple[list[Character], int, int]]:
+        """
+        Returns (fighters, start, end) slices that together hold every eligible opponent
+        exactly once. The first is fighter1's own window, which includes fighter1 itself
+        if it's in the pool.
+        """
+        rating, dev = fighter1.provisional_rating
+        reach = dev * dev_range
+        slices = [(self._by_rating, bisect_left(self._ratings, rating - reach),
+            bisect_right(self._ratings, rating + reach))]
+        for other_dev in self._dev_values[bisect_right(self._dev_values, dev):]:
+            ratings, fighters = self._buckets[other_dev]
+            other_reach = other_dev * dev_range
+            slices.append((fighters, bisect_left(ratings, rating - other_reach), bisect_left(ratings, rating - reach)))
+            slices.append((fighters, bisect_right(ratings, rating + reach), bisect_right(ratings, rating + other_reach)))
+        return slices
+
+    def random_opponent(self, fighter1: Character, dev_range: float, rng=random) -> Optional[Character]:
+        """
+        Picks uniformly among fighter1's eligible opponents, or returns None if it has none.
+        """
+        slices = self.eligible_slices(fighter1, dev_range)
+        fighters, lo, hi = slices[0]
+        skip = None
+        if fighter1.id in self._keys:
+            position = self._find(self._ratings, self._by_rating, self._keys[fighter1.id][0], fighter1)
+            if lo <= position < hi:
+                skip = position
+        count = sum(end - start for _, start, end in slices) - (skip is not None)
+        if count <= 0:
+            return None
+
+        pick = rng.randrange(count)
+        in_window = hi - lo - (skip is not None)
+        if pick < in_window:
+            i = lo + pick
+            if skip is not None and i >= skip:
+                i += 1
+            return fighters[i]
+        pick -= in_window
+        for fighters, start, end in slices[1:]:
+            if pick < end - start:
+                return fighters[start + pick]
+            pick -= end - start
@@ -0,0 +1,171 @@
+"""
+Rating history and standings, kept so they never need a replay of the match history.
+
+rating_snapshots holds every rated fighter's rating at the end of each rating cycle,
+written by update_glicko when it closes one. leaderboard holds each rated fighter's
+current (provisional) rating, rank and games played; the match loop moves the two
+fighters of each match in it, and it's rebuilt whenever a cycle closes.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+import sqlite3
+import traceback
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from roabet.context import context
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from concurrent.futures import Future
+    from .fighters import Character, Fighters
+    from .writer import DatabaseWriter
+
+class LeaderboardEntry(NamedTuple):
+    rank: int
+    fighter: str
+    name: str
+    rating: int
+    deviation: int
+    games: int
+
+class RatingSnapshot(NamedTuple):
+    cycle: int
+    ended_at: datetime
+    rating: int
+    deviation: int
+    games: int
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> RatingSnapshot:
+        return cls(row['cycle'], datetime.fromisoformat(row['ended_at']), row['rating'], row['deviation'], row['games'])
+
+def save_snapshot(con: sqlite3.Connection, cycle: int, rows: Iterable[tuple[str, int, int, int]]):
+    """
+    Writes each (fighter, rating, deviation, games) as it stood at the end of cycle.
+    """
+    con.executemany("INSERT INTO rating_snapshots (fighter, cycle, rating, deviation, games) VALUES (?, ?, ?, ?, ?)",
+        ((fighter, cycle, rating, deviation, games) for fighter, rating, deviation, games in rows))
+
+def rating_history(fighter: str, con: sqlite3.Connection=None) -> list[RatingSnapshot]:
+    """
+    The fighter's rating at the end of every cycle since snapshots began, oldest first.
+    """
+    con = con or context.db
+    return [RatingSnapshot.from_row(row) for row in con.execute("""
+            SELECT cycle, ended_at, rating, deviation, games FROM rating_snapshots
+            JOIN rating_cycles ON rating_cycles.id = cycle
+            WHERE fighter = ?
+            ORDER BY cycle""", (fighter,))]
+
+def rating_at(fighter: str, when: datetime, con: sqlite3.Connection=None) -> Optional[RatingSnapshot]:
+    """
+    The fighter's rating as of the last cycle that ended by when, or None if there's no
+    snapshot that old.
+    """
+    con = con or context.db
+    row = con.execute("""
+        SELECT cycle, ended_at, rating, deviation, games FROM rating_snapshots
+        JOIN rating_cycles ON rating_cycles.id = cycle
+        WHERE fighter = ? AND cycle <= (SELECT id FROM rating_cycles WHERE ended_at <= ? ORDER BY ended_at DESC LIMIT 1)
+        ORDER BY cycle DESC
+        LIMIT 1""", (fighter, when)).fetchone()
+    return row and RatingSnapshot.from_row(row)
+
+class Leaderboard:
+    """
+    Keeps the leaderboard table up to date. Fighters are ranked by rating, ties broken
+    by id (both descending), so every rank is unique. With a writer, record and refresh
+    hand their work to the writer's thread and return straight away.
+    """
+    def __init__(self, writer: DatabaseWriter=None):
+        self.writer = writer
+
+    def _run(self, job):
+        if self.writer is None:
+            job(context.db)
+            context.db.commit()
+        else:
+            self.writer.submit(job).add_done_callback(self._report_error)
+
+    def record(self, fighters: list[Character]):
+        """
+        Counts a finished match for its fighters and moves them to their new provisional ratings.
+        """
+        rows = [(fighter.id, *fighter.provisional_rating) for fighter in fighters if not fighter.exclude_from_rating()]
+        self._run(lambda con: self._record(con, rows))
+
+    def refresh(self, fighters: Fighters):
+        """
+        Re-ranks everyone from fighters' provisional ratings, e.g. after loading them at
+        startup or after a cycle closes, keeping each fighter's games played.
+        """
+        rows = [(fighter.id, *fighter.provisional_rating) for fighter in fighters.fighters.values()
+            if not fighter.exclude_from_rating()]
+        def job(con):
+            games = dict(con.execute("SELECT fighter, games FROM leaderboard").fetchall())
+            self.rebuild(con, ((id, rating, dev, games.get(id, 0)) for id, rating, dev in rows))
+        self._run(job)
+
+    @staticmethod
+    def _record(con: sqlite3.Connection, rows: list[tuple[str, int, int]]):
+        for fighter, rating, deviation in rows:
+            old = con.execute("SELECT rank, rating FROM leaderboard WHERE fighter = ?", (fighter,)).fetchone()
+            if old is None:
+                # new to the board: start it below everyone, then move it up
+                last = con.execute("SELECT COALESCE(MAX(rank), 0) FROM leaderboard").fetchone()[0]
+                con.execute("INSERT INTO leaderboard (fighter, rank, rating, deviation, games) VALUES (?, ?, ?, ?, 0)",
+                    (fighter, last + 1, rating, deviation))
+                old = {'rank': last + 1, 'rating': None}
+            rank = old['rank']
+            # only the fighters between the old and new spot shift, by one place each
+            if old['rating'] is None or rating > old['rating']:
+                rank -= con.execute("""
+                    UPDATE leaderboard SET rank = rank + 1
+                    WHERE (rating, fighter) < (:rating, :fighter) AND rank < :rank""",
+                    {'rating': rating, 'fighter': fighter, 'rank': old['rank']}).rowcount
+            elif rating < old['rating']:
+                rank += con.execute("""
+                    UPDATE leaderboard SET rank = rank - 1
+                    WHERE (rating, fighter) > (:rating, :fighter) AND rank > :rank""",
+                    {'rating': rating, 'fighter': fighter, 'rank': old['rank']}).rowcount
+            con.execute("UPDATE leaderboard SET rank = ?, rating = ?, deviation = ?, games = games + 1 WHERE fighter = ?",
+                (rank, rating, deviation, fighter))
+
+    @staticmethod
+    def rebuild(con: sqlite3.Connection, rows: Iterable[tuple[str, int, int, int]]):
+        """
+        Replaces the whole leaderboard with (fighter, rating, deviation, games) rows.
+        """
+        ranked = sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)
+        con.execute("DELETE FROM leaderboard")
+        con.executemany("INSERT INTO leaderboard (fighter, rank, rating, deviation, games) VALUES (?, ?, ?, ?, ?)",
+            ((fighter, rank, rating, deviation, games)
+                for rank, (fighter, rating, deviation, games) in enumerate(ranked, 1)))
+
+    @staticmethod
+    def top(n: int=10, offset: int=0, con: sqlite3.Connection=None) -> list[LeaderboardEntry]:
+        """
+        Ranks offset + 1 to offset + n.
+        """
+        con = con or context.db
+        return [LeaderboardEntry(*row) for row in con.execute("""
+            SELECT rank, fighter, name, rating, deviation, games FROM leaderboard
+            JOIN fighters ON fighters.id = fighter
+            WHERE rank > ?
+            ORDER BY rank
+            LIMIT ?""", (offset, n))]
+
+    @staticmethod
+    def entry(fighter: str, con: sqlite3.Connection=None) -> Optional[LeaderboardEntry]:
+        con = con or context.db
+        row = con.execute("""
+            SELECT rank, fighter, name, rating, deviation, games FROM leaderboard
+            JOIN fighters ON fighters.id = fighter
+            WHERE fighter = ?""", (fighter,)).fetchone()
+        return row and LeaderboardEntry(*row)
+
+    @staticmethod
+    def _report_error(future: Future):
+        if (error := future.exception()) is not None:
+            print("Couldn't update the leaderboard!")
+            traceback.print_exception(type(error), error, error.__traceback__)
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Database schema and migrations. The schema version lives in SQLite's user_version
+pragma; each migration runs in its own transaction and bumps it by one.
+Run them with `python -m db_actions migrate`.
+Timestamps are local time, the way datetime.now() writes them.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+# Never edit a migration that's been released; add a new one instead.
+MIGRATIONS = [
+    # 1: the tables as they were before migrations existed
+    """
+    CREATE TABLE IF NOT EXISTS fighters (
+        id TEXT PRIMARY KEY,
+        official BOOLEAN NOT NULL DEFAULT FALSE,
+        name TEXT NOT NULL,
+        steam_id TEXT,
+        author TEXT,
+        workshop_index INTEGER,
+        select_x INTEGER NOT NULL,
+        select_y INTEGER NOT NULL,
+        matchmaker_banned BOOLEAN NOT NULL DEFAULT FALSE,
+        is_uber BOOLEAN NOT NULL DEFAULT FALSE,
+        is_potato BOOLEAN NOT NULL DEFAULT FALSE,
+        load_time REAL NOT NULL DEFAULT 0,
+        glicko_rating INTEGER NOT NULL DEFAULT 1500,
+        glicko_deviation INTEGER NOT NULL DEFAULT 350
+    );
+    CREATE TABLE IF NOT EXISTS stages (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        official BOOLEAN NOT NULL DEFAULT TRUE,
+        select_x INTEGER NOT NULL,
+        select_y INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        time TIMESTAMP NOT NULL,
+        player1 TEXT NOT NULL,
+        player2 TEXT NOT NULL,
+        winner INTEGER,
+        stage TEXT
+    );
+    CREATE TABLE IF NOT EXISTS rating_cycles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ended_at TIMESTAMP NOT NULL,
+        last_match INTEGER NOT NULL
+    );
+    -- Fighters needs a cycle to count provisional ratings from
+    INSERT INTO rating_cycles (ended_at, last_match)
+        SELECT datetime('now', 'localtime'), 0 WHERE NOT EXISTS (SELECT 1 FROM rating_cycles);
+    """,
+
+    # 2: win detector confidence for each match
+    """
+    CREATE TABLE IF NOT EXISTS match_results (
+        match_id INTEGER PRIMARY KEY REFERENCES matches(id),
+        confidence REAL NOT NULL,
+        details TEXT NOT NULL
+    );
+    """,
+
+    # 3: indexes for per-fighter match lookups and workshop ordering
+    """
+    CREATE INDEX IF NOT EXISTS matches_player1 ON matches (player1, id, player2, winner);
+    CREATE INDEX IF NOT EXISTS matches_player2 ON matches (player2, id, player1, winner);
+    CREATE INDEX IF NOT EXISTS fighters_workshop_index ON fighters (workshop_index);
+    """,
+
+    # 4: measured workshop fighter load times, which fighters.load_time is estimated from
+    """
+    CREATE TABLE IF NOT EXISTS fighter_load_times (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fighter TEXT NOT NULL REFERENCES fighters(id),
+        measured_at TIMESTAMP NOT NULL,
+        seconds REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS fighter_load_times_fighter ON fighter_load_times (fighter, id);
+    -- the load_time that was waited for before any were measured, to report savings against
+    ALTER TABLE fighters ADD COLUMN static_load_time REAL NOT NULL DEFAULT 0;
+    UPDATE fighters SET static_load_time = load_time;
+    """,
+
+    # 5: how long each phase of the match loop took
+    """
+    CREATE TABLE IF NOT EXISTS match_timings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        match_id INTEGER REFERENCES matches(id),
+        phase TEXT NOT NULL,
+        started_at TIMESTAMP NOT NULL,
+        seconds REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS match_timings_started_at ON match_timings (started_at);
+    """,
+
+    # 6: what each workshop folder's config.ini looked like when it was last synced
+    """
+    CREATE TABLE IF NOT EXISTS workshop_sync (
+        steam_id TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        hash TEXT NOT NULL,
+        synced_at TIMESTAMP NOT NULL
+    );
+    """,
+
+    # 7: every rated fighter's rating at the end of each cycle, and the current standings
+    """
+    CREATE TABLE IF NOT EXISTS rating_snapshots (
+        fighter TEXT NOT NULL REFERENCES fighters(id),
+        cycle INTEGER NOT NULL REFERENCES rating_cycles(id),
+        rating INTEGER NOT NULL,
+        deviation INTEGER NOT NULL,
+        games INTEGER NOT NULL,
+        PRIMARY KEY (fighter, cycle)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS rating_snapshots_cycle ON rating_snapshots (cycle);
+    CREATE INDEX IF NOT EXISTS rating_cycles_ended_at ON rating_cycles (ended_at);
+    CREATE TABLE IF NOT EXISTS leaderboard (
+        fighter TEXT PRIMARY KEY REFERENCES fighters(id),
+        rank INTEGER NOT NULL,
+        rating INTEGER NOT NULL,
+        deviation INTEGER NOT NULL,
+        games INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS leaderboard_rank ON leaderboard (rank);
+    CREATE INDEX IF NOT EXISTS leaderboard_rating ON leaderboard (rating, fighter);
+    -- start the standings from the last cycle's ratings; the match loop brings them up to date
+    INSERT INTO leaderboard (fighter, rank, rating, deviation, games)
+        SELECT id, ROW_NUMBER() OVER (ORDER BY glicko_rating DESC, id DESC), glicko_rating, glicko_deviation,
+            (SELECT COUNT(*) FROM matches JOIN fighters AS opponent ON opponent.id = player2
+                WHERE player1 = fighters.id AND winner IN (1, 2) AND NOT opponent.is_uber AND NOT opponent.is_potato)
+            + (SELECT COUNT(*) FROM matches JOIN fighters AS opponent ON opponent.id = player1
+                WHERE player2 = fighters.id AND winner IN (1, 2) AND NOT opponent.is_uber AND NOT opponent.is_potato)
+        FROM fighters
+        WHERE NOT is_uber AND NOT is_potato;
+    """,
+]
+
+def schema_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(con: sqlite3.Connection) -> list[int]:
+    """
+    Applies every migration newer than the database. Returns the versions applied.
+    """
+    current = schema_version(con)
+    if current > len(MIGRATIONS):
+        raise RuntimeError(f"Database is at schema version {current}, but this code only knows {len(MIGRATIONS)}")
+
+    applied = []
+    for version, script in enumerate(MIGRATIONS, 1):
+        if version <= current:
+            continue
+        con.commit()
+        try:
+            con.executescript(f"BEGIN; {script}; PRAGMA user_version = {version}; COMMIT;")
+        except sqlite3.Error:
+            con.rollback()
+            raise
+        applied.append(version)
+    return applied
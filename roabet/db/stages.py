@@ -1,5 +1,6 @@
 import random
-from roabet import db_con
+import sqlite3
+from roabet.context import context
 
 class Stage:
     def __init__(self, data):
@@ -10,11 +11,11 @@ class Stage:
         self.select_y: int = data['select_y']
 
 class Stages:
-    def __init__(self):
-        self.load_stages()
+    def __init__(self, con: sqlite3.Connection=None):
+        self.load_stages(con)
     
-    def load_stages(self):
-        cur = db_con.execute('SELECT * FROM stages')
+    def load_stages(self, con: sqlite3.Connection=None):
+        cur = (con or context.db).execute('SELECT * FROM stages')
         self.stages = [Stage(row) for row in cur]
     
     def select_stage(self):
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime
+import sqlite3
+import time
+import traceback
+from typing import TYPE_CHECKING, Optional
+from roabet.context import context
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from .writer import DatabaseWriter
+
+class PhaseTimer:
+    """
+    Times the phases of each match cycle. Spans are kept in memory and written to
+    match_timings in one go by flush, once per match. With a writer, flush hands them to
+    the writer's thread and returns straight away.
+
+        with timer.span('select_fighters'):
+            await controllers.select_fighters(*fighters)
+    """
+    def __init__(self, writer: DatabaseWriter=None):
+        self.writer = writer
+        self.spans: list[tuple[str, datetime, float]] = []
+
+    @contextmanager
+    def span(self, phase: str):
+        started_at = datetime.now()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # wall-clock start for the report's time window, perf_counter for the duration
+            self.spans.append((phase, started_at, time.perf_counter() - start))
+
+    def flush(self, match_id: Optional[int]=None):
+        """
+        Writes the spans so far, tagged with match_id (the match they led up to).
+        """
+        if not self.spans:
+            return
+        rows = [(match_id, phase, started_at, seconds) for phase, started_at, seconds in self.spans]
+        self.spans = []
+        if self.writer is None:
+            self._insert(context.db, rows)
+            context.db.commit()
+        else:
+            self.writer.submit(lambda con: self._insert(con, rows)).add_done_callback(self._report_error)
+
+    @staticmethod
+    def _insert(con: sqlite3.Connection, rows: list[tuple]):
+        con.executemany("INSERT INTO match_timings (match_id, phase, started_at, seconds) VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _report_error(future: Future):
+        # nobody waits on these, so failures would otherwise go unnoticed
+        if (error := future.exception()) is not None:
+            print("Couldn't save phase timings!")
+            traceback.print_exception(type(error), error, error.__traceback__)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Database access that keeps SQLite off the event loop thread, so a slow commit or a
+lock held by update_glicko can't hold up controller inputs.
+
+DatabaseWriter runs every write on one thread with its own connection, batching queued
+jobs into a single commit. DatabaseReader runs reads on a small pool of threads, each
+with its own connection (WAL lets them read while the writer writes).
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Any
+
+from roabet.context import DB_PATH, connect
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+class DatabaseWriter:
+    """
+    Runs write jobs, functions of a connection, on a dedicated thread. Jobs that are
+    queued together (up to max_batch, or arriving within batch_window seconds of the
+    first) share one transaction and commit. Each job gets a savepoint, so one failing
+    only rolls back itself; its future gets the exception.
+    A job's future resolves once its batch is committed.
+    """
+    def __init__(self, path=DB_PATH, *, max_batch: int=64, batch_window: float=0.01):
+        self.path = path
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread = None
+
+        self.batches = 0
+        self.jobs = 0
+        self.max_commit_time = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='DatabaseWriter', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """
+        Finishes every queued job, then stops the thread.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, job: Callable[[sqlite3.Connection], Any]) -> Future:
+        self.start()
+        future = Future()
+        self._queue.put((job, future))
+        return future
+
+    async def run(self, job: Callable[[sqlite3.Connection], Any]):
+        """
+        Queues job and waits for it to be committed, returning its result.
+        """
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _next_batch(self) -> tuple[list, bool]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        stopping = batch[-1] is None
+        return [item for item in batch if item is not None], stopping
+
+    def _run(self):
+        con = connect(self.path)
+        try:
+            while True:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._write(con, batch)
+                if stopping:
+                    return
+        finally:
+            con.close()
+
+    def _write(self, con: sqlite3.Connection, batch: list):
+        results = []
+        try:
+            con.execute('BEGIN IMMEDIATE')
+            for job, future in batch:
+                # skip jobs whose caller gave up on them (say, a cancelled task awaiting run)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                con.execute('SAVEPOINT job')
+                try:
+                    results.append((future, job(con), None))
+                except Exception as e:
+                    con.execute('ROLLBACK TO job')
+                    results.append((future, None, e))
+                con.execute('RELEASE job')
+            start = time.perf_counter()
+            con.commit()
+            self.max_commit_time = max(self.max_commit_time, time.perf_counter() - start)
+        except sqlite3.Error as e:
+            # couldn't get the write lock or commit: the whole batch failed
+            if con.in_transaction:
+                con.rollback()
+            results = [(future, None, e) for job, future in batch if future.running()]
+        self.batches += 1
+        self.jobs += len(batch)
+
+        for future, result, error in results:
+            # nothing a caller does with its future may take the writer thread down
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            except Exception:
+                traceback.print_exc()
+
+class DatabaseReader:
+    """
+    Runs read jobs, functions of a connection, on a pool of threads with their own connections.
+    """
+    def __init__(self, path=DB_PATH, *, threads: int=2):
+        self.path = path
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='DatabaseReader')
+        # every thread's connection, so close can close them all
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, 'con'):
+            # only ever used on this thread, but closed from whichever thread calls close
+            self._local.con = connect(self.path, check_same_thread=False)
+            with self._connections_lock:
+                self._connections.append(self._local.con)
+        return self._local.con
+
+    def submit(self, job: Callable[[sqlite3.Connection], Any]) -> Future:
+        return self._pool.submit(lambda: job(self._connection()))
+
+    async def run(self, job: Callable[[sqlite3.Connection], Any]):
+        return await asyncio.wrap_future(self.submit(job))
+
+    def close(self):
+        self._pool.shutdown()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for con in connections:
+            con.close()
\ No newline at end of file
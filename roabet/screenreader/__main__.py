@@ -1,3 +1,7 @@
+import json
+import sys
+from .frame_source import open_replay
 from .win_detection_process import win_detector_loop
 
-win_detector_loop()
\ No newline at end of file
+source = open_replay(sys.argv[1]) if len(sys.argv) > 1 else None
+json.dump({'winner': win_detector_loop(source)}, sys.stdout)
\ No newline at end of file
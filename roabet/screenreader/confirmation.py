@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import NamedTuple, Optional
+from .win_detection import FrameScores
+
+class Vote(NamedTuple):
+    timestamp: float
+    scores: FrameScores
+
+class MatchResult(NamedTuple):
+    winner: int
+    # mean player tag score over the votes that decided the result
+    confidence: float
+    votes: list[Vote]
+
+    def to_json(self) -> dict:
+        """
+        JSON-friendly form for storing next to the match. Timestamps are relative
+        to the first vote.
+        """
+        start = self.votes[0].timestamp
+        return {
+            'winner': self.winner,
+            'confidence': self.confidence,
+            'frames': [{
+                't': round(vote.timestamp - start, 4),
+                'winner': vote.scores.winner,
+                'scores': {name: {'score': round(match.score, 4), 'loc': list(match.loc)}
+                    for name, match in vote.scores.matches.items()},
+            } for vote in self.votes],
+        }
+
+class ResultVoter:
+    """
+    Confirms a result only once `required` frames within `window` seconds agree
+    on the winner. A frame naming the other player throws the pending votes out;
+    frames with no winner in between are ignored.
+    While votes are pending, frames should be grabbed every `interval` seconds.
+    """
+    def __init__(self, *, required: int=3, window: float=0.5, interval: float=0.04):
+        self.required = required
+        self.window = window
+        self.interval = interval
+        self.votes: deque[Vote] = deque()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.votes)
+
+    def reset(self):
+        self.votes.clear()
+
+    def add(self, timestamp: float, scores: FrameScores) -> Optional[MatchResult]:
+        """
+        Feeds one frame's scores in. Returns the MatchResult once it's confirmed.
+        """
+        while self.votes and self.votes[0].timestamp < timestamp - self.window:
+            self.votes.popleft()
+        if scores.winner is None:
+            return None
+        if self.votes and self.votes[-1].scores.winner != scores.winner:
+            self.votes.clear()
+        self.votes.append(Vote(timestamp, scores))
+        if len(self.votes) < self.required:
+            return None
+
+        votes = list(self.votes)
+        self.votes.clear()
+        confidence = sum(max(match.score for name, match in vote.scores.matches.items() if name != 'win_text')
+            for vote in votes) / len(votes)
+        return MatchResult(scores.winner, confidence, votes)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Optional
+import cv2
+from .frame_source import FrameSource
+
+class CursorLocator:
+    """
+    Finds player cursors on a captured frame by template matching, so controllers
+    can re-anchor their tracked cursor positions.
+
+    source should capture the whole game window (e.g. WindowCapture(region=(0, 0, 960, 540))),
+    so frame coordinates are the same game pixels the controllers use.
+    templates maps a player number to an image of that player's cursor, and hotspot
+    is where the cursor actually points within the template.
+    """
+    method = cv2.TM_CCOEFF_NORMED
+
+    def __init__(self, source: FrameSource, templates: dict[int, str], *,
+            hotspot: tuple[int, int]=(0, 0), threshold: float=0.8):
+        self.source = source
+        self.templates = {int(num): cv2.imread(str(path), cv2.IMREAD_GRAYSCALE) for num, path in templates.items()}
+        missing = [num for num, template in self.templates.items() if template is None]
+        if missing:
+            raise FileNotFoundError(f"Couldn't load cursor templates for players {missing}")
+        self.hotspot = hotspot
+        self.threshold = threshold
+
+    def locate(self, player_num: int) -> Optional[tuple[int, int]]:
+        """
+        Returns where player_num's cursor points, or None if it couldn't be found.
+        Grabs a new frame, so call it through asyncio.to_thread from the event loop.
+        """
+        template = self.templates.get(player_num)
+        if template is None:
+            return None
+        frame = self.source.get_frame()
+        if frame is None:
+            return None
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        result = cv2.matchTemplate(frame, template, self.method)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        if max_val < self.threshold:
+            return None
+        return max_loc[0] + self.hotspot[0], max_loc[1] + self.hotspot[1]
\ No newline at end of file
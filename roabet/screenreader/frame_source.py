@@ -0,0 +1,174 @@
+"""
+Frame sources for the screenreader. WindowCapture grabs the live game window;
+the replay sources play back recorded frames so detection can be run and timed
+without the game.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+import time
+from typing import Optional
+
+import cv2
+import numpy
+
+class CaptureStats:
+    """
+    Running per-frame latency and allocation figures for a capture backend.
+    Allocations are the net change in sys.getallocatedblocks() across a frame, so a
+    capture path that doesn't churn memory should hover around zero.
+    """
+    def __init__(self):
+        self.frames = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_blocks = 0
+        self.max_blocks = 0
+
+    def start(self) -> tuple[float, int]:
+        return time.perf_counter(), sys.getallocatedblocks()
+
+    def stop(self, started: tuple[float, int]):
+        latency = time.perf_counter() - started[0]
+        blocks = sys.getallocatedblocks() - started[1]
+        self.frames += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_blocks += blocks
+        self.max_blocks = max(self.max_blocks, blocks)
+
+    def __str__(self):
+        if not self.frames:
+            return "no frames captured"
+        return (f"{self.frames} frames, {self.total_latency / self.frames * 1000:.2f} ms avg "
+            f"/ {self.max_latency * 1000:.2f} ms max latency, "
+            f"{self.total_blocks / self.frames:+.2f} avg / {self.max_blocks:+d} max allocated blocks per frame")
+
+class FrameSource:
+    """
+    Produces BGR frames for the win detector. get_frame returns None once the source
+    is exhausted (live sources never are).
+    """
+    # seconds to wait between polls when the source doesn't pace itself
+    poll_interval: float = 0
+    # sources that track their own capture cost set this to a CaptureStats
+    stats: Optional[CaptureStats] = None
+
+    def get_frame(self) -> Optional[numpy.ndarray]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        while (frame := self.get_frame()) is not None:
+            yield frame
+
+class ReplaySource(FrameSource):
+    """
+    Base class for sources that play back recorded frames.
+    fps=None plays frames back as fast as they can be read.
+    region=(x, y, w, h) crops each frame, e.g. to cut the detection area out of a
+    full-window recording.
+    """
+    def __init__(self, *, fps: Optional[float]=None, region: Optional[tuple[int, int, int, int]]=None):
+        self.fps = fps
+        self.region = region
+        self._next_due: Optional[float] = None
+
+    def _read_frame(self) -> Optional[numpy.ndarray]:
+        raise NotImplementedError
+
+    def get_frame(self):
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_due is None:
+                self._next_due = now
+            elif self._next_due > now:
+                time.sleep(self._next_due - now)
+            self._next_due += 1 / self.fps
+
+        frame = self._read_frame()
+        if frame is None or self.region is None:
+            return frame
+        x, y, w, h = self.region
+        return numpy.ascontiguousarray(frame[y:y+h, x:x+w])
+
+class PngDirectorySource(ReplaySource):
+    """
+    Plays back every PNG in a directory, in filename order.
+    """
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.paths = sorted(Path(path).glob('*.png'))
+        self._pos = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _read_frame(self):
+        if self._pos >= len(self.paths):
+            return None
+        frame = cv2.imread(str(self.paths[self._pos]), cv2.IMREAD_COLOR)
+        self._pos += 1
+        return frame
+
+class NpyStackSource(ReplaySource):
+    """
+    Plays back a .npy file holding a (frames, height, width, 3) uint8 stack.
+    The file is memory-mapped, so long recordings don't need to fit in memory.
+    """
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.stack = numpy.load(path, mmap_mode='r')
+        if self.stack.ndim != 4:
+            raise ValueError(f"Expected a (frames, height, width, 3) stack, got shape {self.stack.shape}")
+        self._pos = 0
+
+    def __len__(self):
+        return len(self.stack)
+
+    def _read_frame(self):
+        if self._pos >= len(self.stack):
+            return None
+        frame = numpy.ascontiguousarray(self.stack[self._pos])
+        self._pos += 1
+        return frame
+
+class VideoFileSource(ReplaySource):
+    """
+    Plays back any video file OpenCV can decode.
+    """
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.capture = cv2.VideoCapture(str(path))
+        if not self.capture.isOpened():
+            raise ValueError(f"Couldn't open video: {path}")
+
+    def __len__(self):
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def _read_frame(self):
+        ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def close(self):
+        self.capture.release()
+
+def open_replay(path, **kwargs) -> ReplaySource:
+    """
+    Picks a replay backend based on what path points to.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return PngDirectorySource(path, **kwargs)
+    if path.suffix == '.npy':
+        return NpyStackSource(path, **kwargs)
+    return VideoFileSource(path, **kwargs)
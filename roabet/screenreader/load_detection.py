@@ -0,0 +1,100 @@
+"""
+Tells when a workshop fighter has finished loading on character select, so its load
+time can be measured instead of guessed.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING, NamedTuple, Optional
+import cv2
+
+if TYPE_CHECKING:
+    import numpy
+    from .frame_source import FrameSource
+
+class LoadWait(NamedTuple):
+    seconds: float
+    # False if the portrait was still changing at the timeout; seconds is then the
+    # timeout, which the real load time is at least
+    settled: bool
+
+class LoadDetector:
+    """
+    Watches a player's portrait on their player card. Once a fighter is picked its
+    portrait changes, and when loading is done it stops changing; the fighter counts as
+    loaded from the first of settle_polls polls in a row without change.
+
+    source should capture the whole game window, like CursorLocator's.
+    portrait_region is player 1's portrait as (x, y, width, height) in game pixels; each
+    later player's is spacing pixels further right.
+    One detector is shared by every player, and their polls run on separate threads at
+    once; each poll takes the source's frame and crops its portrait under a lock, since
+    sources like PersistentWindowCapture reuse one buffer for every frame.
+    """
+    def __init__(self, source: FrameSource, portrait_region: tuple[int, int, int, int], *, spacing: int=238,
+            interval: float=0.1, settle_polls: int=3, change_threshold: float=6.0, scale: float=0.5):
+        self.source = source
+        self.portrait_region = tuple(portrait_region)
+        self.spacing = spacing
+        self.interval = interval
+        self.settle_polls = settle_polls
+        # mean difference per pixel (0-255) that counts as the portrait changing
+        self.change_threshold = change_threshold
+        self.scale = scale
+        self._lock = threading.Lock()
+
+    def _portrait(self, player_num: int) -> Optional[numpy.ndarray]:
+        x, y, w, h = self.portrait_region
+        x += self.spacing * (player_num - 1)
+        with self._lock:
+            frame = self.source.get_frame()
+            if frame is None:
+                return None
+            portrait = frame[y:y + h, x:x + w]
+            # both make a copy, so the portrait is ours once the lock is released
+            if portrait.ndim == 3:
+                portrait = cv2.cvtColor(portrait, cv2.COLOR_BGR2GRAY)
+            return cv2.resize(portrait, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def _changed(self, a: numpy.ndarray, b: numpy.ndarray) -> bool:
+        return cv2.norm(a, b, cv2.NORM_L1) / a.size > self.change_threshold
+
+    async def snapshot(self, player_num: int) -> Optional[numpy.ndarray]:
+        """
+        The portrait as it is now; take one just before picking a fighter.
+        """
+        return await asyncio.to_thread(self._portrait, player_num)
+
+    async def wait_loaded(self, player_num: int, before: Optional[numpy.ndarray], *,
+            timeout: float) -> Optional[LoadWait]:
+        """
+        Waits up to timeout seconds for player_num's fighter to load, starting now.
+        Returns how long loading took, or the timeout if it was still going, or None if
+        the portrait never changed at all (so there's nothing to learn from).
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        previous = before
+        changed = False
+        steady_since = None
+        steady = 0
+        while loop.time() - start < timeout:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(self._portrait, player_num)
+            now = loop.time()
+            if current is None or previous is None:
+                previous = current
+                continue
+            if not changed:
+                changed = before is None or self._changed(current, before)
+            elif self._changed(current, previous):
+                steady = 0
+            else:
+                if not steady:
+                    steady_since = now - self.interval
+                steady += 1
+                if steady >= self.settle_polls:
+                    return LoadWait(steady_since - start, True)
+            previous = current
+        return LoadWait(timeout, False) if changed else None
\ No newline at end of file
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+class PollingPolicy:
+    """
+    Decides how long the win detector waits between frames during a match.
+
+    Nobody wins in the first quiet_period seconds, so frames are sampled every
+    early_interval seconds. After that the interval ramps down linearly to
+    late_interval as the match time limit approaches. Whenever the average
+    brightness of a frame jumps by more than burst_threshold (out of 255), like it
+    does when the results screen fades in, frames are sampled every burst_interval
+    seconds for burst_duration seconds.
+    """
+    def __init__(self, *, match_time: float=300, quiet_period: float=60,
+            early_interval: float=0.5, late_interval: float=0.1,
+            burst_interval: float=0.04, burst_duration: float=3, burst_threshold: float=10):
+        self.match_time = match_time
+        self.quiet_period = quiet_period
+        self.early_interval = early_interval
+        self.late_interval = late_interval
+        self.burst_interval = burst_interval
+        self.burst_duration = burst_duration
+        self.burst_threshold = burst_threshold
+
+        self.started_at = 0.0
+        self.burst_until = 0.0
+        self.brightness: Optional[float] = None
+        self.frames = 0
+        self.bursts = 0
+
+    def start_match(self, now: Optional[float]=None):
+        self.started_at = time.perf_counter() if now is None else now
+        self.burst_until = 0.0
+        self.brightness = None
+        self.frames = 0
+        self.bursts = 0
+
+    def _check_brightness(self, frame, now: float):
+        # every 8th pixel is plenty to notice a fade
+        brightness = float(frame[::8, ::8].mean())
+        if self.brightness is not None and abs(brightness - self.brightness) > self.burst_threshold:
+            if now >= self.burst_until:
+                self.bursts += 1
+            self.burst_until = now + self.burst_duration
+        self.brightness = brightness
+
+    def next_interval(self, frame, now: Optional[float]=None) -> float:
+        """
+        Call after every frame that didn't show a result. Returns how long to wait
+        before grabbing the next one.
+        """
+        now = time.perf_counter() if now is None else now
+        self.frames += 1
+        self._check_brightness(frame, now)
+        if now < self.burst_until:
+            return self.burst_interval
+
+        elapsed = now - self.started_at
+        if elapsed < self.quiet_period:
+            return self.early_interval
+        ramp = self.match_time - self.quiet_period
+        progress = min((elapsed - self.quiet_period) / ramp, 1) if ramp > 0 else 1
+        return self.early_interval + (self.late_interval - self.early_interval) * progress
@@ -0,0 +1,144 @@
+"""
+Recognizes which screen the game is on, so the controllers can wait for a screen to
+come up instead of sleeping for a fixed time.
+
+ScreenClassifier works on a shrunken grayscale copy of the whole 960x540 window:
+a dark, flat frame is a loading screen, the "1st" win text means the results screen,
+and every other screen needs a template of something that only appears on it.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, NamedTuple, Optional
+import cv2
+from .frame_source import CaptureStats
+from .states import ScreenState
+
+if TYPE_CHECKING:
+    import numpy
+    from .frame_source import FrameSource
+
+class StateTemplate(NamedTuple):
+    state: ScreenState
+    # grayscale, already shrunk to the classifier's scale
+    image: numpy.ndarray
+    # (x, y, width, height) to search, in shrunk pixels; None for the whole frame
+    region: Optional[tuple[int, int, int, int]]
+    threshold: float
+
+class ScreenClassifier:
+    """
+    templates maps a ScreenState value (e.g. 'character_select') to an image path, or to
+    a dict with 'path' and optionally 'region' ([x, y, width, height] of the 960x540
+    window to search) and 'threshold'. Templates are tried in order; the first match wins.
+    scale is how much frames and templates are shrunk before matching.
+    """
+    method = cv2.TM_CCOEFF_NORMED
+    # a loading screen is darker than this on average, and flatter than loading_contrast
+    loading_brightness = 12
+    loading_contrast = 8
+    # where the "1st" text can be on the results screen (the win detector's capture region)
+    results_region = (480, 70, 480, 260)
+
+    def __init__(self, templates: dict[str, str | dict]=None, *, scale: float=0.5, threshold: float=0.8,
+            results=True):
+        self.scale = scale
+        self.templates: list[StateTemplate] = []
+        if results:
+            self.templates.append(self._load(ScreenState.RESULTS, 'img/1st_template.png', self.results_region, threshold))
+        for state, template in (templates or {}).items():
+            if not isinstance(template, dict):
+                template = {'path': template}
+            self.templates.append(self._load(ScreenState(state), template['path'], template.get('region'),
+                template.get('threshold', threshold)))
+        self.stats = CaptureStats()
+
+    def recognizes(self, state: ScreenState) -> bool:
+        """
+        Whether state can be told apart at all, i.e. it's the loading screen or has a template.
+        """
+        return state == ScreenState.LOADING or any(template.state == state for template in self.templates)
+
+    def _load(self, state: ScreenState, path: str, region, threshold: float) -> StateTemplate:
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise FileNotFoundError(f"Couldn't load the {state.value} template {path}")
+        if region is not None:
+            region = tuple(round(value * self.scale) for value in region)
+        return StateTemplate(state, self._shrink(image), region, threshold)
+
+    def _shrink(self, image: numpy.ndarray) -> numpy.ndarray:
+        if self.scale == 1:
+            return image
+        return cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def classify(self, frame: numpy.ndarray) -> ScreenState:
+        """
+        Classifies a BGR or grayscale frame of the whole game window.
+        """
+        started = self.stats.start()
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = self._shrink(frame)
+        state = self._classify(small)
+        self.stats.stop(started)
+        return state
+
+    def _classify(self, small: numpy.ndarray) -> ScreenState:
+        mean, std = cv2.meanStdDev(small)
+        if mean[0][0] < self.loading_brightness and std[0][0] < self.loading_contrast:
+            return ScreenState.LOADING
+        for template in self.templates:
+            area = small
+            if template.region:
+                x, y, w, h = template.region
+                area = small[y:y + h, x:x + w]
+            if area.shape[0] < template.image.shape[0] or area.shape[1] < template.image.shape[1]:
+                continue
+            result = cv2.matchTemplate(area, template.image, self.method)
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            if max_val >= template.threshold:
+                return template.state
+        return ScreenState.UNKNOWN
+
+class ScreenWatcher:
+    """
+    Polls a frame source every interval seconds and classifies what's on screen.
+    A state only counts once it's been seen on confirm_frames polls in a row, so a
+    screen that's still fading in isn't acted on too early.
+    """
+    def __init__(self, source: FrameSource, classifier: ScreenClassifier, *, interval: float=0.2,
+            confirm_frames: int=2):
+        self.source = source
+        self.classifier = classifier
+        self.interval = interval
+        self.confirm_frames = confirm_frames
+        self.state = ScreenState.UNKNOWN
+
+    def _grab(self) -> ScreenState:
+        frame = self.source.get_frame()
+        return ScreenState.UNKNOWN if frame is None else self.classifier.classify(frame)
+
+    def recognizes(self, state: ScreenState) -> bool:
+        return self.classifier.recognizes(state)
+
+    async def poll(self) -> ScreenState:
+        self.state = await asyncio.to_thread(self._grab)
+        return self.state
+
+    async def wait_for(self, *states: ScreenState, timeout: float=None) -> Optional[ScreenState]:
+        """
+        Waits until one of states is on screen and returns it, or returns None after timeout seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        seen = 0
+        while True:
+            started = loop.time()
+            state = await self.poll()
+            seen = seen + 1 if state in states else 0
+            if seen >= self.confirm_frames:
+                return state
+            if deadline is not None and loop.time() + self.interval > deadline:
+                return None
+            await asyncio.sleep(max(self.interval - (loop.time() - started), 0))
\ No newline at end of file
@@ -1,16 +1,43 @@
 # adapted from https://github.com/learncodebygaming/opencv_tutorials/blob/master/004_window_capture/windowcapture.py
 
+import ctypes
+import cv2
 import numpy
 import win32gui, win32ui, win32con
-
-class WindowCapture:
+from .frame_source import CaptureStats, FrameSource
+
+def find_windows(window_name=None) -> list[int]:
+    """
+    Handles of every visible window titled window_name (the game's by default), ordered
+    left to right, then top to bottom, so running instances can be told apart by position.
+    """
+    window_name = window_name or WindowCapture.window_name
+    hwnds = []
+    def collect(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd) == window_name:
+            hwnds.append(hwnd)
+        return True
+    win32gui.EnumWindows(collect, None)
+    return sorted(hwnds, key=lambda hwnd: win32gui.GetWindowRect(hwnd)[:2])
+
+class WindowCapture(FrameSource):
 
     window_name = "Rivals of Aether"
+    poll_interval = 0.04
+
+    # the part of the window the win detector needs: (x, y, w, h)
+    results_region = (480, 70, 480, 260)
 
     # constructor
-    def __init__(self):
+    def __init__(self, region=None, *, hwnd=None):
+        """
+        region=(x, y, w, h) picks the part of the window to capture, in game pixels.
+        Defaults to results_region, about 1/4 of the window.
+        hwnd picks which window to capture when several instances are running (see
+        find_windows); by default it's the first one titled window_name.
+        """
         # find the handle for the window we want to capture
-        self.hwnd = win32gui.FindWindow(None, self.window_name)
+        self.hwnd = hwnd or win32gui.FindWindow(None, self.window_name)
         if not self.hwnd:
             raise Exception('Window not found: {}'.format(self.window_name))
 
@@ -19,8 +46,7 @@ class WindowCapture:
         # self.w = 960
         # self.h = 540
         # we only need to search about 1/4 the actual window
-        self.w = 480
-        self.h = 260
+        region_x, region_y, self.w, self.h = region or self.results_region
 
         # account for the window border and titlebar and cut them off
         # border_pixels = 8
@@ -32,8 +58,8 @@ class WindowCapture:
 
         # set the cropped coordinates offset so we can translate screenshot
         # images into actual screen positions
-        self.offset_x = 480 # window_rect[0] + 480 # + self.cropped_x
-        self.offset_y = 70 # window_rect[1] + 70 # + self.cropped_y
+        self.offset_x = region_x # window_rect[0] + 480 # + self.cropped_x
+        self.offset_y = region_y # window_rect[1] + 70 # + self.cropped_y
 
     def get_screenshot(self):
 
@@ -49,7 +75,7 @@ class WindowCapture:
         # convert the raw data into a format opencv can read
         #dataBitMap.SaveBitmapFile(cDC, 'debug.bmp')
         signedIntsArray = dataBitMap.GetBitmapBits(True)
-        img = numpy.fromstring(signedIntsArray, dtype='uint8')
+        img = numpy.frombuffer(signedIntsArray, dtype='uint8')
         img.shape = (self.h, self.w, 4)
 
         # free resources
@@ -74,6 +100,9 @@ class WindowCapture:
 
         return img
 
+    def get_frame(self):
+        return self.get_screenshot()
+
     # translate a pixel position on a screenshot image to a pixel position on the screen.
     # pos = (x, y)
     # WARNING: if you move the window being captured after execution is started, this will
@@ -81,3 +110,70 @@ class WindowCapture:
     # the __init__ constructor.
     def get_screen_position(self, pos):
         return (pos[0] + self.offset_x, pos[1] + self.offset_y)
+
+class PersistentWindowCapture(WindowCapture):
+    """
+    WindowCapture that creates its DCs and bitmap once and copies each frame into a
+    preallocated BGRA buffer, so capturing doesn't allocate anything per frame.
+    get_frame returns a view into a reused buffer: it's overwritten by the next
+    frame, so copy it if you need to keep it.
+
+    output picks what get_frame hands back: 'bgr', 'gray' (pair with a grayscale
+    WinDetector) or 'bgra' (the raw buffer, no conversion at all).
+    Call close() or use it as a context manager to free the GDI objects.
+    """
+    def __init__(self, region=None, *, output='bgr', hwnd=None):
+        super().__init__(region, hwnd=hwnd)
+        if output not in ('bgr', 'gray', 'bgra'):
+            raise ValueError(f"Unknown capture output: {output}")
+        self.output = output
+        self.stats = CaptureStats()
+
+        self._wDC = win32gui.GetWindowDC(self.hwnd)
+        self._dcObj = win32ui.CreateDCFromHandle(self._wDC)
+        self._cDC = self._dcObj.CreateCompatibleDC()
+        self._bitmap = win32ui.CreateBitmap()
+        self._bitmap.CreateCompatibleBitmap(self._dcObj, self.w, self.h)
+        self._cDC.SelectObject(self._bitmap)
+        self._hbitmap = self._bitmap.GetHandle()
+
+        self._bgra = numpy.empty((self.h, self.w, 4), dtype=numpy.uint8)
+        self._bgr = numpy.empty((self.h, self.w, 3), dtype=numpy.uint8)
+        self._gray = numpy.empty((self.h, self.w), dtype=numpy.uint8)
+        self._buffer_ptr = ctypes.c_void_p(self._bgra.ctypes.data)
+        self._buffer_size = self._bgra.nbytes
+        self._src = (8 + self.offset_x, 38 + self.offset_y)
+        self._size = (self.w, self.h)
+
+        self._get_bitmap_bits = ctypes.windll.gdi32.GetBitmapBits
+        self._get_bitmap_bits.argtypes = (ctypes.c_void_p, ctypes.c_long, ctypes.c_void_p)
+        self._get_bitmap_bits.restype = ctypes.c_long
+
+    def get_screenshot(self):
+        started = self.stats.start()
+        self._cDC.BitBlt((0, 0), self._size, self._dcObj, self._src, win32con.SRCCOPY)
+        # copy straight into our buffer rather than through a bytes object
+        if not self._get_bitmap_bits(self._hbitmap, self._buffer_size, self._buffer_ptr):
+            raise OSError("GetBitmapBits failed")
+
+        if self.output == 'bgr':
+            img = cv2.cvtColor(self._bgra, cv2.COLOR_BGRA2BGR, dst=self._bgr)
+        elif self.output == 'gray':
+            img = cv2.cvtColor(self._bgra, cv2.COLOR_BGRA2GRAY, dst=self._gray)
+        else:
+            img = self._bgra
+        self.stats.stop(started)
+        return img
+
+    def close(self):
+        if self._dcObj is None:
+            return
+        self._dcObj.DeleteDC()
+        self._cDC.DeleteDC()
+        win32gui.ReleaseDC(self.hwnd, self._wDC)
+        win32gui.DeleteObject(self._hbitmap)
+        self._dcObj = self._cDC = self._bitmap = None
+
+    def __del__(self):
+        if getattr(self, '_dcObj', None) is not None:
+            self.close()
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""
+The screens the game can be on. Kept apart from screen_state's classifier so the
+controllers can wait for a screen without importing OpenCV.
+"""
+from enum import Enum
+
+class ScreenState(Enum):
+    UNKNOWN = 'unknown'
+    TITLE = 'title'
+    MAIN_MENU = 'main_menu'
+    LOCAL_MENU = 'local_menu'
+    CHARACTER_SELECT = 'character_select'
+    STAGE_SELECT = 'stage_select'
+    LOADING = 'loading'
+    IN_MATCH = 'in_match'
+    RESULTS = 'results'
\ No newline at end of file
@@ -1,35 +1,132 @@
 # Special thanks to Learn Code By Gaming
 
+from typing import NamedTuple, Optional
 import cv2
 
+class TemplateMatch(NamedTuple):
+    score: float
+    # top-left corner of the best match, in frame coordinates
+    loc: tuple[int, int]
+
+class FrameScores(NamedTuple):
+    winner: Optional[int]
+    # best match per template tried: 'win_text', then 'p1' and 'p2' if the win text was found
+    matches: dict[str, TemplateMatch]
+
 class WinDetector:
-    win_text_template = cv2.imread('img/1st_template.png', cv2.COLOR_BGR2GRAY)
+    win_text_template = cv2.imread('img/1st_template.png', cv2.IMREAD_COLOR)
     win_text_method = cv2.TM_CCOEFF_NORMED
     win_text_threshold = 0.8
 
-    p1_template = cv2.imread('img/p1_template.png', cv2.COLOR_BGR2GRAY)
-    p2_template = cv2.imread('img/p2_template.png', cv2.COLOR_BGR2GRAY)
+    p1_template = cv2.imread('img/p1_template.png', cv2.IMREAD_COLOR)
+    p2_template = cv2.imread('img/p2_template.png', cv2.IMREAD_COLOR)
     p_method = cv2.TM_CCOEFF_NORMED
     p_threshold = 0.9
-    
-    def find_win_text(self, img):
-        result = cv2.matchTemplate(img, self.win_text_template, self.win_text_method)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        if max_val > self.win_text_threshold:
-            result = cv2.matchTemplate(img, self.p1_template, self.p_method)
+
+    win_text_template_gray = cv2.imread('img/1st_template.png', cv2.IMREAD_GRAYSCALE)
+    p1_template_gray = cv2.imread('img/p1_template.png', cv2.IMREAD_GRAYSCALE)
+    p2_template_gray = cv2.imread('img/p2_template.png', cv2.IMREAD_GRAYSCALE)
+
+    # Where the player tags sit on the results screen: (min y, max y, winner), exclusive.
+    p1_bands = ((70, 100, 1), (220, 250, 2))
+    p2_bands = ((70, 90, 2), (220, 240, 1))
+
+    # With the pyramid on, the half-size pass only has to clear threshold - slack,
+    # then the full-size pass checks a window of +/- margin pixels around the hit.
+    pyramid_slack = 0.15
+    pyramid_margin = 4
+
+    def __init__(self, *, grayscale=False, roi=False, pyramid=False):
+        """
+        With no options this matches the full BGR frame, as the detector always has.
+        grayscale: match single-channel images (about a third of the work).
+        roi: only search for the player tags inside the bands they can appear in. Not
+            quite the same check: the full-frame search takes the best match anywhere and
+            rejects it if it's outside the bands, while this takes the best match inside
+            them, so a tag that matches better somewhere else no longer rules a frame out.
+        pyramid: find the "1st" text on a half-size frame first, then confirm it at full size.
+        """
+        self.grayscale = grayscale
+        self.roi = roi
+        self.pyramid = pyramid
+
+        if grayscale:
+            self._win_template = self.win_text_template_gray
+            self._p1_template = self.p1_template_gray
+            self._p2_template = self.p2_template_gray
+        else:
+            self._win_template = self.win_text_template
+            self._p1_template = self.p1_template
+            self._p2_template = self.p2_template
+        self._win_template_small = cv2.pyrDown(self._win_template)
+
+    def _match_win_text(self, img) -> TemplateMatch:
+        if not self.pyramid:
+            result = cv2.matchTemplate(img, self._win_template, self.win_text_method)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            if max_val > self.p_threshold:
-                if 70 < max_loc[1] < 100:
-                    return 1
-                elif 220 < max_loc[1] < 250:
-                    return 2
-            result = cv2.matchTemplate(img, self.p2_template, self.p_method)
+            return TemplateMatch(max_val, max_loc)
+
+        result = cv2.matchTemplate(cv2.pyrDown(img), self._win_template_small, self.win_text_method)
+        min_val, max_val, min_loc, (x, y) = cv2.minMaxLoc(result)
+        coarse = TemplateMatch(max_val, (x * 2, y * 2))
+        if max_val <= self.win_text_threshold - self.pyramid_slack:
+            return coarse
+        h, w = self._win_template.shape[:2]
+        x0 = max(x * 2 - self.pyramid_margin, 0)
+        y0 = max(y * 2 - self.pyramid_margin, 0)
+        window = img[y0:y * 2 + self.pyramid_margin + h, x0:x * 2 + self.pyramid_margin + w]
+        if window.shape[0] < h or window.shape[1] < w:
+            return coarse
+        result = cv2.matchTemplate(window, self._win_template, self.win_text_method)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        return TemplateMatch(max_val, (x0 + max_loc[0], y0 + max_loc[1]))
+
+    def _find_in_bands(self, img, template, bands) -> tuple[Optional[int], Optional[TemplateMatch]]:
+        """
+        Returns the winner implied by the best match of template across bands
+        (None if no band clears p_threshold) and that best match.
+        """
+        h = template.shape[0]
+        best = None
+        winner = None
+        for min_y, max_y, band_winner in bands:
+            band = img[min_y + 1:max_y - 1 + h]
+            if band.shape[0] < h:
+                continue
+            result = cv2.matchTemplate(band, template, self.p_method)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            if max_val > self.p_threshold:
-                if 70 < max_loc[1] < 90:
-                    return 2
-                elif 220 < max_loc[1] < 240:
-                    return 1
-        return None
-            
-            
\ No newline at end of file
+            if best is None or max_val > best.score:
+                best = TemplateMatch(max_val, (max_loc[0], max_loc[1] + min_y + 1))
+                winner = band_winner if max_val > self.p_threshold else None
+        return winner, best
+
+    def _find_anywhere(self, img, template, bands) -> tuple[Optional[int], TemplateMatch]:
+        result = cv2.matchTemplate(img, template, self.p_method)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        match = TemplateMatch(max_val, max_loc)
+        if max_val > self.p_threshold:
+            for min_y, max_y, winner in bands:
+                if min_y < max_loc[1] < max_y:
+                    return winner, match
+        return None, match
+
+    def score_frame(self, img) -> FrameScores:
+        """
+        Runs the detector on one frame and reports the best match of every template
+        it tried, along with the winner they imply (None if there isn't one).
+        """
+        if self.grayscale and img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        matches = {'win_text': self._match_win_text(img)}
+        if matches['win_text'].score <= self.win_text_threshold:
+            return FrameScores(None, matches)
+
+        find = self._find_in_bands if self.roi else self._find_anywhere
+        for name, template, bands in (('p1', self._p1_template, self.p1_bands), ('p2', self._p2_template, self.p2_bands)):
+            winner, matches[name] = find(img, template, bands)
+            if winner:
+                return FrameScores(winner, matches)
+        return FrameScores(None, matches)
+
+    def find_win_text(self, img):
+        return self.score_frame(img).winner
@@ -2,19 +2,32 @@ import time
 import json
 import sys
 from .win_detection import WinDetector
-from .screenshot import WindowCapture
 
-def win_detector_loop():
-    detector = WinDetector()
-    capture = WindowCapture()
+def win_detector_loop(source=None, detector=None, policy=None):
+    """
+    Polls source until a winner shows up and returns it, or returns None if the
+    source runs out of frames. Defaults to capturing the live game window.
+    A PollingPolicy, if given, decides how long to wait between frames.
+    """
+    detector = detector or WinDetector()
+    if source is None:
+        from .screenshot import WindowCapture
+        source = WindowCapture()
+
+    if policy is not None:
+        policy.start_match()
 
     while True:
-        img = capture.get_screenshot()
+        img = source.get_frame()
+        if img is None:
+            return None
         result = detector.find_win_text(img)
         if result:
-            json.dump({'winner': result}, sys.stdout)
-            return
-        time.sleep(0.04)
+            return result
+        if policy is not None:
+            time.sleep(policy.next_interval(img))
+        elif source.poll_interval:
+            time.sleep(source.poll_interval)
 
 if __name__ == "__main__":
-    win_detector_loop()
+    json.dump({'winner': win_detector_loop()}, sys.stdout)
\ No newline at end of file
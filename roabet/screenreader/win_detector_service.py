@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import NamedTuple, Optional
+from .confirmation import MatchResult, ResultVoter
+from .frame_source import FrameSource
+from .polling import PollingPolicy
+from .win_detection import WinDetector
+
+class Detection(NamedTuple):
+    winner: int
+    captured_at: float
+    decided_at: float
+    frames: int
+    result: MatchResult
+
+    @property
+    def latency(self) -> float:
+        """
+        Seconds between grabbing the first frame that voted for the winner and reaching
+        a decision, confirmation included.
+        """
+        return self.decided_at - self.result.votes[0].timestamp
+
+    @property
+    def confirmation_delay(self) -> float:
+        """
+        Seconds between the first frame showing the result and the frame that confirmed it.
+        """
+        return self.captured_at - self.result.votes[0].timestamp
+
+class WinDetectorService:
+    """
+    Long-lived win detector. The templates and the frame source are created once
+    and kept warm across matches; a worker thread only grabs frames while someone is
+    awaiting wait_for_result.
+    """
+    def __init__(self, source: Optional[FrameSource]=None, detector: Optional[WinDetector]=None,
+            policy: Optional[PollingPolicy]=None, voter: Optional[ResultVoter]=None):
+        """
+        Without a policy, frames are grabbed every source.poll_interval seconds.
+        Without a voter, a single frame decides the result.
+        """
+        self.source = source
+        self.detector = detector or WinDetector()
+        self.policy = policy
+        self.voter = voter or ResultVoter(required=1)
+
+        self._armed = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._waiter: Optional[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = None
+        # bumped every time wait_for_result arms, so a frame grabbed for an earlier
+        # wait (say, one that timed out) can't vote in the next
+        self._generation = 0
+        self._frames = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """
+        Starts the worker thread. Call once the game window exists.
+        """
+        if self._thread is not None:
+            return
+        if self.source is None:
+            from .screenshot import PersistentWindowCapture
+            self.source = PersistentWindowCapture(output='gray' if self.detector.grayscale else 'bgr')
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="win-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._armed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._armed.clear()
+        if self.source is not None:
+            self.source.close()
+
+    async def wait_for_result(self, timeout: Optional[float]=None) -> Detection:
+        """
+        Samples frames until a winner shows up on screen.
+        Raises asyncio.TimeoutError if nothing is found within timeout seconds.
+        """
+        if self._thread is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiter = (loop, future)
+            self._generation += 1
+            self._frames = 0
+            self.voter.reset()
+            if self.policy is not None:
+                self.policy.start_match()
+            self._armed.set()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            with self._lock:
+                self._armed.clear()
+                self._waiter = None
+
+    def _deliver(self, generation: int, result=None, error: Optional[BaseException]=None):
+        with self._lock:
+            if self._waiter is None or generation != self._generation:
+                return
+            loop, future = self._waiter
+            self._waiter = None
+            self._armed.clear()
+
+        def resolve():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        loop.call_soon_threadsafe(resolve)
+
+    def _run(self):
+        while True:
+            self._armed.wait()
+            if self._stopping:
+                return
+            with self._lock:
+                generation = self._generation
+            try:
+                captured_at = time.perf_counter()
+                img = self.source.get_frame()
+                if img is None:
+                    raise EOFError("Frame source ran out of frames")
+                scores = self.detector.score_frame(img)
+            except Exception as e:
+                self._deliver(generation, error=e)
+                continue
+            with self._lock:
+                if self._waiter is None or generation != self._generation:
+                    # the wait this frame was grabbed for is over
+                    continue
+                self._frames += 1
+                frames = self._frames
+                result = self.voter.add(captured_at, scores)
+            if result:
+                self._deliver(generation, Detection(result.winner, captured_at, time.perf_counter(), frames, result))
+                continue
+            if self.voter.pending:
+                time.sleep(self.voter.interval)
+            elif self.policy is not None:
+                time.sleep(self.policy.next_interval(img))
+            elif self.source.poll_interval:
+                time.sleep(self.source.poll_interval)
@@ -0,0 +1,292 @@
+"""
+Running several game instances at once against one database.
+
+Each Session is one game window with its own Controllers, win detector and phase timer.
+A SessionOrchestrator runs their match loops side by side: a SharedMatchmaker hands out
+matchups so no fighter is in two matches at once, and every session records its results
+through the same DatabaseWriter.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import traceback
+from typing import TYPE_CHECKING, Optional
+from roabet.db import Fighters
+from roabet.screenreader.states import ScreenState
+
+if TYPE_CHECKING:
+    from roabet.controller import Controllers
+    from roabet.db import Character, DatabaseReader, Leaderboard, Matches, PhaseTimer, Stages
+    from roabet.screenreader.win_detector_service import WinDetectorService
+
+class SharedMatchmaker:
+    """
+    Hands out matchups to any number of sessions. The fighters in a match that's being
+    played are taken out of the matchmaking index until finish is called with its
+    result, so no two sessions get the same fighter, and a fighter's next match is always
+    picked against a rating that includes its last one. With several sessions and a small
+    pool, claim can find too few fighters free; wait_for_fighters then waits for a match
+    to finish.
+    With a leaderboard, every result moves its fighters on it too.
+    """
+    def __init__(self, fighters: Fighters, rng=random, leaderboard: Leaderboard=None):
+        self.fighters = fighters
+        self.rng = rng
+        self.leaderboard = leaderboard
+        # ids of fighters in matches that haven't finished
+        self.in_play: set[str] = set()
+        self._reloading = asyncio.Lock()
+        self._finished = asyncio.Event()
+
+    def claim(self) -> Optional[list[Character]]:
+        """
+        Picks a matchup (the prefetched one, if it's still fair and free) and takes its
+        fighters out of play for everyone else. Returns None if fewer than two fighters
+        are free because the rest are in other matches.
+        """
+        if len(self.fighters.matchmaker_index) < 2 and self.in_play:
+            return None
+        matchup = self.fighters.choose_fighters(self.rng)
+        for fighter in matchup:
+            self.in_play.add(fighter.id)
+            self.fighters.matchmaker_index.remove(fighter)
+        return matchup
+
+    async def wait_for_fighters(self):
+        """
+        Waits until some claimed matchup finishes and hands its fighters back.
+        """
+        self._finished.clear()
+        await self._finished.wait()
+
+    def prefetch(self):
+        """
+        Picks the next matchup ahead of time from the whole pool, fighters in play
+        included. Otherwise it could never include the fighters of the match just
+        claimed, and with one session no fighter would ever play twice in a row.
+        choose_fighters only uses it if its fighters are free by the next claim.
+        """
+        fighters = self.fighters
+        playing = [fighters.fighters[id] for id in self.in_play if id in fighters.fighters
+            and fighters.fighters[id] in fighters.matchmaker_pool
+            and fighters.fighters[id] not in fighters.matchmaker_index]
+        for fighter in playing:
+            fighters.matchmaker_index.add(fighter)
+        try:
+            fighters.prefetch_matchup(self.rng)
+        finally:
+            for fighter in playing:
+                fighters.matchmaker_index.remove(fighter)
+
+    def finish(self, matchup: list[Character], winner: Optional[int]=None):
+        """
+        Applies a claimed matchup's result, if it has one, and puts its fighters back in play.
+        """
+        if winner is not None:
+            self.fighters.record_result(matchup[0], matchup[1], winner)
+            if self.leaderboard is not None:
+                self.leaderboard.record([self.fighters.fighters.get(fighter.id, fighter) for fighter in matchup])
+        for fighter in matchup:
+            self.in_play.discard(fighter.id)
+            # after a reload, the claimed Character is stale
+            current = self.fighters.fighters.get(fighter.id)
+            if current is not None and current not in self.fighters.matchmaker_index \
+                    and current in self.fighters.matchmaker_pool:
+                self.fighters.matchmaker_index.add(current)
+        self._finished.set()
+
+    async def check_rating_cycle(self, reader: DatabaseReader) -> bool:
+        """
+        Reloads the fighters if a rating cycle has ended since they were loaded. The
+        reload runs on one of reader's threads and is swapped in once it's done, so the
+        other sessions keep going meanwhile. Returns whether it reloaded.
+        """
+        if self._reloading.locked():
+            return False
+        async with self._reloading:
+            current = self.fighters
+            def load(con):
+                cycle = con.execute("SELECT id FROM rating_cycles ORDER BY id DESC LIMIT 1").fetchone()
+                if cycle['id'] == current.rating_cycle:
+                    return None
+                return Fighters(always_update_ratings=current.always_update_ratings, con=con)
+            fighters = await reader.run(load)
+            if fighters is None:
+                return False
+            # a result recorded while the reload ran may be missing from the provisional
+            # ratings until the next reload; they're only used for matchmaking
+            for fighter_id in self.in_play:
+                if fighter_id in fighters.fighters and fighters.fighters[fighter_id] in fighters.matchmaker_index:
+                    fighters.matchmaker_index.remove(fighters.fighters[fighter_id])
+            self.fighters = fighters
+            if self.leaderboard is not None:
+                self.leaderboard.refresh(fighters)
+            return True
+
+class Session:
+    """
+    One game instance. start sets the game up from the title screen; each play_match
+    then plays one match, from picking fighters to recording the result.
+    With a result_timeout, a match with no result after that many seconds (say, because
+    a missed input left the game on stage select) ends the session instead of hanging it.
+    """
+    def __init__(self, controllers: Controllers, win_detector: WinDetectorService, timer: PhaseTimer, *,
+            name: str='', stock: int=3, time: int=5, difficulty: int=9, result_timeout: float=None):
+        self.controllers = controllers
+        self.win_detector = win_detector
+        self.timer = timer
+        self.name = name
+        self.stock = stock
+        self.time = time
+        self.difficulty = difficulty
+        self.result_timeout = result_timeout
+        self.matches = 0
+
+    def log(self, message: str):
+        print(f"[{self.name}] {message}" if self.name else message)
+
+    async def start(self, workshop_length: int):
+        controllers = self.controllers
+        controllers.set_workshop_length(workshop_length)
+        await controllers.wait_for_screen(ScreenState.TITLE, 30, timeout=120)
+        await controllers.init_local_play()
+        await controllers.init_com_players()
+        await controllers.each_player(lambda p: p.set_difficulty(self.difficulty))
+        await controllers.change_settings(stock=self.stock, time=self.time)
+        self.win_detector.start()
+
+    async def play_match(self, matchmaker: SharedMatchmaker, stages: Stages, matches: Matches,
+            reader: DatabaseReader=None) -> bool:
+        """
+        Returns False if the win detector crashed or timed out, so the session can't go on.
+        """
+        controllers = self.controllers
+        timer = self.timer
+        match_id = None
+        with timer.span('matchmaking'):
+            while (fighters := matchmaker.claim()) is None:
+                # every free fighter is in another session's match
+                await matchmaker.wait_for_fighters()
+            stage = stages.select_stage()
+
+        self.log(f"Next match: {fighters[0].name} ({fighters[0].provisional_rating.rating})"
+            f" vs {fighters[1].name} ({fighters[1].provisional_rating.rating}) on {stage.name}")
+
+        try:
+            with timer.span('select_fighters'):
+                await controllers.select_fighters(*fighters)
+            with timer.span('confirm_fighters'):
+                await controllers.confirm_fighters()
+            with timer.span('select_stage'):
+                await controllers.select_stage(stage)
+
+            cursor_time, cursor_saved = controllers.pop_motion_stats()
+            self.log(f"Cursor movement: {cursor_time:.1f} s ({cursor_saved:.1f} s saved by diagonal moves)")
+            self.log(f"Input timing: {controllers.pop_timing_stats()}")
+            waited, fallback = controllers.pop_screen_wait_stats()
+            self.log(f"Screen waits: {waited:.1f} s ({fallback - waited:+.1f} s against fixed sleeps)")
+            self.log("Game started. Awaiting result...")
+            with timer.span('prefetch_matchup'):
+                matchmaker.prefetch()
+            try:
+                with timer.span('wait_for_result'):
+                    detection = await self.win_detector.wait_for_result(self.result_timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.log(f"No result after {self.result_timeout:.0f} s!")
+                else:
+                    self.log("Win detector crashed!")
+                    traceback.print_exc()
+                matchmaker.finish(fighters)
+                timer.flush()
+                return False
+
+            winner = detection.winner
+            self.log(f"Result: {fighters[winner - 1].name} wins! (detected in {detection.latency * 1000:.0f} ms, "
+                f"{detection.frames} frames captured)")
+            if self.win_detector.source.stats:
+                self.log(f"Capture: {self.win_detector.source.stats}")
+            self.log(f"Confidence: {detection.result.confidence:.3f} over {len(detection.result.votes)} frames "
+                f"(confirmed after {detection.confirmation_delay * 1000:.0f} ms)")
+            with timer.span('record_result'):
+                match_id = await matches.record_async(fighters, winner, stage, detection.result)
+                matchmaker.finish(fighters, winner)
+        except BaseException:
+            # hand the fighters back so other sessions can have them
+            if fighters[0].id in matchmaker.in_play:
+                matchmaker.finish(fighters)
+            raise
+        self.matches += 1
+
+        with timer.span('cooldown'):
+            await controllers.wait_for_screen(ScreenState.CHARACTER_SELECT, 10, timeout=30)
+
+        controllers.reset_cursor_pos()
+
+        if reader is not None:
+            with timer.span('check_rating_cycle'):
+                reloaded = await matchmaker.check_rating_cycle(reader)
+            if reloaded:
+                self.log("New rating cycle, reloaded fighters")
+
+        timer.flush(match_id)
+        return True
+
+    def stop(self):
+        self.win_detector.stop()
+
+class SessionOrchestrator:
+    """
+    Runs several Sessions' match loops at once, sharing one matchmaker, stage list and
+    match recorder. A session whose win detector crashes drops out; the rest carry on.
+    """
+    def __init__(self, matchmaker: SharedMatchmaker, stages: Stages, matches: Matches,
+            reader: DatabaseReader=None):
+        self.matchmaker = matchmaker
+        self.stages = stages
+        self.matches = matches
+        self.reader = reader
+        self.sessions: list[Session] = []
+        self.started_at: Optional[float] = None
+        self._stopping = False
+
+    def add(self, session: Session):
+        self.sessions.append(session)
+
+    async def start(self, workshop_length: int):
+        """
+        Sets every session's game up at once.
+        """
+        await asyncio.gather(*(session.start(workshop_length) for session in self.sessions))
+
+    async def _loop(self, session: Session, limit: Optional[int]):
+        while not self._stopping and (limit is None or self.total_matches < limit):
+            if not await session.play_match(self.matchmaker, self.stages, self.matches, self.reader):
+                session.log("Dropping out")
+                return
+
+    async def run(self, limit: Optional[int]=None):
+        """
+        Plays matches on every session until stop is called, every session has dropped
+        out, or limit matches have been played in total.
+        """
+        self._stopping = False
+        self.started_at = asyncio.get_running_loop().time()
+        await asyncio.gather(*(self._loop(session, limit) for session in self.sessions))
+
+    def stop(self):
+        """
+        Lets every session finish the match it's on, then ends run.
+        """
+        self._stopping = True
+
+    @property
+    def total_matches(self) -> int:
+        return sum(session.matches for session in self.sessions)
+
+    def matches_per_hour(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = asyncio.get_running_loop().time() - self.started_at
+        return self.total_matches / elapsed * 3600 if elapsed else 0.0
\ No newline at end of file
@@ -43,26 +43,39 @@ def _e(r, r_opp, dev_opp):
     """
     return 1/(1 + 10**(-_g(dev_opp)*(r-r_opp)/400))
 
+def match_terms(old: Rating, opp: Rating, score: float) -> tuple[float, float]:
+    """
+    One match's contribution to the two sums in Step 2: the g^2*E*(1-E) term that
+    goes into 1/d^2 and the g*(s-E) term that goes into the rating change.
+    """
+    g = _g(opp.dev)
+    e = _e(old.rating, opp.rating, opp.dev)
+    return g**2 * e * (1 - e), g * (score - e)
+
+def rating_from_sums(old: Rating, variance_sum: float, delta_sum: float) -> Rating:
+    """
+    Finishes Step 2 from the sums of match_terms over every match this cycle.
+    """
+    inv_d_squared = Q_SQUARED * variance_sum
+    delta_r = delta_sum * Q / (old.dev**-2 + inv_d_squared)
+
+    r = round(old.rating + delta_r)
+    dev = max(round((old.dev**-2 + inv_d_squared)**-0.5), MIN_DEVIATION)
+
+    return Rating(r, dev)
+
 def update_rating(old: Rating, matches: Iterable[tuple[Rating, float]]) -> Rating:
     """
     Performs Step 2 of calculation: update rating and RD based on results of games this cycle
     """
     if len(matches) == 0:
         return old
-    
-    inv_d_squared = Q_SQUARED * sum(
-        _g(opp.dev)**2 
-        * _e(old.rating, opp.rating, opp.dev)
-        * (1 - _e(old.rating, opp.rating, opp.dev))
-        for opp, score in matches)
-    
-    delta_r = sum(
-        _g(opp.dev)
-        * (score - _e(old.rating, opp.rating, opp.dev))
-        for opp, score in matches
-    ) * Q / (old.dev**-2 + inv_d_squared)
 
-    r = round(old.rating + delta_r)
-    dev = max(round((old.dev**-2 + inv_d_squared)**-0.5), MIN_DEVIATION)
+    variance_sum = 0.0
+    delta_sum = 0.0
+    for opp, score in matches:
+        variance_term, delta_term = match_terms(old, opp, score)
+        variance_sum += variance_term
+        delta_sum += delta_term
 
-    return Rating(r, dev)
+    return rating_from_sums(old, variance_sum, delta_sum)
\ No newline at end of file
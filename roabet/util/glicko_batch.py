@@ -0,0 +1,60 @@
+"""
+Vectorized Glicko-1 for closing a whole rating cycle at once.
+Gives the same ratings as calling glicko.tick_rating and glicko.update_rating
+fighter by fighter, with matches applied in the same order.
+"""
+from __future__ import annotations
+
+import numpy
+
+from .glicko import C_SQUARED, DEFAULT_DEVIATION, MIN_DEVIATION, PI_SQUARED, Q, Q_SQUARED
+
+def _g(dev):
+    return (1 + 3*Q_SQUARED * dev**2 / PI_SQUARED)**-0.5
+
+def tick_ratings(ratings, devs, *, c_squared: float=C_SQUARED, max_dev: float=DEFAULT_DEVIATION):
+    """
+    Step 1 for every fighter: returns (ratings, devs) with RD grown by one cycle.
+    """
+    devs = numpy.asarray(devs, dtype=numpy.float64)
+    return (numpy.asarray(ratings, dtype=numpy.int64).copy(),
+        numpy.minimum(numpy.rint((devs**2 + c_squared)**0.5), max_dev).astype(numpy.int64))
+
+def update_ratings(ratings, devs, player1, player2, score1, *, min_dev: float=MIN_DEVIATION):
+    """
+    Step 2 for every fighter at once.
+    ratings, devs: each fighter's (ticked) rating at the start of the cycle.
+    player1, player2: indexes into ratings of the two fighters in each match, in match order.
+    score1: player1's score in each match (1.0 for a win, 0.0 for a loss).
+    Returns (ratings, devs, games); fighters with no games keep their rating.
+    """
+    n = len(ratings)
+    r = numpy.asarray(ratings, dtype=numpy.float64)
+    d = numpy.asarray(devs, dtype=numpy.float64)
+    player1 = numpy.asarray(player1, dtype=numpy.intp)
+    player2 = numpy.asarray(player2, dtype=numpy.intp)
+    score1 = numpy.asarray(score1, dtype=numpy.float64)
+
+    # one row per (fighter, opponent) pairing, interleaved so each fighter's matches are
+    # summed in match order, exactly like the scalar path
+    fighter = numpy.column_stack((player1, player2)).ravel()
+    opponent = numpy.column_stack((player2, player1)).ravel()
+    score = numpy.column_stack((score1, 1 - score1)).ravel()
+
+    g = _g(d[opponent])
+    e = 1/(1 + 10**(-g*(r[fighter] - r[opponent])/400))
+    variance_sum = numpy.bincount(fighter, weights=g**2 * e * (1 - e), minlength=n)
+    delta_sum = numpy.bincount(fighter, weights=g * (score - e), minlength=n)
+    games = numpy.bincount(fighter, minlength=n)
+
+    inv_d_squared = Q_SQUARED * variance_sum
+    inv_dev_squared = d**-2.0
+    delta_r = delta_sum * Q / (inv_dev_squared + inv_d_squared)
+
+    new_ratings = numpy.rint(r + delta_r).astype(numpy.int64)
+    new_devs = numpy.maximum(numpy.rint((inv_dev_squared + inv_d_squared)**-0.5), min_dev).astype(numpy.int64)
+
+    played = games > 0
+    return (numpy.where(played, new_ratings, numpy.asarray(ratings, dtype=numpy.int64)),
+        numpy.where(played, new_devs, numpy.asarray(devs, dtype=numpy.int64)),
+        games)